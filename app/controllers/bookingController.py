@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from app.schemas.bookingSchemas import BookingCreate, BookingUpdate, BookingResponse
 from app.schemas.userSchemas import UserResponse
 from app.services.bookingService import BookingService
 from app.services.userService import UserService
 from app.managers.databaseManager import get_db
+from app.managers.idempotencyManager import IdempotencyManager
 from app.security import get_current_user
+from app.utils.responses import SchemaRoute, sparse_fields
 
-router = APIRouter(prefix="/bookings", tags=["Bookings"])
+router = APIRouter(prefix="/bookings", tags=["Bookings"], route_class=SchemaRoute)
 
 @router.get("/", response_model=List[BookingResponse])
-async def get_all_bookings(db: AsyncSession = Depends(get_db), current_user: UserResponse = Depends(get_current_user)):
+async def get_all_bookings(
+    fields: Optional[List[str]] = Depends(sparse_fields(BookingResponse)),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
     """Retrieve bookings. Admins see all bookings; users see their own."""
-    return await BookingService.get_bookings(db, current_user)
+    return Response(await BookingService.get_bookings_json(db, current_user, fields=fields), media_type="application/json")
 
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking(booking_id: int, db: AsyncSession = Depends(get_db), current_user: UserResponse = Depends(get_current_user)):
@@ -29,9 +35,17 @@ async def get_booking(booking_id: int, db: AsyncSession = Depends(get_db), curre
     return booking
 
 @router.post("/", response_model=BookingResponse, status_code=201)
-async def create_booking(booking_data: BookingCreate, db: AsyncSession = Depends(get_db), current_user: UserResponse = Depends(get_current_user)):
-    """Create a new booking. Authentication required."""
-    return await BookingService.create_booking(db, booking_data, current_user)
+async def create_booking(
+    booking_data: BookingCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    """Create a new booking. Authentication required. Retries with the same `Idempotency-Key` get the first response back."""
+    return await IdempotencyManager().run(
+        db, idempotency_key, f"POST /bookings/ {current_user.id}", booking_data,
+        lambda: BookingService.create_booking(db, booking_data, current_user), status_code=201,
+    )
 
 @router.patch("/{booking_id}", response_model=BookingResponse)
 async def update_booking(
@@ -57,6 +71,7 @@ async def delete_booking(
 @router.get("/user/{user_id}", response_model=List[BookingResponse])
 async def get_bookings_by_user(
     user_id: int, 
+    fields: Optional[List[str]] = Depends(sparse_fields(BookingResponse)),
     db: AsyncSession = Depends(get_db), 
     current_user: UserResponse = Depends(get_current_user)
 ):
@@ -66,5 +81,5 @@ async def get_bookings_by_user(
     if not is_admin and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view these bookings")
     
-    bookings = await BookingService.get_bookings_by_user(db, user_id)
-    return bookings
+    bookings = await BookingService.get_bookings_by_user_json(db, user_id, fields=fields)
+    return Response(bookings, media_type="application/json")
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.schemas.changeSchemas import ChangeFeedResponse
+from app.schemas.userSchemas import UserResponse
+from app.services.changeService import FEED_START, ChangeService, parse_cursor
+from app.services.userRoleService import UserRoleService
+from app.managers.databaseManager import get_db
+from app.security import get_current_user
+from app.utils.responses import EventStreamResponse, SchemaRoute
+
+router = APIRouter(prefix="/changes", tags=["Changes"], route_class=SchemaRoute)
+
+@router.get("", response_model=ChangeFeedResponse)
+async def get_changes(
+    request: Request,
+    since: str = FEED_START,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=60),
+    entity: Optional[List[Literal["booking", "room", "hotel"]]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Changes to bookings, rooms and hotels after the `since` cursor - Admins only.
+
+    `wait` makes the request wait up to that many seconds for a change when there is none yet. With
+    `Accept: text/event-stream` the changes are streamed as server-sent events instead, resuming from
+    `Last-Event-ID` on reconnection.
+    """
+    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
+    if not user_role or not user_role.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can read the change feed.")
+
+    try:
+        cursor = parse_cursor(request.headers.get("last-event-id") or since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        await db.close()
+        return EventStreamResponse(ChangeService.stream(cursor, limit, entity))
+    return await ChangeService.wait_for_changes(db, cursor, limit, wait, entity)
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.userSchemas import UserResponse
-from app.schemas.hotelSchemas import HotelCreate, HotelUpdate, HotelResponse
+from app.schemas.hotelSchemas import (
+    FacetedHotelSearchResponse, HotelCreate, HotelDetailResponse, HotelNearbyResponse, HotelSuggestion, HotelUpdate,
+    HotelResponse,
+)
+from app.schemas.importSchemas import ImportReport
 from app.services.hotelService import HotelService
+from app.services.importService import IMPORT_FORMATS, ImportService
 from app.services.userRoleService import UserRoleService
-from app.managers.databaseManager import get_db
-from typing import List
+from app.managers.availabilityManager import AvailabilityManager
+from app.managers.facetManager import PRICE_VALUES, RATING_VALUES
+from app.managers.databaseManager import get_db, get_read_db
+from typing import List, Literal
 from app.security import get_current_user
+from app.utils.responses import EventStreamResponse, SchemaRoute, sparse_fields
 from typing import Optional
 
-router = APIRouter(prefix="/hotels", tags=["Hotels"])
+router = APIRouter(prefix="/hotels", tags=["Hotels"], route_class=SchemaRoute)
 
 @router.get("/search", response_model=List[HotelResponse])
 async def search_hotels(
@@ -17,23 +26,105 @@ async def search_hotels(
     address: Optional[str] = None,
     limit: int = 10,
     offset: int = 0,
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[List[str]] = Depends(sparse_fields(HotelResponse)),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Search hotels by optional name and address filters with pagination."""
-    return await HotelService.get_hotels(db, name=name, address=address, limit=limit, offset=offset)
+    """Search hotels by optional name and address filters with pagination, optionally returning some fields only."""
+    hotels = await HotelService.get_hotels_json(db, name=name, address=address, limit=limit, offset=offset, fields=fields)
+    return Response(hotels, media_type="application/json")
 
-@router.get("/{hotel_id}", response_model=HotelResponse)
-async def get_hotel(hotel_id: int, db: AsyncSession = Depends(get_db)):
-    """Retrieve a hotel by ID."""
-    hotel = await HotelService.get_hotel(db, hotel_id)
+@router.get("/search/faceted", response_model=FacetedHotelSearchResponse)
+async def search_hotels_faceted(
+    name: Optional[str] = None,
+    address: Optional[str] = None,
+    rating: List[Literal[RATING_VALUES]] = Query([]),
+    breakfast: Optional[bool] = None,
+    city: List[str] = Query([]),
+    price: List[Literal[PRICE_VALUES]] = Query([], description="Price bucket of the hotel's cheapest room"),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search hotels filtered on rating and price buckets, breakfast and city, with the count of
+    hotels per value of each facet. Repeat a filter to accept several values.
+    """
+    return await HotelService.search_faceted(
+        db, name=name, address=address, rating=rating, breakfast=breakfast, city=city, price=price, limit=limit, offset=offset,
+    )
+
+@router.get("/autocomplete", response_model=List[HotelSuggestion])
+async def autocomplete_hotels(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Hotels whose name, address or description has every word typed so far, the last one as a prefix."""
+    return await HotelService.autocomplete(db, q, limit=limit)
+
+@router.get("/nearby", response_model=List[HotelNearbyResponse])
+async def get_nearby_hotels(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5, gt=0, le=500, description="Kilometres"),
+    breakfast: Optional[bool] = None,
+    min_rating: Optional[Decimal] = Query(None, ge=0, le=5),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: Optional[List[str]] = Depends(sparse_fields(HotelNearbyResponse)),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Hotels within `radius` kilometres of a point, nearest first, optionally filtered on breakfast and rating."""
+    hotels = await HotelService.get_nearby_hotels_json(
+        db, lat, lon, radius, breakfast=breakfast, min_rating=min_rating, limit=limit, offset=offset, fields=fields,
+    )
+    return Response(hotels, media_type="application/json")
+
+@router.get("/{hotel_id}", response_model=HotelDetailResponse, response_model_exclude_unset=True)
+async def get_hotel(
+    hotel_id: int,
+    include: Optional[str] = Query(None, pattern=r"^(rooms|summary)(,(rooms|summary))*$", description="rooms, summary or both, comma-separated"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Retrieve a hotel by ID, with its rooms and a summary of them when asked for in one request."""
+    hotel = await HotelService.get_hotel_detail(db, hotel_id, set(include.split(",")) if include else ())
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
     return hotel
 
+@router.get("/{hotel_id}/availability/stream")
+async def stream_hotel_availability(hotel_id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Server-sent events of the hotel's bookings being created, updated or deleted.
+
+    Open the stream before loading the availability it updates. A `resync` event means deltas were
+    lost because the client fell behind: load the availability again. Each client address may keep
+    a limited number of streams open.
+    """
+    if not await HotelService.get_hotel(db, hotel_id):
+        raise HTTPException(status_code=404, detail="Hotel not found")
+    # The stream may stay open for hours, its connection goes back to the pool now
+    await db.close()
+
+    availability_manager = AvailabilityManager()
+    client = request.client.host if request.client else ""
+    subscription = await availability_manager.subscribe(hotel_id, client)
+    if subscription is None and availability_manager.streams_of(client) >= availability_manager.max_per_client:
+        raise HTTPException(status_code=429, detail="Too many availability streams open from this client")
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many availability streams, retry later", headers={"Retry-After": "5"})
+    return EventStreamResponse(
+        availability_manager.stream(subscription),
+        on_close=lambda: availability_manager.unsubscribe(subscription),
+    )
+
 @router.get("/", response_model=List[HotelResponse])
-async def get_hotels(db: AsyncSession = Depends(get_db)):
+async def get_hotels(
+    fields: Optional[List[str]] = Depends(sparse_fields(HotelResponse)),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Retrieve all hotels."""
-    return await HotelService.get_hotels(db)
+    return Response(await HotelService.get_hotels_json(db, fields=fields), media_type="application/json")
 
 @router.post("/", response_model=HotelResponse, status_code=201)
 async def create_hotel(
@@ -52,6 +143,34 @@ async def create_hotel(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/import", response_model=ImportReport)
+async def import_hotels(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Import hotels and their rooms from a CSV or NDJSON body - Only admins can do this.
+
+    Each row has a `type`, `hotel` or `room`, and the fields of the hotel or room. A room belongs
+    to the hotel above it: `text/csv` takes a header naming the columns among type, name, address,
+    city, description, rating, breakfast, latitude, longitude, price and number_of_beds,
+    `application/x-ndjson` one object per line, where a hotel may also list its rooms under `rooms`.
+    Hotels without coordinates are geocoded from their address. Rows are committed as they are read:
+    the report gives the rows imported and the line of each row rejected.
+    """
+    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
+    if not user_role or not user_role.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can import hotels.")
+
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in IMPORT_FORMATS:
+        raise HTTPException(status_code=415, detail=f"Expected one of: {', '.join(IMPORT_FORMATS)}")
+    try:
+        return await ImportService.import_hotels(db, request.stream(), media_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.patch("/{hotel_id}", response_model=HotelResponse)
 async def update_hotel(
@@ -61,12 +180,7 @@ async def update_hotel(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Update a hotel - Only admins can do this."""
-    
-    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
-    if not user_role or not user_role.is_admin:
-        raise HTTPException(status_code=403, detail="Only admins can update hotel information.")
-
-    hotel = await HotelService.update_hotel(db, hotel_id, update_data)
+    hotel = await HotelService.update_hotel(db, hotel_id, update_data, admin_id=current_user.id)
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
     return hotel
@@ -78,11 +192,6 @@ async def delete_hotel(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Delete a hotel - Only admins can do this."""
-
-    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
-    if not user_role or not user_role.is_admin:
-        raise HTTPException(status_code=403, detail="Only admins can delete hotels.")
-
-    deleted = await HotelService.delete_hotel(db, hotel_id)
+    deleted = await HotelService.delete_hotel(db, hotel_id, admin_id=current_user.id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Hotel not found")
\ No newline at end of file
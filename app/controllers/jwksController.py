@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.managers.tokenManager import TokenManager
+
+router = APIRouter(prefix="/.well-known", tags=["Auth"])
+
+@router.get("/jwks.json", response_model=dict)
+async def get_jwks():
+    """Public keys verifying access tokens (RS256 or EdDSA only, shared secrets are never published)."""
+    return TokenManager().jwks()
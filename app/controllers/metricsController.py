@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+from app.managers.availabilityManager import AvailabilityManager
+from app.managers.compressionManager import CompressionManager
+from app.managers.concurrencyManager import ConcurrencyManager
+from app.managers.facetManager import FacetManager
+from app.managers.geocodingManager import GeocodingManager
+from app.managers.searchIndexManager import SearchIndexManager
+from app.managers.idempotencyManager import IdempotencyManager
+from app.managers.jobManager import JobManager
+from app.managers.queryTimeoutManager import QueryTimeoutManager
+from app.managers.tokenManager import TokenManager
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/concurrency", response_model=dict)
+async def get_concurrency_metrics():
+    """Current concurrency limit, queues per priority class and per-route admission metrics."""
+    return ConcurrencyManager().snapshot()
+
+@router.get("/tokens", response_model=dict)
+async def get_token_metrics():
+    """Signing algorithm and key ids, and the hit rate of the verified token cache."""
+    return TokenManager().snapshot()
+
+@router.get("/jobs", response_model=dict)
+async def get_job_metrics():
+    """Job workers of this process, the kinds they run and the outcomes of the jobs they ran."""
+    return JobManager().snapshot()
+
+@router.get("/availability", response_model=dict)
+async def get_availability_metrics():
+    """Availability streams open on this process and the deltas handed to them."""
+    return AvailabilityManager().snapshot()
+
+@router.get("/idempotency", response_model=dict)
+async def get_idempotency_metrics():
+    """Requests run with an Idempotency-Key, and the retries answered from their stored response."""
+    return IdempotencyManager().snapshot()
+
+@router.get("/geocoding", response_model=dict)
+async def get_geocoding_metrics():
+    """Addresses geocoded by this process, answered from the cache or lost to geocoder failures."""
+    return GeocodingManager().snapshot()
+
+@router.get("/facets", response_model=dict)
+async def get_facet_metrics():
+    """Hotels counted per facet in memory, the combinations they make and the memory they take."""
+    return FacetManager().snapshot()
+
+@router.get("/autocomplete", response_model=dict)
+async def get_autocomplete_metrics():
+    """Hotels and words in the autocomplete index of this process, and the memory it takes."""
+    return SearchIndexManager().snapshot()
+
+@router.get("/compression", response_model=dict)
+async def get_compression_metrics():
+    """Responses compressed per encoding by this process, the bytes saved and the hit rate of the compressed body cache."""
+    return CompressionManager().snapshot()
+
+@router.get("/queries", response_model=dict)
+async def get_query_metrics():
+    """Statement timeouts per route, and the queries cut short by them or cancelled when their client disconnected."""
+    return QueryTimeoutManager().snapshot()
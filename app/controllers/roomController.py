@@ -1,16 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.roomSchemas import RoomCreate, RoomUpdate, RoomResponse
 from app.services.roomService import RoomService
 from app.services.userRoleService import UserRoleService
-from app.managers.databaseManager import get_db
+from app.managers.databaseManager import get_db, get_read_db
 from app.security import get_current_user
-from typing import List
+from app.utils.responses import SchemaRoute, sparse_fields
+from typing import List, Optional
 
-router = APIRouter(prefix="/rooms", tags=["Rooms"])
+router = APIRouter(prefix="/rooms", tags=["Rooms"], route_class=SchemaRoute)
 
 @router.get("/{room_id}", response_model=RoomResponse)
-async def get_room(room_id: int, db: AsyncSession = Depends(get_db)):
+async def get_room(room_id: int, db: AsyncSession = Depends(get_read_db)):
     """Retrieve a room by ID."""
     room = await RoomService.get_room(db, room_id)
     if not room:
@@ -18,9 +19,16 @@ async def get_room(room_id: int, db: AsyncSession = Depends(get_db)):
     return room
 
 @router.get("/hotel/{hotel_id}", response_model=List[RoomResponse])
-async def get_rooms_by_hotel(hotel_id: int, db: AsyncSession = Depends(get_db)):
-    """Retrieve all rooms in a given hotel."""
-    return await RoomService.get_rooms_by_hotel(db, hotel_id)
+async def get_rooms_by_hotel(
+    hotel_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    fields: Optional[List[str]] = Depends(sparse_fields(RoomResponse)),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Retrieve the rooms of a given hotel, a page at a time."""
+    rooms = await RoomService.get_rooms_by_hotel_json(db, hotel_id, limit=limit, offset=offset, fields=fields)
+    return Response(rooms, media_type="application/json")
 
 @router.post("/", response_model=RoomResponse, status_code=201)
 async def create_room(
@@ -47,12 +55,7 @@ async def update_room(
     current_user = Depends(get_current_user)
 ):
     """Update a room - Admins only."""
-    
-    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
-    if not user_role or not user_role.is_admin:
-        raise HTTPException(status_code=403, detail="Only admins can update rooms.")
-
-    room = await RoomService.update_room(db, room_id, update_data)
+    room = await RoomService.update_room(db, room_id, update_data, admin_id=current_user.id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     return room
@@ -64,11 +67,6 @@ async def delete_room(
     current_user = Depends(get_current_user)
 ):
     """Delete a room - Admins only."""
-
-    user_role = await UserRoleService.get_role_by_user(db, current_user.id)
-    if not user_role or not user_role.is_admin:
-        raise HTTPException(status_code=403, detail="Only admins can delete rooms.")
-
-    deleted = await RoomService.delete_room(db, room_id)
+    deleted = await RoomService.delete_room(db, room_id, admin_id=current_user.id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Room not found")
\ No newline at end of file
@@ -1,43 +1,74 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.userSchemas import UserCreate, UserUpdate, UserResponse, UserWithRoleResponse
+from app.schemas.userSchemas import UserCreate, UserUpdate, UserResponse, UserWithRoleResponse, TokenResponse, RefreshRequest
 from app.services.userService import UserService
+from app.services.sessionService import SessionService
 from app.services.userRoleService import UserRoleService
 from app.schemas.userRoleSchemas import UserRoleCreate
-from app.managers.databaseManager import get_db
-from app.security import get_current_user
-from typing import List
-from app.security import verify_password, create_access_token
-from datetime import timedelta
+from app.managers.databaseManager import get_db, get_read_db
+from app.managers.idempotencyManager import IdempotencyManager
+from app.managers.rateLimitManager import RateLimitManager, retry_after_header
+from app.managers.sessionManager import SessionManager
+from app.security import get_current_user, get_token_payload
+from app.utils.responses import SchemaRoute, sparse_fields
+from typing import List, Optional
+from app.security import verify_password
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=SchemaRoute)
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: UserResponse = Depends(get_current_user)):
     """Retrieve the current authenticated user."""
     return current_user
 
-@router.post("/login", response_model=dict)
-async def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    """User login (returns JWT token with admin status)."""
+@router.post("/login", response_model=TokenResponse)
+async def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    """User login (returns a short-lived JWT access token with admin status and a refresh token)."""
+    rate_limiter = RateLimitManager()
+    client_ip = request.client.host if request.client else ""
+
+    retry_after = await rate_limiter.check_login(client_ip, form_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers=retry_after_header(retry_after),
+        )
+
     user = await UserService.get_user_by_pseudo_raw(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
+    # bcrypt runs in the threadpool so verifications do not block the event loop
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.password):
+        await rate_limiter.login_failed(client_ip, form_data.username)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    user_role = await UserRoleService.get_role_by_user(db, user.id)
-    is_admin = user_role.is_admin if user_role else False
+    await rate_limiter.login_succeeded(client_ip, form_data.username)
+    return await SessionService.create_session(db, user)
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_tokens(refresh_data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Exchange a refresh token for a new access token and a new refresh token (the old one stops working)."""
+    tokens = await SessionService.refresh_session(db, refresh_data.refresh_token)
+    if not tokens:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    return tokens
 
-    access_token = create_access_token(data={"sub": user.pseudo}, expires_delta=timedelta(minutes=60))
-    return {"access_token": access_token, "token_type": "bearer"}
+@router.post("/logout", status_code=204)
+async def logout(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_db)):
+    """Revoke the current session, its access and refresh tokens stop working."""
+    await SessionService.revoke_session(db, payload["sid"])
 
 @router.get("/", response_model=List[UserWithRoleResponse])
-async def get_users(db: AsyncSession = Depends(get_db)):
+async def get_users(
+    fields: Optional[List[str]] = Depends(sparse_fields(UserWithRoleResponse)),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Retrieve all users including their admin status."""
-    return await UserService.get_users(db)
+    return Response(await UserService.get_users_json(db, fields=fields), media_type="application/json")
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """Retrieve a user by ID."""
     user = await UserService.get_user(db, user_id)
     if not user:
@@ -45,11 +76,19 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     return user
 
 @router.post("/", response_model=UserResponse, status_code=201)
-async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
-    """Create a new user (without admin access)."""
+async def create_user(
+    user_data: UserCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    """Create a new user (without admin access). Retries with the same `Idempotency-Key` get the first response back."""
+    # Anonymous: keys are scoped to the client's address, so clients cannot collide on or probe each other's keys
+    client_ip = request.client.host if request.client else ""
     try:
-        user = await UserService.create_user(db, user_data)
-        return user
+        return await IdempotencyManager().run(
+            db, idempotency_key, f"POST /users/ {client_ip}", user_data, lambda: UserService.create_user(db, user_data), status_code=201,
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -60,16 +99,14 @@ async def update_user(
     db: AsyncSession = Depends(get_db),
     current_user: UserResponse = Depends(get_current_user),
 ):
-    """Update a user's info and modify admin status (Admins only)."""
-    user = await UserService.update_user(db, user_id, update_data)
+    """Update a user's info (the user or an admin) and modify admin status (Admins only)."""
+    user = await UserService.update_user(db, user_id, update_data, current_user)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    # Tokens carry the pseudo, email and admin status: the next refresh must reload them
+    SessionManager().forget_user(user.id)
 
     if update_data.is_admin is not None:
-        current_user_role = await UserRoleService.get_role_by_user(db, current_user.id)
-        if not current_user_role or not current_user_role.is_admin:
-            raise HTTPException(status_code=403, detail="Only admins can change admin status.")
-
         if update_data.is_admin:
             await UserRoleService.assign_role(db, UserRoleCreate(user_id=user.id, is_admin=True))
         else:
@@ -85,14 +122,11 @@ async def delete_user(
     current_user: UserResponse = Depends(get_current_user)
 ):
     """Users can delete only themselves unless they are an admin."""
-    user_to_delete = await UserService.get_user(db, user_id)
-
-    if not user_to_delete:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    if user_to_delete.id != current_user.id:
+    if user_id != current_user.id:
+        if not await UserService.get_user(db, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=403, detail="You cannot delete this account.")
 
-    deleted = await UserService.delete_user(db, user_id)
-    if not deleted:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error deleting user")
\ No newline at end of file
+    await SessionService.revoke_user_sessions(db, user_id)
+    if not await UserService.delete_user(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
\ No newline at end of file
@@ -3,10 +3,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.userRoleSchemas import UserRoleCreate, UserRoleResponse
 from app.services.userRoleService import UserRoleService
 from app.managers.databaseManager import get_db
+from app.managers.sessionManager import SessionManager
 from app.security import get_current_user
+from app.utils.responses import SchemaRoute
 from typing import Optional
 
-router = APIRouter(prefix="/user-roles", tags=["User Roles"])
+router = APIRouter(prefix="/user-roles", tags=["User Roles"], route_class=SchemaRoute)
 
 @router.post("/", response_model=UserRoleResponse, status_code=201)
 async def assign_role(
@@ -20,7 +22,9 @@ async def assign_role(
     if not admin_role or not admin_role.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can assign roles.")
 
-    return await UserRoleService.assign_role(db, role_data)
+    role = await UserRoleService.assign_role(db, role_data)
+    SessionManager().forget_user(role_data.user_id)
+    return role
 
 @router.get("/{user_id}", response_model=Optional[UserRoleResponse])
 async def get_user_role(user_id: int, db: AsyncSession = Depends(get_db)):
@@ -41,4 +45,5 @@ async def delete_user_role(
 
     deleted = await UserRoleService.delete_role(db, user_id)
     if not deleted:
-        raise HTTPException(status_code=404, detail="User role not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="User role not found")
+    SessionManager().forget_user(user_id)
\ No newline at end of file
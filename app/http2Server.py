@@ -0,0 +1,36 @@
+"""
+HTTP/2 server settings, loaded by hypercorn with `--config python:app.http2Server`.
+
+Hypercorn speaks HTTP/1.1 and HTTP/2 on the same port: over TLS (TLS_CERTFILE and TLS_KEYFILE) the
+protocol is negotiated with ALPN, in clear text clients and proxies may start HTTP/2 directly (h2c).
+Many requests of a client then share one connection, concurrently, where HTTP/1.1 needs a connection
+per request in flight. Workers run on uvloop and share the keep-alive, backlog and shutdown settings
+of `app.server`; hypercorn has no connection limit, ConcurrencyLimitMiddleware bounds the requests.
+"""
+import os
+import sys
+from app.server import BACKLOG, GRACEFUL_TIMEOUT, KEEPALIVE, worker_count
+
+# Requests one HTTP/2 connection may run at once
+H2_MAX_CONCURRENT_STREAMS = int(os.getenv("H2_MAX_CONCURRENT_STREAMS", "100"))
+# Requests served on a connection before it is closed; hypercorn's 1000 cuts a busy HTTP/2 connection too often
+KEEPALIVE_MAX_REQUESTS = int(os.getenv("KEEPALIVE_MAX_REQUESTS", "100000"))
+
+# hypercorn settings
+bind = [f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"]
+workers = worker_count()
+worker_class = "uvloop"
+certfile = os.getenv("TLS_CERTFILE")
+keyfile = os.getenv("TLS_KEYFILE")
+keep_alive_timeout = KEEPALIVE
+keep_alive_max_requests = KEEPALIVE_MAX_REQUESTS
+backlog = BACKLOG
+graceful_timeout = GRACEFUL_TIMEOUT
+h2_max_concurrent_streams = H2_MAX_CONCURRENT_STREAMS
+accesslog = "-"
+
+def main():
+    """Launched with `poetry run serve-h2` at root level"""
+    from hypercorn.__main__ import main as run
+
+    sys.exit(run(["--config", "python:app.http2Server", "app.main:app", *sys.argv[1:]]))
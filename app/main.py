@@ -1,4 +1,5 @@
-import uvicorn
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security.http import HTTPBearer
@@ -11,13 +12,78 @@ from app.controllers import (
     roomController,
     userRoleController,
     bookingController,
+    metricsController,
+    jwksController,
+    changeController,
 )
+# Registers the job handlers
+from app.services import jobHandlers
+from app.managers.availabilityManager import AvailabilityManager
+from app.managers.changeFeedManager import ChangeFeedManager
+from app.managers.databaseManager import DatabaseManager
+from app.managers.facetManager import FacetManager
+from app.managers.jobManager import JobManager
+from app.managers.searchIndexManager import SearchIndexManager
+from app.managers.sessionManager import SessionManager
+from app.middlewares.compressionMiddleware import CompressionMiddleware
+from app.middlewares.concurrencyMiddleware import ConcurrencyLimitMiddleware
+from app.middlewares.disconnectMiddleware import DisconnectMiddleware
+from app.middlewares.readYourWritesMiddleware import ReadYourWritesMiddleware
+from app.utils.responses import SchemaJSONResponse
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the connection pools and the S3 client and start the background loops per worker, stop them once requests are drained."""
+    db_manager = DatabaseManager()
+    await db_manager.warm_up()
+    session_manager = SessionManager()
+    await session_manager.warm_up()
+    job_manager = JobManager()
+    job_manager.start()
+    change_feed_manager = ChangeFeedManager()
+    change_feed_manager.start()
+    availability_manager = AvailabilityManager()
+    availability_manager.start()
+    facet_manager = FacetManager()
+    facet_manager.start()
+    search_index_manager = SearchIndexManager()
+    search_index_manager.start()
+
+    s3_manager = None
+    if os.getenv("BUCKET_NAME"):
+        from app.managers.s3Manager import S3Manager
+        s3_manager = S3Manager()
+        s3_manager.s3_client
+
+    yield
+
+    await search_index_manager.stop()
+    await facet_manager.stop()
+    await availability_manager.stop()
+    await change_feed_manager.stop()
+    await job_manager.stop()
+    await session_manager.stop()
+    if s3_manager is not None:
+        s3_manager.close()
+    await db_manager.close()
+
+app = FastAPI(default_response_class=SchemaJSONResponse, lifespan=lifespan)
 
 # Define allowed origins (CORS policy)
 origins = ["*"]
 
+# Innermost, so compressing a response counts in its latency for the concurrency limit
+app.add_middleware(CompressionMiddleware)
+
+# Marks the responses to writes whatever their status, a request failing after its commit did write
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Inside the concurrency limit, so a request cancelled on disconnect frees its slot at once
+app.add_middleware(DisconnectMiddleware)
+
+# Added before CORS so CORS, the outermost middleware, also decorates the 503 of shed requests
+app.add_middleware(ConcurrencyLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -35,6 +101,9 @@ app.include_router(hotelController.router)
 app.include_router(roomController.router)
 app.include_router(userRoleController.router)
 app.include_router(bookingController.router)
+app.include_router(metricsController.router)
+app.include_router(jwksController.router)
+app.include_router(changeController.router)
 
 @app.get("/")
 def root():
@@ -74,4 +143,6 @@ app.openapi = custom_openapi
 
 def start():
     """Launched with `poetry run start` at root level"""
+    import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
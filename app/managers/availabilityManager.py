@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+from sqlalchemy import Integer, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.managers.changeFeedManager import CHANGE_HEARTBEAT_SECONDS, ChangeFeedManager
+from app.utils.singleton import Singleton
+
+# Deltas a subscriber may fall behind by, past that it is told to reload instead
+AVAILABILITY_BUFFER_SIZE = int(os.getenv("AVAILABILITY_BUFFER_SIZE", "64"))
+# Open availability streams per process, more are refused with a 503
+AVAILABILITY_MAX_SUBSCRIBERS = int(os.getenv("AVAILABILITY_MAX_SUBSCRIBERS", "20000"))
+# Open availability streams per client address and process, more are refused with a 429
+AVAILABILITY_MAX_PER_CLIENT = int(os.getenv("AVAILABILITY_MAX_PER_CLIENT", "16"))
+# Booking changes read from the feed at once
+AVAILABILITY_BATCH_SIZE = 500
+
+RESYNC = "event: resync\ndata: {}\n\n"
+KEEP_ALIVE = ": keep-alive\n\n"
+
+logger = logging.getLogger(__name__)
+
+def _frame(operation: str, booking: dict, previous: Optional[dict] = None) -> str:
+    """SSE frame of a booking delta, with the room and dates an update replaced."""
+    delta = {
+        "operation": operation,
+        "booking_id": booking["id"],
+        "room_id": booking["room_id"],
+        "start_date": booking["start_date"],
+        "end_date": booking["end_date"],
+    }
+    if previous is not None:
+        delta["previous"] = {"room_id": previous["room_id"], "start_date": previous["start_date"], "end_date": previous["end_date"]}
+    return f"event: {operation}\ndata: {json.dumps(delta)}\n\n"
+
+class Subscription:
+    """An availability stream's buffer of SSE frames, bounded so one slow client never holds memory for the others."""
+
+    __slots__ = ("hotel_id", "client", "queue")
+
+    def __init__(self, hotel_id: int, client: str, buffer_size: int):
+        self.hotel_id = hotel_id
+        self.client = client
+        self.queue: asyncio.Queue = asyncio.Queue(buffer_size)
+
+class AvailabilityManager(metaclass=Singleton):
+    """
+    Pushes each hotel's booking changes to the availability streams open on this process.
+
+    One task per process follows the booking changes of the change feed, whichever process committed
+    them, while there is at least one subscriber. Each delta is serialized once and handed to the
+    subscribers of its hotel without waiting for them: a subscriber whose buffer is full loses its
+    pending deltas and gets a `resync` event, telling its client to reload the hotel's availability.
+
+    A booking moved to a room of another hotel leaves the availability of the first, as a `delete` of
+    its previous room and dates, and enters that of the second, as a `create`.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = AVAILABILITY_BUFFER_SIZE,
+        max_subscribers: int = AVAILABILITY_MAX_SUBSCRIBERS,
+        max_per_client: int = AVAILABILITY_MAX_PER_CLIENT,
+        heartbeat_seconds: float = CHANGE_HEARTBEAT_SECONDS,
+        engine=None,
+    ):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.max_per_client = max_per_client
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribers: Dict[int, Set[Subscription]] = {}
+        self.count = 0
+        self.clients: Dict[str, int] = {}
+        self.cursor: Optional[Tuple[int, int]] = None
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self._engine = engine
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = DatabaseManager().engine
+        return self._engine
+
+    def streams_of(self, client: str) -> int:
+        return self.clients.get(client, 0)
+
+    async def subscribe(self, hotel_id: int, client: str = "") -> Optional[Subscription]:
+        """
+        Open a subscription to a hotel's deltas for a client, None when this process or the client already
+        has too many open.
+        """
+        if self.count >= self.max_subscribers or self.streams_of(client) >= self.max_per_client:
+            return None
+        # Counted before reading the head, so concurrent requests of a client cannot all slip past the cap
+        subscription = Subscription(hotel_id, client, self.buffer_size)
+        self.subscribers.setdefault(hotel_id, set()).add(subscription)
+        self.count += 1
+        self.clients[client] = self.streams_of(client) + 1
+        if self.cursor is None:
+            # Nobody was following: start from the changes committed from now on
+            from app.services.changeService import ChangeService
+            try:
+                async with AsyncSession(self.engine) as db:
+                    cursor = await ChangeService.head(db)
+            except BaseException:
+                self.unsubscribe(subscription)
+                raise
+            if self.cursor is None:
+                self.cursor = cursor
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Close a subscription, closing it again is a no-op."""
+        subscribers = self.subscribers.get(subscription.hotel_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self.subscribers[subscription.hotel_id]
+        self.count -= 1
+        self.clients[subscription.client] -= 1
+        if not self.clients[subscription.client]:
+            del self.clients[subscription.client]
+
+    def publish(self, hotel_id: int, frame: str):
+        """Hand an SSE frame to every subscriber of the hotel, never waiting for a slow one."""
+        self.published += 1
+        for subscription in self.subscribers.get(hotel_id, ()):
+            queue = subscription.queue
+            try:
+                queue.put_nowait(frame)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        """The subscription's SSE frames, those already waiting sent at once, with keep-alive comments while idle."""
+        queue = subscription.queue
+        while True:
+            try:
+                frames = [await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)]
+            except asyncio.TimeoutError:
+                yield KEEP_ALIVE
+                continue
+            while not queue.empty():
+                frames.append(queue.get_nowait())
+            yield "".join(frames)
+
+    async def follow(self) -> int:
+        """Publish the booking changes committed since the cursor, return how many were read."""
+        from app.models.changeModel import Change
+        from app.models.roomModel import Room
+        from app.services.changeService import visible_after
+
+        cursor = self.cursor
+        if cursor is None:
+            return 0
+        PreviousRoom = aliased(Room)
+        query = (
+            select(
+                Change.txid, Change.id, Change.operation, Change.data, Change.previous,
+                Room.hotel_id, PreviousRoom.hotel_id.label("previous_hotel_id"),
+            )
+            .outerjoin(Room, Room.id == cast(Change.data["room_id"].astext, Integer))
+            .outerjoin(PreviousRoom, PreviousRoom.id == cast(Change.previous["room_id"].astext, Integer))
+            .where(Change.entity == "booking", *visible_after(cursor))
+            .order_by(Change.txid, Change.id)
+            .limit(AVAILABILITY_BATCH_SIZE)
+        )
+        async with AsyncSession(self.engine) as db:
+            rows = (await db.execute(query)).all()
+
+        for row in rows:
+            if row.data is None:
+                continue
+            # A room deleted since has no hotel, and no availability left to show
+            if row.previous_hotel_id is not None and row.previous_hotel_id != row.hotel_id:
+                # Moved to a room of another hotel: its dates are freed in the first and taken in the second
+                self.publish(row.previous_hotel_id, _frame("delete", row.previous))
+                if row.hotel_id is not None:
+                    self.publish(row.hotel_id, _frame("create", row.data))
+            elif row.hotel_id is not None:
+                self.publish(row.hotel_id, _frame(row.operation, row.data, row.previous))
+        if rows and self.cursor == cursor:
+            self.cursor = (rows[-1].txid, rows[-1].id)
+        return len(rows)
+
+    async def _follow_loop(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        feed_manager = ChangeFeedManager()
+        ticket = feed_manager.ticket()
+        while not self._stopping:
+            await feed_manager.wait(ticket, feed_manager.poll_interval)
+            ticket = feed_manager.ticket()
+            if not self.count:
+                self.cursor = None
+                continue
+            try:
+                while await self.follow() == AVAILABILITY_BATCH_SIZE:
+                    pass
+            except CONNECTION_ERRORS as e:
+                logger.warning("Availability streams cannot reach the database: %s", e)
+            except Exception:
+                logger.exception("Availability follower error")
+
+    def start(self):
+        """Start following the change feed on the running loop, once."""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._follow_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "subscribers": self.count,
+            "clients": len(self.clients),
+            "hotels": len(self.subscribers),
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import delete, func
+from app.utils.singleton import Singleton
+
+# How often waiting consumers look for changes committed by other processes
+CHANGE_POLL_INTERVAL = float(os.getenv("CHANGE_POLL_INTERVAL", "1"))
+# Comment line sent on idle event streams so proxies keep them open
+CHANGE_HEARTBEAT_SECONDS = float(os.getenv("CHANGE_HEARTBEAT_SECONDS", "15"))
+# Changes are deleted once older than this: a consumer whose cursor is older may have missed some
+CHANGE_RETENTION = float(os.getenv("CHANGE_RETENTION", "604800"))
+# How often each process deletes the changes past their retention
+CHANGE_PURGE_INTERVAL = float(os.getenv("CHANGE_PURGE_INTERVAL", "3600"))
+
+# Operation of a change telling the in-memory followers of an entity to load it again from a scan,
+# written by bulk loads that record no change per row
+RELOAD = "reload"
+
+logger = logging.getLogger(__name__)
+
+class ChangeFeedManager(metaclass=Singleton):
+    """
+    Wakes the change feed's long-polls and event streams of this process when one of its transactions
+    recording changes commits. Changes committed by other processes are picked up every `poll_interval`.
+
+    Changes older than `retention_seconds` are deleted every `purge_interval`, so the feed does not
+    grow with every write ever made.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = CHANGE_POLL_INTERVAL,
+        retention_seconds: float = CHANGE_RETENTION,
+        purge_interval: float = CHANGE_PURGE_INTERVAL,
+        engine=None,
+    ):
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.purge_interval = purge_interval
+        self.purged = 0
+        self._engine = engine
+        self._committed = asyncio.Event()
+        self._purge_task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = DatabaseManager().engine
+        return self._engine
+
+    def ticket(self) -> asyncio.Event:
+        """Take before reading the feed, so a commit landing between the read and the wait is not missed."""
+        return self._committed
+
+    def notify(self):
+        self._committed.set()
+        self._committed = asyncio.Event()
+
+    async def wait(self, ticket: asyncio.Event, timeout: float):
+        """Wait for a commit since `ticket` was taken, for at most `timeout` and one poll interval."""
+        try:
+            await asyncio.wait_for(ticket.wait(), timeout=min(timeout, self.poll_interval))
+        except asyncio.TimeoutError:
+            pass
+
+    async def purge(self) -> int:
+        """Delete the changes older than the retention period, return how many."""
+        from app.models.changeModel import Change
+
+        async with self.engine.begin() as connection:
+            result = await connection.execute(
+                delete(Change).where(Change.created_at < func.now() - timedelta(seconds=self.retention_seconds))
+            )
+        self.purged += result.rowcount
+        return result.rowcount
+
+    async def _purge_loop(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except CONNECTION_ERRORS as e:
+                logger.warning("Could not purge old changes: %s", e)
+            except Exception:
+                logger.exception("Change purge error")
+
+    def start(self):
+        """Start purging old changes on the running loop, once."""
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.get_running_loop().create_task(self._purge_loop())
+
+    async def stop(self):
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
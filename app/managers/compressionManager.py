@@ -0,0 +1,190 @@
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import anyio
+import brotli
+import zstandard
+from app.utils.singleton import Singleton
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies go out as they are: compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies from this size are compressed in a worker thread, zlib, brotli and zstandard release the GIL:
+# compressing a 2 MiB list takes 9 to 50 ms the event loop spends serving the other requests instead
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(64 * 1024)))
+# Compressed bodies of public responses kept per worker, in bytes
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Levels cheap enough to compress on every request, the highest ones are for static assets
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Preferred first when the client accepts several equally
+ENCODINGS = ("zstd", "br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Sent as they are produced: a compressor would hold the events back
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to answer with given an Accept-Encoding header, the highest q-value first, None for identity."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    wildcard = weights.get("*", 0.0)
+    chosen, chosen_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, wildcard)
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+def compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+class StreamCompressor:
+    """Compresses a body chunk by chunk; `finish` returns what is left once the last chunk is in."""
+
+    def __init__(self, encoding: str):
+        if encoding == "gzip":
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._finish = compressor.compress, compressor.flush
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._finish = compressor.process, compressor.finish
+        else:
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._compress, self._finish = compressor.compress, compressor.flush
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def compress(self, chunk: bytes) -> bytes:
+        compressed = self._compress(chunk)
+        self.bytes_in += len(chunk)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def finish(self) -> bytes:
+        compressed = self._finish()
+        self.bytes_out += len(compressed)
+        return compressed
+
+class CompressionManager(metaclass=Singleton):
+    """
+    Compresses response bodies and keeps the compressed bodies of public responses.
+
+    Entries are keyed by encoding and the digest of the uncompressed body, so a hot hotel page is
+    compressed once and served from the cache as long as it renders the same bytes; once it changes,
+    its digest does too and the stale entry ages out of the LRU. Hashing a body costs a fraction of
+    compressing it with brotli or gzip, and about half as much as zstd. Responses to authenticated
+    requests are compressed but never kept. Large bodies are compressed in a worker thread, the cache
+    itself is only read and written on the event loop.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = COMPRESSION_ENABLED,
+        min_size: int = COMPRESSION_MIN_SIZE,
+        cache_bytes: int = COMPRESSION_CACHE_BYTES,
+        thread_min_size: int = COMPRESSION_THREAD_MIN_SIZE,
+    ):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.thread_min_size = thread_min_size
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._compressors: Dict[str, Callable[[bytes], bytes]] = {
+            "gzip": lambda body: zlib.compress(body, GZIP_LEVEL, wbits=16 + zlib.MAX_WBITS),
+            "br": lambda body: brotli.compress(body, quality=BROTLI_QUALITY),
+            # A compressor per body: a ZstdCompressor may not be used by two threads at once
+            "zstd": lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body),
+        }
+        self.responses: Dict[str, int] = {encoding: 0 for encoding in ENCODINGS}
+        self.streams = 0
+        self.threaded = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def _run(self, compress: Callable[[bytes], bytes], data: bytes) -> bytes:
+        """Compress `data` on the event loop, or in a worker thread from `thread_min_size` on."""
+        if len(data) < self.thread_min_size:
+            return compress(data)
+        self.threaded += 1
+        return await anyio.to_thread.run_sync(compress, data)
+
+    async def compress(self, body: bytes, encoding: str, cache: bool = False) -> bytes:
+        """The body compressed with `encoding`, from the cache of public responses when `cache` is set."""
+        self.responses[encoding] += 1
+        self.bytes_in += len(body)
+        if not cache:
+            compressed = await self._run(self._compressors[encoding], body)
+            self.bytes_out += len(compressed)
+            return compressed
+
+        # SHA-256 runs on the CPU's SHA extensions, twice as fast as blake2b here
+        key = (encoding, hashlib.sha256(body).digest())
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            compressed = await self._run(self._compressors[encoding], body)
+            # The cache is only touched on the event loop, a concurrent miss may have filled the entry
+            if key not in self._cache and len(compressed) <= self.cache_bytes:
+                self._cache[key] = compressed
+                self._cached_bytes += len(compressed)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    async def compress_chunk(self, compressor: StreamCompressor, chunk: bytes) -> bytes:
+        """A chunk of a streamed body, large chunks compressed in a worker thread like whole bodies."""
+        return await self._run(compressor.compress, chunk)
+
+    def stream(self, encoding: str) -> StreamCompressor:
+        self.responses[encoding] += 1
+        self.streams += 1
+        return StreamCompressor(encoding)
+
+    def streamed(self, compressor: StreamCompressor):
+        """Count the bytes of a finished stream."""
+        self.bytes_in += compressor.bytes_in
+        self.bytes_out += compressor.bytes_out
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "min_size": self.min_size,
+            "responses": dict(self.responses),
+            "streams": self.streams,
+            "threaded": self.threaded,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "cached": len(self._cache),
+            "cached_bytes": self._cached_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.utils.singleton import Singleton
+
+CONCURRENCY_LIMIT_ENABLED = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+CONCURRENCY_INITIAL_LIMIT = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "20"))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "4"))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "200"))
+# Waiting requests of the highest class, lower classes get half as many places and half the wait each
+CONCURRENCY_MAX_QUEUE = int(os.getenv("CONCURRENCY_MAX_QUEUE", "100"))
+CONCURRENCY_MAX_WAIT = float(os.getenv("CONCURRENCY_MAX_WAIT", "1.0"))
+
+# Priority classes, lower is served first
+PRIORITY_CRITICAL = 0  # bookings
+PRIORITY_STANDARD = 1  # searches and everything else
+PRIORITY_LOW = 2       # admin listings and bulk imports
+PRIORITY_NAMES = {PRIORITY_CRITICAL: "critical", PRIORITY_STANDARD: "standard", PRIORITY_LOW: "low"}
+
+ADMIN_LISTINGS = {"/users/", "/user-roles/{user_id}"}
+BULK_WRITES = {"/hotels/import"}
+
+def route_priority(method: str, route_path: str) -> int:
+    """Priority class of a route, from its method and path template."""
+    if route_path == "/bookings" or route_path.startswith("/bookings/"):
+        return PRIORITY_CRITICAL
+    if method == "GET" and route_path in ADMIN_LISTINGS or method == "POST" and route_path in BULK_WRITES:
+        return PRIORITY_LOW
+    return PRIORITY_STANDARD
+
+class AIMDLimit:
+    """
+    Concurrency limit driven by latency, with additive increase and multiplicative decrease.
+
+    Latency only says something about the limit while at least half of it is in use. Then a request
+    slower than `tolerance` times the no-load latency of its route shrinks the limit by `backoff`, at
+    most once per `decrease_interval` so one slow burst only counts once, and any other request grows
+    it by one per limit's worth of completed requests.
+    """
+
+    def __init__(
+        self,
+        initial: int = CONCURRENCY_INITIAL_LIMIT,
+        minimum: int = CONCURRENCY_MIN_LIMIT,
+        maximum: int = CONCURRENCY_MAX_LIMIT,
+        backoff: float = 0.9,
+        tolerance: float = 2.0,
+        decrease_interval: float = 0.1,
+        clock=time.monotonic,
+    ):
+        self.value = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.decrease_interval = decrease_interval
+        self.clock = clock
+        self._last_decrease = float("-inf")
+
+    def saturated(self, in_flight: int) -> bool:
+        return in_flight >= self.value / 2
+
+    def update(self, latency: float, baseline: float, in_flight: int):
+        if not self.saturated(in_flight):
+            return
+        if latency > baseline * self.tolerance:
+            now = self.clock()
+            if now - self._last_decrease >= self.decrease_interval:
+                self.value = max(self.minimum, self.value * self.backoff)
+                self._last_decrease = now
+        else:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+
+@dataclass
+class RouteMetrics:
+    priority: int
+    in_flight: int = 0
+    queued: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    total_latency: float = 0.0
+    baseline: Optional[float] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "priority": PRIORITY_NAMES[self.priority],
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 3) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_latency_ms": round(self.total_latency / self.completed * 1000, 3) if self.completed else 0.0,
+            "baseline_ms": round(self.baseline * 1000, 3) if self.baseline is not None else None,
+        }
+
+class ConcurrencyManager(metaclass=Singleton):
+    """
+    Bounds the requests in flight and sheds the excess, lowest priority first.
+
+    Requests beyond the adaptive limit wait in a priority queue; a class whose queue is full, or a
+    request waiting longer than its class allows, is rejected straight away so clients can retry
+    elsewhere instead of piling up on the database pool.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[AIMDLimit] = None,
+        max_queue: int = CONCURRENCY_MAX_QUEUE,
+        max_wait: float = CONCURRENCY_MAX_WAIT,
+        enabled: bool = CONCURRENCY_LIMIT_ENABLED,
+        clock=time.monotonic,
+    ):
+        self.limit = limit or AIMDLimit(clock=clock)
+        self.enabled = enabled
+        self.clock = clock
+        self.max_queue = {priority: max(max_queue >> priority, 1) for priority in PRIORITY_NAMES}
+        self.max_wait = {priority: max_wait / 2 ** priority for priority in PRIORITY_NAMES}
+        self.in_flight = 0
+        self.routes: Dict[str, RouteMetrics] = {}
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def route(self, key: str, priority: int) -> RouteMetrics:
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(priority=priority)
+        return metrics
+
+    def _admit(self, metrics: RouteMetrics, waited: float):
+        metrics.in_flight += 1
+        metrics.admitted += 1
+        metrics.total_wait += waited
+        metrics.max_wait = max(metrics.max_wait, waited)
+
+    async def acquire(self, metrics: RouteMetrics) -> bool:
+        """Wait for a slot, return False when the request is shed."""
+        priority = metrics.priority
+        # Cancelled waiters stay in the heap until popped, the counters only hold live ones
+        if self.in_flight < self.limit.value and not any(self._queued.values()):
+            self.in_flight += 1
+            self._admit(metrics, 0.0)
+            return True
+
+        if self._queued[priority] >= self.max_queue[priority]:
+            metrics.rejected += 1
+            return False
+
+        started = self.clock()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued[priority] += 1
+        metrics.queued += 1
+        try:
+            await asyncio.wait({future}, timeout=self.max_wait[priority])
+        except BaseException:
+            # Client gone while waiting: hand the slot on if it was granted meanwhile
+            self._dequeue(priority, metrics, future)
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            future.cancel()
+            raise
+
+        self._dequeue(priority, metrics, future)
+        if not future.done():
+            future.cancel()
+            metrics.rejected += 1
+            return False
+        self._admit(metrics, self.clock() - started)
+        return True
+
+    def _dequeue(self, priority: int, metrics: RouteMetrics, future: asyncio.Future):
+        if not future.done():
+            self._queued[priority] -= 1
+        metrics.queued -= 1
+
+    def release(self, metrics: RouteMetrics, latency: float, sampled: bool = True):
+        """
+        Free a slot, feed the request's latency to the limit unless it is not `sampled`, and admit the
+        next waiters.
+        """
+        metrics.in_flight -= 1
+        metrics.completed += 1
+        metrics.total_latency += latency
+        if sampled:
+            # The no-load latency of the route is learnt from requests completed while the limit is not saturated
+            if metrics.baseline is None:
+                metrics.baseline = latency
+            elif not self.limit.saturated(self.in_flight):
+                metrics.baseline += (latency - metrics.baseline) * 0.1
+            self.limit.update(latency, metrics.baseline, self.in_flight)
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit.value:
+            priority, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued[priority] -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    def retry_after(self, priority: int) -> int:
+        return max(int(self.max_wait[priority] + 0.999), 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit.value, 2),
+            "in_flight": self.in_flight,
+            "queued": {PRIORITY_NAMES[priority]: count for priority, count in self._queued.items()},
+            "routes": {key: metrics.snapshot() for key, metrics in sorted(self.routes.items())},
+        }
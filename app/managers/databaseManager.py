@@ -1,11 +1,24 @@
+import asyncio
+import logging
+import math
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from fastapi import HTTPException, Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from databases import Database
-import os
-from dotenv import load_dotenv
+from pathlib import Path
+from app.managers.queryTimeoutManager import DB_STATEMENT_TIMEOUT, QueryTimeoutManager, statement_timed_out
 
-load_dotenv()
+# Load the repository's .env when there is one, deployments passing a real environment skip python-dotenv entirely
+DOTENV_PATH = Path(__file__).resolve().parents[2] / ".env"
+if DOTENV_PATH.is_file():
+    from dotenv import load_dotenv
+    load_dotenv(DOTENV_PATH)
 
 ENV = os.getenv("ENV")
 if ENV == "PROD":
@@ -13,11 +26,151 @@ if ENV == "PROD":
 else:
     DATABASE_URL = os.getenv("TEST_DATABASE_URL")
 
+# Comma-separated list of read replica URLs, reads go to the primary when empty
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a client keeps reading from the primary after one of its own writes
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Cookie set on the responses to writes, holding the time of the write in milliseconds
+READ_YOUR_WRITES_COOKIE = "last_write"
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+DB_ECHO = os.getenv("DB_ECHO", "true").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+# Applied by Postgres to every statement of the pooled connections, without a round trip per query
+SERVER_SETTINGS = {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}
+
 Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+@dataclass(eq=False)
+class Replica:
+    """A read replica with its own engine and health state."""
+    url: str
+    engine: AsyncEngine
+    async_session: sessionmaker
+    healthy: bool = True
+    lag: Optional[float] = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "Replica":
+        engine = create_async_engine(
+            url, echo=DB_ECHO, pool_pre_ping=True, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+            connect_args={"server_settings": SERVER_SETTINGS},
+        )
+        return cls(url=url, engine=engine, async_session=sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+
+class ReplicaRouter:
+    """
+    Routes reads across healthy replicas in round-robin.
+
+    A client that just wrote keeps reading from the primary for `stickiness_seconds`, so it sees its own
+    writes despite replication lag. The time of its write travels with the client in a cookie, so the
+    reads stick to the primary on whichever worker or process serves them. Replicas failing a health check, lagging too far behind or raising a
+    connection error are skipped until a later check succeeds; with no healthy replica reads fail over to
+    the primary.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        stickiness_seconds: float = READ_YOUR_WRITES_SECONDS,
+        health_check_interval: float = REPLICA_HEALTH_CHECK_INTERVAL,
+        max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+    ):
+        self.replicas = replicas
+        self.stickiness_seconds = stickiness_seconds
+        self.health_check_interval = health_check_interval
+        self.max_lag_seconds = max_lag_seconds
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    def write_cookie(self) -> str:
+        """Set-Cookie header of a response to a write, pinning its client to the primary for the stickiness window."""
+        return (
+            f"{READ_YOUR_WRITES_COOKIE}={int(time.time() * 1000)}; Max-Age={math.ceil(self.stickiness_seconds)}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    def recently_wrote(self, last_write: Optional[str]) -> bool:
+        """Whether the time of a client's last write, in milliseconds from its cookie, is within the stickiness window."""
+        try:
+            elapsed = time.time() - int(last_write) / 1000
+        except (TypeError, ValueError):
+            return False
+        # Other hosts' clocks may run a little ahead, a write further in the future is ignored
+        return -self.stickiness_seconds < elapsed < self.stickiness_seconds
+
+    def pick(self, last_write: Optional[str] = None) -> Optional[Replica]:
+        """Return the replica to read from, or None to read from the primary."""
+        if not self.replicas or self.recently_wrote(last_write):
+            return None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    def mark_unhealthy(self, replica: Replica):
+        if replica.healthy:
+            logger.warning("Read replica %s marked unhealthy, reads fail over", replica.engine.url.host)
+        replica.healthy = False
+
+    async def check_replica(self, replica: Replica) -> bool:
+        """Probe a replica and record whether it can serve reads."""
+        try:
+            async with replica.engine.connect() as connection:
+                result = await asyncio.wait_for(connection.execute(text(
+                    "SELECT CASE WHEN pg_is_in_recovery() "
+                    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                    "ELSE 0 END"
+                )), timeout=self.health_check_interval)
+                replica.lag = float(result.scalar())
+        except (*CONNECTION_ERRORS, DBAPIError):
+            self.mark_unhealthy(replica)
+            return False
+
+        if replica.lag > self.max_lag_seconds:
+            self.mark_unhealthy(replica)
+            return False
+        if not replica.healthy:
+            logger.info("Read replica %s is healthy again", replica.engine.url.host)
+        replica.healthy = True
+        return True
+
+    async def check_health(self):
+        await asyncio.gather(*(self.check_replica(replica) for replica in self.replicas))
+
+    async def _health_loop(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_check_interval)
+
+    def start(self):
+        """Start the background health checks on the running loop, once."""
+        if self.replicas and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def dispose(self):
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
 
 class DatabaseManager:
     _instance = None
-    
+
     def __new__(cls):
         """Singleton pattern for managing database connections."""
         if cls._instance is None:
@@ -28,13 +181,17 @@ class DatabaseManager:
             if not db_url:
                 raise ValueError("DATABASE_URL is not set")
 
-            cls._instance.engine = create_async_engine(db_url, echo=True)
+            cls._instance.engine = create_async_engine(
+                db_url, echo=DB_ECHO, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                connect_args={"server_settings": SERVER_SETTINGS},
+            )
             cls._instance.async_session = sessionmaker(
                 cls._instance.engine,
                 class_=AsyncSession,
                 expire_on_commit=False
             )
             cls._instance.database = Database(db_url)
+            cls._instance.replica_router = ReplicaRouter([Replica.from_url(url) for url in READ_REPLICA_URLS])
 
         return cls._instance
 
@@ -48,8 +205,87 @@ class DatabaseManager:
         if self.database.is_connected:
             await self.database.disconnect()
 
-async def get_db():
+    def dedicated_engine(self) -> AsyncEngine:
+        """
+        An engine of one connection to the primary, for a background task of its own: a scan taking
+        seconds at startup would hold a request connection out of the pool for as long.
+        """
+        return create_async_engine(self.engine.url, pool_size=1, max_overflow=0)
+
+    async def warm_up(self, connections: int = DB_POOL_SIZE):
+        """Open the pools' connections at startup so the first requests do not pay for them."""
+        engines = [self.engine] + [replica.engine for replica in self.replica_router.replicas]
+        opened = await asyncio.gather(
+            *(engine.connect().start() for engine in engines for _ in range(connections)),
+            return_exceptions=True,
+        )
+        for connection in opened:
+            if isinstance(connection, BaseException):
+                if not isinstance(connection, CONNECTION_ERRORS):
+                    raise connection
+                logger.warning("Could not open a pooled connection at startup: %s", connection)
+            else:
+                await connection.close()
+
+        await self.replica_router.check_health()
+        self.replica_router.start()
+
+    async def close(self):
+        """Close every pool once in-flight requests are drained."""
+        await self.replica_router.dispose()
+        await self.disconnect()
+        await self.engine.dispose()
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    """Run the transactions of a request session under its route's statement timeout."""
+    timeout = session.info.get("statement_timeout")
+    if timeout is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+def _route_path(request: Request) -> str:
+    route = request.scope.get("route")
+    return route.path if route is not None else request.url.path
+
+def _with_statement_timeout(request: Request, session: AsyncSession) -> AsyncSession:
+    timeout = QueryTimeoutManager().timeout_for(_route_path(request))
+    if timeout is not None:
+        session.info["statement_timeout"] = timeout
+    return session
+
+def _gateway_timeout(request: Request) -> HTTPException:
+    QueryTimeoutManager().timed_out(_route_path(request))
+    return HTTPException(status_code=504, detail="Query took too long, retry later")
+
+async def get_db(request: Request):
     """Dependency for getting a DB session with optional parameter."""
+    async with DatabaseManager().async_session() as session:
+        try:
+            yield _with_statement_timeout(request, session)
+        except DBAPIError as error:
+            if statement_timed_out(error):
+                raise _gateway_timeout(request) from error
+            raise
+
+async def get_read_db(request: Request):
+    """Dependency for read-only routes: a replica session when one is healthy, the primary otherwise."""
     db_manager = DatabaseManager()
-    async with db_manager.async_session() as session:
-        yield session
\ No newline at end of file
+    router = db_manager.replica_router
+    router.start()
+
+    replica = router.pick(request.cookies.get(READ_YOUR_WRITES_COOKIE))
+    session_factory = replica.async_session if replica else db_manager.async_session
+    async with session_factory() as session:
+        try:
+            yield _with_statement_timeout(request, session)
+        except DBAPIError as error:
+            # A statement out of time says nothing about the replica's health
+            if statement_timed_out(error):
+                raise _gateway_timeout(request) from error
+            if replica and isinstance(error, CONNECTION_ERRORS):
+                router.mark_unhealthy(replica)
+            raise
+        except CONNECTION_ERRORS:
+            if replica:
+                router.mark_unhealthy(replica)
+            raise
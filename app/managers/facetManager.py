@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.changeFeedManager import RELOAD, ChangeFeedManager
+from app.utils.singleton import Singleton
+
+# Keep facet counts in memory, otherwise every faceted search counts with a grouped query
+FACETS_ENABLED = os.getenv("FACETS_ENABLED", "true").lower() == "true"
+# Hotels read at once while loading, and changes while following the feed
+FACET_BATCH_SIZE = 5000
+
+FACETS = ("rating", "breakfast", "city", "price")
+# Ratings go from 0 to 5, a 5 counting in the last bucket
+RATING_BUCKETS = ("0-1", "1-2", "2-3", "3-4", "4-5")
+UNRATED = "unrated"
+# A hotel's price is that of its cheapest room
+PRICE_BOUNDS = (50, 100, 200, 500)
+PRICE_BUCKETS = ("0-50", "50-100", "100-200", "200-500", "500+")
+NO_ROOMS = "no-rooms"
+
+RATING_VALUES = RATING_BUCKETS + (UNRATED,)
+BREAKFAST_VALUES = ("false", "true")
+PRICE_VALUES = PRICE_BUCKETS + (NO_ROOMS,)
+
+logger = logging.getLogger(__name__)
+
+def rating_bucket(rating: Optional[Decimal]) -> int:
+    return len(RATING_BUCKETS) if rating is None else min(int(rating), len(RATING_BUCKETS) - 1)
+
+def price_bucket(price: Optional[Decimal]) -> int:
+    return len(PRICE_BUCKETS) if price is None else bisect_right(PRICE_BOUNDS, price)
+
+class FacetManager(metaclass=Singleton):
+    """
+    Counts of hotels per rating, breakfast, city and price bucket, kept in memory.
+
+    Hotels sharing the same four values make one combination: the counts per combination are all a
+    faceted search needs, and there are only as many as there are distinct values combined, not as
+    many as hotels. Each hotel's combination is kept packed in one integer of an array indexed by
+    hotel id, to move it when the hotel changes. The counts are loaded from a scan at startup, then
+    follow the hotel and room changes of the change feed, whichever process made them.
+    """
+
+    def __init__(self, enabled: bool = FACETS_ENABLED, engine=None):
+        self.enabled = enabled
+        self.ready = False
+        self.cursor: Optional[Tuple[int, int]] = None
+        self.cities: List[str] = []
+        self.city_codes: Dict[str, int] = {}
+        # Packed combination per hotel id, -1 for no hotel
+        self.combinations = array("i")
+        self.counts: Counter = Counter()
+        self.hotels = 0
+        self.load_seconds = 0.0
+        self._engine = engine
+        self._own_engine = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = self._own_engine = DatabaseManager().dedicated_engine()
+        return self._engine
+
+    @staticmethod
+    def _pack(rating: int, breakfast: bool, city: int, price: int) -> int:
+        return (((city + 1) * len(RATING_VALUES) + rating) * 2 + breakfast) * len(PRICE_VALUES) + price
+
+    @staticmethod
+    def _unpack(combination: int) -> Tuple[int, int, int, int]:
+        rest, price = divmod(combination, len(PRICE_VALUES))
+        rest, breakfast = divmod(rest, 2)
+        city, rating = divmod(rest, len(RATING_VALUES))
+        return rating, breakfast, city - 1, price
+
+    def _city_code(self, city: Optional[str]) -> int:
+        if city is None:
+            return -1
+        code = self.city_codes.get(city)
+        if code is None:
+            code = self.city_codes[city] = len(self.cities)
+            self.cities.append(city)
+        return code
+
+    def _move(self, hotel_id: int, combination: int):
+        if hotel_id >= len(self.combinations):
+            self.combinations.extend([-1] * (hotel_id + 1 - len(self.combinations)))
+        previous = self.combinations[hotel_id]
+        if previous >= 0:
+            self.counts[previous] -= 1
+            if not self.counts[previous]:
+                del self.counts[previous]
+            self.hotels -= 1
+        self.combinations[hotel_id] = combination
+        if combination >= 0:
+            self.counts[combination] += 1
+            self.hotels += 1
+
+    def _current(self, hotel_id: int) -> int:
+        return self.combinations[hotel_id] if hotel_id < len(self.combinations) else -1
+
+    def set_hotel(self, hotel_id: int, rating: Optional[Decimal], breakfast: bool, city: Optional[str], price: Optional[int] = None):
+        """Place a hotel, keeping its price bucket unless the bucket `price` is given: hotel changes do not carry it."""
+        if price is None:
+            current = self._current(hotel_id)
+            price = self._unpack(current)[3] if current >= 0 else len(PRICE_BUCKETS)
+        self._move(hotel_id, self._pack(rating_bucket(rating), bool(breakfast), self._city_code(city), price))
+
+    def set_price(self, hotel_id: int, price: Optional[Decimal]):
+        """Move a hotel to the bucket of its cheapest room, a hotel unknown here is left out."""
+        current = self._current(hotel_id)
+        if current >= 0:
+            rating, breakfast, city, _ = self._unpack(current)
+            self._move(hotel_id, self._pack(rating, breakfast, city, price_bucket(price)))
+
+    def remove_hotel(self, hotel_id: int):
+        if self._current(hotel_id) >= 0:
+            self._move(hotel_id, -1)
+
+    def _allowed(self, filters: Dict[str, Iterable[str]]) -> List[Optional[Set[int]]]:
+        """Codes accepted per facet, None for a facet not filtered on."""
+        values = {
+            "rating": RATING_VALUES,
+            "breakfast": BREAKFAST_VALUES,
+            "price": PRICE_VALUES,
+        }
+        allowed = []
+        for facet in FACETS:
+            selected = filters.get(facet)
+            if not selected:
+                allowed.append(None)
+            elif facet == "city":
+                allowed.append({self.city_codes[city] for city in selected if city in self.city_codes})
+            else:
+                allowed.append({values[facet].index(value) for value in selected if value in values[facet]})
+        return allowed
+
+    def count(self, filters: Dict[str, Iterable[str]]) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """
+        Hotels matching the filters, and per facet the hotels each of its values would match: the
+        filters on the other facets apply, not the facet's own, so selecting a value keeps the
+        counts of its alternatives.
+        """
+        allowed = self._allowed(filters)
+        totals = [Counter() for _ in FACETS]
+        matching = 0
+        for combination, count in self.counts.items():
+            codes = self._unpack(combination)
+            failed = [index for index, codes_allowed in enumerate(allowed) if codes_allowed is not None and codes[index] not in codes_allowed]
+            if not failed:
+                matching += count
+                for index, code in enumerate(codes):
+                    totals[index][code] += count
+            elif len(failed) == 1:
+                totals[failed[0]][codes[failed[0]]] += count
+
+        labels = {
+            "rating": lambda code: RATING_VALUES[code],
+            "breakfast": lambda code: BREAKFAST_VALUES[code],
+            "city": lambda code: self.cities[code] if code >= 0 else None,
+            "price": lambda code: PRICE_VALUES[code],
+        }
+        facets = {}
+        for facet, counts in zip(FACETS, totals):
+            facets[facet] = {labels[facet](code): count for code, count in counts.items() if labels[facet](code) is not None}
+        return matching, facets
+
+    async def load(self):
+        """Count every hotel from a streamed scan, then follow the changes made since it began."""
+        from app.models.hotelModel import Hotel
+        from app.models.roomModel import Room
+        from app.services.changeService import ChangeService
+
+        started = asyncio.get_running_loop().time()
+        prices = select(Room.hotel_id, func.min(Room.price).label("price")).group_by(Room.hotel_id).subquery()
+        query = (
+            select(Hotel.id, Hotel.rating, Hotel.breakfast, Hotel.city, prices.c.price)
+            .outerjoin(prices, prices.c.hotel_id == Hotel.id)
+            .execution_options(yield_per=FACET_BATCH_SIZE)
+        )
+        async with AsyncSession(self.engine) as db:
+            # Changes committed during the scan are replayed over it, which places their hotels again
+            cursor = await ChangeService.head(db)
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                for row in rows:
+                    self.set_hotel(row.id, row.rating, row.breakfast, row.city, price_bucket(row.price))
+        self.cursor = cursor
+        self.ready = True
+        self.load_seconds = asyncio.get_running_loop().time() - started
+
+    async def reload(self):
+        """Count every hotel again from a scan, searches fall back to SQL meanwhile."""
+        self.ready = False
+        self.cities, self.city_codes = [], {}
+        self.combinations, self.counts, self.hotels = array("i"), Counter(), 0
+        await self.load()
+
+    async def follow(self) -> int:
+        """Apply the hotel and room changes committed since the cursor, return how many were read."""
+        from app.models.changeModel import Change
+        from app.models.roomModel import Room
+        from app.services.changeService import visible_after
+
+        cursor = self.cursor
+        if cursor is None:
+            return 0
+        query = (
+            select(Change.txid, Change.id, Change.entity, Change.entity_id, Change.operation, Change.data)
+            .where(Change.entity.in_(("hotel", "room")), *visible_after(cursor))
+            .order_by(Change.txid, Change.id)
+            .limit(FACET_BATCH_SIZE)
+        )
+        async with AsyncSession(self.engine) as db:
+            rows = (await db.execute(query)).all()
+            if any(row.operation == RELOAD for row in rows):
+                await self.reload()
+                return 0
+
+            repriced = set()
+            for row in rows:
+                if row.entity == "hotel":
+                    if row.operation == "delete":
+                        self.remove_hotel(row.entity_id)
+                    else:
+                        rating = row.data["rating"]
+                        self.set_hotel(row.entity_id, Decimal(str(rating)) if rating is not None else None, row.data["breakfast"], row.data.get("city"))
+                elif row.data is not None:
+                    repriced.add(row.data["hotel_id"])
+
+            if repriced:
+                # The cheapest room of a hotel may have been the one changed: read its price again
+                prices = dict((await db.execute(
+                    select(Room.hotel_id, func.min(Room.price)).where(Room.hotel_id.in_(repriced)).group_by(Room.hotel_id)
+                )).all())
+                for hotel_id in repriced:
+                    self.set_price(hotel_id, prices.get(hotel_id))
+
+        if rows and self.cursor == cursor:
+            self.cursor = (rows[-1].txid, rows[-1].id)
+        return len(rows)
+
+    async def _follow_loop(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        feed_manager = ChangeFeedManager()
+        while not self._stopping and not self.ready:
+            try:
+                await self.load()
+            except CONNECTION_ERRORS as e:
+                logger.warning("Facet counts cannot reach the database: %s", e)
+                await asyncio.sleep(feed_manager.poll_interval)
+
+        ticket = feed_manager.ticket()
+        while not self._stopping:
+            await feed_manager.wait(ticket, feed_manager.poll_interval)
+            ticket = feed_manager.ticket()
+            try:
+                while await self.follow() == FACET_BATCH_SIZE:
+                    pass
+            except CONNECTION_ERRORS as e:
+                logger.warning("Facet counts cannot reach the database: %s", e)
+            except Exception:
+                logger.exception("Facet follower error")
+
+    def start(self):
+        """Load the counts and follow the change feed on the running loop, once."""
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._follow_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._own_engine is not None:
+            await self._own_engine.dispose()
+            self._engine = self._own_engine = None
+
+    def snapshot(self) -> dict:
+        memory = (
+            self.combinations.buffer_info()[1] * self.combinations.itemsize
+            + sys.getsizeof(self.counts) + sys.getsizeof(self.city_codes) + sys.getsizeof(self.cities)
+            + sum(sys.getsizeof(city) for city in self.cities)
+        )
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "hotels": self.hotels,
+            "combinations": len(self.counts),
+            "cities": len(self.cities),
+            "memory_bytes": memory,
+            "load_seconds": round(self.load_seconds, 3),
+        }
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from app.utils.singleton import Singleton
+
+# Nominatim-compatible search endpoint hotel addresses are geocoded with, geocoding is off without it
+GEOCODER_URL = os.getenv("GEOCODER_URL")
+# Requests in flight to the geocoder at once, per process
+GEOCODER_CONCURRENCY = int(os.getenv("GEOCODER_CONCURRENCY", "4"))
+GEOCODER_TIMEOUT = float(os.getenv("GEOCODER_TIMEOUT", "5"))
+# Addresses whose answer is kept in memory, most imports repeat the same few streets and cities
+GEOCODER_CACHE_SIZE = int(os.getenv("GEOCODER_CACHE_SIZE", "10000"))
+
+Coordinates = Tuple[float, float]
+
+logger = logging.getLogger(__name__)
+
+class GeocodingManager(metaclass=Singleton):
+    """
+    Turns hotel addresses into coordinates when hotels are written, so nearby searches never have to.
+
+    Answers are cached per normalized address, an address the geocoder does not know included. A
+    failed request is not cached: the hotel keeps no coordinates and the next write retries.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = GEOCODER_URL,
+        concurrency: int = GEOCODER_CONCURRENCY,
+        timeout: float = GEOCODER_TIMEOUT,
+        cache_size: int = GEOCODER_CACHE_SIZE,
+        fetch: Optional[Callable[[str], Optional[Coordinates]]] = None,
+    ):
+        self.url = url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache_size = cache_size
+        # Blocking lookup of one address, run in a thread
+        self.fetch = fetch or self._fetch
+        self.cache: "OrderedDict[str, Optional[Coordinates]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.hits = 0
+        self.failures = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def _fetch(self, address: str) -> Optional[Coordinates]:
+        # Imported here: urllib.request pulls in http.client, ssl and email, only needed once geocoding is on
+        from urllib.parse import urlencode
+        from urllib.request import Request, urlopen
+
+        request = Request(
+            f"{self.url}?{urlencode({'q': address, 'format': 'json', 'limit': 1})}",
+            headers={"User-Agent": "akkor-hotel-api", "Accept": "application/json"},
+        )
+        with urlopen(request, timeout=self.timeout) as response:
+            results = json.load(response)
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+    async def geocode(self, address: str) -> Optional[Coordinates]:
+        """Coordinates of an address, None when geocoding is off, the address unknown or the geocoder unreachable."""
+        if not self.enabled:
+            return None
+        key = " ".join(address.lower().split())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+
+        # Hotels written together often share an address: one lookup answers them all
+        pending = self.inflight.get(key)
+        if pending is None:
+            pending = self.inflight[key] = asyncio.ensure_future(self._lookup(key, address))
+            pending.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.hits += 1
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, key: str, address: str) -> Optional[Coordinates]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+        async with self._semaphore:
+            self.requests += 1
+            try:
+                coordinates = await asyncio.to_thread(self.fetch, address)
+            except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+                self.failures += 1
+                logger.warning("Could not geocode %r: %s", address, e)
+                return None
+
+        self.cache[key] = coordinates
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return coordinates
+
+    async def geocode_many(self, addresses: List[str]) -> List[Optional[Coordinates]]:
+        """Coordinates of each address, up to `concurrency` looked up at a time."""
+        return list(await asyncio.gather(*(self.geocode(address) for address in addresses)))
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "cache_hits": self.hits,
+            "failures": self.failures,
+            "cached": len(self.cache),
+        }
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import pydantic_core
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.singleton import Singleton
+
+# How long the response to a request is replayed to its retries
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# A retry finding its request committed but its response not stored yet waits this long for it, then
+# gets a 409: the request is never run again
+IDEMPOTENCY_RESPONSE_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_RESPONSE_WAIT_SECONDS", "5"))
+# Responses kept in memory by each worker in front of the table
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+@dataclass
+class StoredResponse:
+    request_hash: bytes
+    status_code: int
+    body: bytes
+    expires_at: float
+
+def digest(*parts: bytes) -> bytes:
+    return hashlib.blake2b(b"\0".join(parts), digest_size=32).digest()
+
+class IdempotencyManager(metaclass=Singleton):
+    """
+    Runs requests carrying an Idempotency-Key once, and replays their response to the retries.
+
+    The first request with a key claims it with a row of `idempotency_keys` inserted in the request's
+    own transaction, so the key is taken if and only if the request's writes commit: a request that
+    fails or whose worker dies releases it with its rollback. Its response is stored in the same
+    session once the call returns, in the same transaction for services that leave the commit to it.
+    Duplicates arriving meanwhile wait for it rather than running again: on the same worker they wait
+    on the in-flight call itself, on other workers their insert waits for the first transaction, then
+    for the response. A key whose request committed but whose response was lost is never run again,
+    its retries get a 409. Stored responses are also kept in an LRU in memory, so replays on the
+    worker that answered need no query.
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL_SECONDS,
+        response_wait: float = IDEMPOTENCY_RESPONSE_WAIT_SECONDS,
+        cache_size: int = IDEMPOTENCY_CACHE_SIZE,
+        purge_every: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.response_wait = response_wait
+        self.cache_size = cache_size
+        self.purge_every = purge_every
+        self.clock = clock
+        self.cache: "OrderedDict[bytes, StoredResponse]" = OrderedDict()
+        self.inflight: Dict[bytes, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.coalesced = 0
+        self.lost = 0
+
+    def cached(self, key_hash: bytes) -> Optional[StoredResponse]:
+        stored = self.cache.get(key_hash)
+        if stored is None:
+            return None
+        if stored.expires_at <= self.clock():
+            del self.cache[key_hash]
+            return None
+        self.cache.move_to_end(key_hash)
+        return stored
+
+    def remember(self, key_hash: bytes, stored: StoredResponse):
+        if self.cache_size <= 0:
+            return
+        self.cache[key_hash] = stored
+        self.cache.move_to_end(key_hash)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def claim(self, db: AsyncSession, key_hash: bytes, request_hash: bytes) -> Tuple[bool, Any]:
+        """
+        Take the key, or an expired one, in the session's transaction. Otherwise return the row holding
+        it, once the transaction that wrote it has ended.
+        """
+        from app.models.idempotencyModel import IdempotencyKey
+
+        statement = insert(IdempotencyKey).values(
+            key_hash=key_hash,
+            request_hash=request_hash,
+            expires_at=func.now() + timedelta(seconds=self.ttl),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key_hash],
+            set_={
+                "request_hash": statement.excluded.request_hash,
+                "status_code": None,
+                "response": None,
+                "created_at": func.now(),
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at < func.now(),
+        ).returning(IdempotencyKey.key_hash)
+
+        if (await db.execute(statement)).first() is not None:
+            return True, None
+        row = (await db.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response, IdempotencyKey.expires_at)
+            .where(IdempotencyKey.key_hash == key_hash)
+        )).first()
+        return False, row
+
+    async def complete(self, db: AsyncSession, key_hash: bytes, request_hash: bytes, status_code: int, body: bytes) -> StoredResponse:
+        """Store the response of a claimed key in the session and commit it."""
+        from app.models.idempotencyModel import IdempotencyKey
+
+        expires_at = (await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None))
+            .values(status_code=status_code, response=body)
+            .returning(IdempotencyKey.expires_at)
+        )).scalar()
+        self.executed += 1
+        if self.executed % self.purge_every == 0:
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now()))
+        await db.commit()
+
+        stored = StoredResponse(request_hash, status_code, body, expires_at.timestamp() if expires_at else self.clock() + self.ttl)
+        self.remember(key_hash, stored)
+        return stored
+
+    def replay(self, stored: StoredResponse, request_hash: bytes) -> Response:
+        if stored.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="This Idempotency-Key was already used for a different request.")
+        self.replayed += 1
+        return Response(stored.body, status_code=stored.status_code, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+    async def run(
+        self, db: AsyncSession, key: Optional[str], scope: str, request: Any, call: Callable[[], Awaitable[Any]], status_code: int = 200,
+    ) -> Any:
+        """
+        Answer `call()`, running in `db`, for the first request with `key` within `scope` (route and
+        caller), and the same JSON response to its retries. Without a key, `call()` simply runs.
+        """
+        if key is None:
+            return await call()
+        key_hash = digest(scope.encode(), key.encode())
+        request_hash = digest(pydantic_core.to_json(request))
+
+        while True:
+            stored = self.cached(key_hash)
+            if stored is not None:
+                return self.replay(stored, request_hash)
+            pending = self.inflight.get(key_hash)
+            if pending is None:
+                break
+            self.coalesced += 1
+            await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self.inflight[key_hash] = pending
+        try:
+            poll, deadline = 0.01, None
+            while True:
+                owned, row = await self.claim(db, key_hash, request_hash)
+                if owned:
+                    break
+                if row is None:
+                    # Purged between the claim and the read
+                    continue
+                if row.request_hash != request_hash:
+                    raise HTTPException(status_code=422, detail="This Idempotency-Key was already used for a different request.")
+                if row.status_code is not None:
+                    stored = StoredResponse(row.request_hash, row.status_code, row.response, row.expires_at.timestamp())
+                    self.remember(key_hash, stored)
+                    return self.replay(stored, request_hash)
+                # Committed by another worker, its response about to be stored or lost with the worker
+                if deadline is None:
+                    self.coalesced += 1
+                    deadline = time.monotonic() + self.response_wait
+                elif time.monotonic() >= deadline:
+                    self.lost += 1
+                    raise HTTPException(
+                        status_code=409, detail="The request with this Idempotency-Key was processed but its response was lost.",
+                    )
+                # The connection goes back to the pool while waiting
+                await db.rollback()
+                await asyncio.sleep(poll)
+                poll = min(poll * 2, 0.25)
+
+            try:
+                result = await call()
+                stored = await self.complete(db, key_hash, request_hash, status_code, pydantic_core.to_json(result))
+            except BaseException:
+                # Releases the key along with whatever the call left uncommitted, a key committed with its
+                # writes stays taken
+                await asyncio.shield(db.rollback())
+                raise
+            return Response(stored.body, status_code=status_code, media_type="application/json")
+        finally:
+            del self.inflight[key_hash]
+            pending.set_result(None)
+
+    def snapshot(self) -> dict:
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "coalesced": self.coalesced,
+            "lost": self.lost,
+            "cached": len(self.cache),
+            "in_flight": len(self.inflight),
+        }
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, func, or_, select, update
+from app.utils.singleton import Singleton
+
+# Worker coroutines per process, 0 only enqueues and leaves the jobs to other processes
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# How often idle workers look for jobs enqueued by other processes or due after a backoff
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry n waits between half and all of min(JOB_BACKOFF_BASE * 2 ** (n - 1), JOB_BACKOFF_MAX) seconds
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "2"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "300"))
+# A running job not finished within its lease is offered to the workers again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Handlers are cancelled after this share of the lease, leaving the rest to record their outcome
+JOB_HANDLER_SHARE = 0.8
+# Finished jobs are kept this long for inspection
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+Handler = Callable[[dict], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+class JobManager(metaclass=Singleton):
+    """
+    Runs the jobs of the `jobs` table on worker coroutines.
+
+    Jobs are claimed one at a time with FOR UPDATE SKIP LOCKED, so any number of workers and processes
+    share the table without running a job twice at once. A claimed job's `run_at` becomes the end of
+    its lease: if the process dies meanwhile, the job is due again once the lease expires. Delivery is
+    therefore at least once, and handlers must be idempotent. A failed job is retried with exponential
+    backoff and jitter, and marked failed after `max_attempts`, including a job whose last lease expired
+    with its outcome unknown.
+
+    Workers only claim kinds they have a handler for, so processes running different versions can
+    share the table.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        backoff_base: float = JOB_BACKOFF_BASE,
+        backoff_max: float = JOB_BACKOFF_MAX,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        engine=None,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.handler_timeout = lease_seconds * JOB_HANDLER_SHARE
+        self.retention_seconds = retention_seconds
+        self.handlers: Dict[str, Handler] = {}
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self._engine = engine
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+        self._last_purge = time.monotonic()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = DatabaseManager().engine
+        return self._engine
+
+    def register(self, kind: str) -> Callable[[Handler], Handler]:
+        """Decorator registering the coroutine running the jobs of a kind."""
+        def decorator(handler: Handler) -> Handler:
+            self.handlers[kind] = handler
+            return handler
+        return decorator
+
+    def wake(self):
+        """Let an idle worker look for jobs now rather than at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def claim(self):
+        """Take the earliest due job this process can run, None when there is none."""
+        from app.models.jobModel import Job
+
+        kinds = list(self.handlers)
+        expired = and_(Job.status == JOB_RUNNING, Job.run_at <= func.now(), Job.kind.in_(kinds))
+        due = (
+            select(Job.id)
+            .where(
+                or_(and_(Job.status == JOB_PENDING, Job.run_at <= func.now(), Job.kind.in_(kinds)), and_(expired, Job.attempts < Job.max_attempts))
+            )
+            .order_by(Job.run_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.engine.begin() as connection:
+            # A job whose last attempt outlived its lease is given up rather than run once more
+            abandoned = await connection.execute(
+                update(Job)
+                .where(expired, Job.attempts >= Job.max_attempts)
+                .values(status=JOB_FAILED, last_error="Lease expired on the last attempt", finished_at=func.now())
+                .returning(Job.id, Job.kind, Job.attempts)
+            )
+            for job in abandoned:
+                logger.error("Job %s (%s) failed after %s attempts: lease expired", job.id, job.kind, job.attempts)
+                self.failed += 1
+
+            result = await connection.execute(
+                update(Job)
+                .where(Job.id == due)
+                .values(status=JOB_RUNNING, attempts=Job.attempts + 1, run_at=func.now() + timedelta(seconds=self.lease_seconds))
+                .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+            )
+            return result.first()
+
+    async def _finish(self, job_id: int, attempts: int, values: dict):
+        """Record a job's outcome, unless its lease expired and another worker took it over meanwhile."""
+        from app.models.jobModel import Job
+
+        async with self.engine.begin() as connection:
+            await connection.execute(
+                update(Job).where(and_(Job.id == job_id, Job.status == JOB_RUNNING, Job.attempts == attempts)).values(**values)
+            )
+
+    async def run(self, job) -> bool:
+        """Run a claimed job and record whether it succeeded."""
+        try:
+            await asyncio.wait_for(self.handlers[job.kind](job.payload), timeout=self.handler_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= job.max_attempts:
+                logger.error("Job %s (%s) failed after %s attempts: %s", job.id, job.kind, job.attempts, error)
+                self.failed += 1
+                await self._finish(job.id, job.attempts, {"status": JOB_FAILED, "last_error": error, "finished_at": func.now()})
+            else:
+                logger.warning("Job %s (%s) failed, attempt %s: %s", job.id, job.kind, job.attempts, error)
+                self.retried += 1
+                retry_at = func.now() + timedelta(seconds=self.backoff(job.attempts))
+                await self._finish(job.id, job.attempts, {"status": JOB_PENDING, "last_error": error, "run_at": retry_at})
+            return False
+
+        self.completed += 1
+        await self._finish(job.id, job.attempts, {"status": JOB_DONE, "finished_at": func.now()})
+        return True
+
+    async def run_pending(self) -> int:
+        """Run due jobs until there is none left, return how many ran."""
+        ran = 0
+        while not self._stopping and self.handlers:
+            job = await self.claim()
+            if job is None:
+                break
+            await self.run(job)
+            ran += 1
+        return ran
+
+    async def purge(self):
+        """Delete the jobs finished for longer than the retention period."""
+        from app.models.jobModel import Job
+
+        async with self.engine.begin() as connection:
+            await connection.execute(
+                delete(Job).where(
+                    Job.status.in_((JOB_DONE, JOB_FAILED)),
+                    Job.finished_at < func.now() - timedelta(seconds=self.retention_seconds),
+                )
+            )
+
+    async def _worker(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        while not self._stopping:
+            # Idle first, so startup does not compete with the pool warm-up
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            try:
+                await self.run_pending()
+                if time.monotonic() - self._last_purge >= 3600:
+                    self._last_purge = time.monotonic()
+                    await self.purge()
+            except CONNECTION_ERRORS as e:
+                logger.warning("Job workers cannot reach the database: %s", e)
+            except Exception:
+                logger.exception("Job worker error")
+
+    def start(self):
+        """Start the worker coroutines on the running loop, once."""
+        if self._tasks or not self.workers:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10):
+        """Let running jobs finish for up to `timeout` seconds, the others are retried after their lease."""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self.wake()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "kinds": sorted(self.handlers),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
@@ -0,0 +1,88 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+from sqlalchemy.exc import DBAPIError
+from app.utils.singleton import Singleton
+
+# Milliseconds any statement of a request may run, set on the connections of the request pools;
+# a backstop so no query holds a pooled connection for long, 0 disables it
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "30000"))
+# Searches scan user-controlled patterns: a slow one is better cut short than left to queue the others
+SEARCH_STATEMENT_TIMEOUT = int(os.getenv("SEARCH_STATEMENT_TIMEOUT", "3000"))
+# Cancel the query of a request whose client disconnected before its response started
+QUERY_CANCEL_ON_DISCONNECT = os.getenv("QUERY_CANCEL_ON_DISCONNECT", "true").lower() == "true"
+
+# Routes whose statements get their own timeout, by path template. The faceted search and autocomplete
+# fall back on queries filtered on text when their counts or index are not in memory: a count out of time
+# leaves the page without its facets, a scan out of time suggests nothing
+ROUTE_STATEMENT_TIMEOUTS = {
+    "/hotels/": SEARCH_STATEMENT_TIMEOUT,
+    "/hotels/search": SEARCH_STATEMENT_TIMEOUT,
+    "/hotels/search/faceted": SEARCH_STATEMENT_TIMEOUT,
+    "/hotels/autocomplete": SEARCH_STATEMENT_TIMEOUT,
+    "/hotels/nearby": SEARCH_STATEMENT_TIMEOUT,
+}
+
+# SQLSTATE of a statement cancelled by statement_timeout or a cancel request
+QUERY_CANCELED = "57014"
+
+def statement_timed_out(error: DBAPIError) -> bool:
+    return getattr(error.orig, "sqlstate", None) == QUERY_CANCELED
+
+@dataclass
+class RouteQueries:
+    timeout: int
+    timeouts: int = 0
+    cancelled: int = 0
+
+    def snapshot(self) -> dict:
+        return {"timeout_ms": self.timeout, "timeouts": self.timeouts, "cancelled": self.cancelled}
+
+class QueryTimeoutManager(metaclass=Singleton):
+    """
+    Statement timeouts per route, and the queries cut short by them or by clients going away.
+
+    Pooled connections run every statement under DB_STATEMENT_TIMEOUT, set once per connection through
+    asyncpg's server settings. Routes in ROUTE_STATEMENT_TIMEOUTS lower it for their own transactions
+    with `SET LOCAL`, one more round trip per transaction, so only they pay for it. A statement running
+    out of time is cancelled by Postgres and the request answered with a 504; a request whose client
+    disconnects has its task cancelled, and asyncpg sends Postgres a cancel request for its query.
+    """
+
+    def __init__(
+        self,
+        default_timeout: int = DB_STATEMENT_TIMEOUT,
+        route_timeouts: Optional[Dict[str, int]] = None,
+        cancel_on_disconnect: bool = QUERY_CANCEL_ON_DISCONNECT,
+    ):
+        self.default_timeout = default_timeout
+        self.route_timeouts = ROUTE_STATEMENT_TIMEOUTS if route_timeouts is None else route_timeouts
+        self.cancel_on_disconnect = cancel_on_disconnect
+        self.routes: Dict[str, RouteQueries] = {}
+
+    def timeout_for(self, route_path: Optional[str]) -> Optional[int]:
+        """The route's own statement timeout in milliseconds, None when it runs under the default."""
+        timeout = self.route_timeouts.get(route_path)
+        return None if timeout == self.default_timeout else timeout
+
+    def route(self, route_path: str) -> RouteQueries:
+        queries = self.routes.get(route_path)
+        if queries is None:
+            timeout = self.timeout_for(route_path)
+            queries = self.routes[route_path] = RouteQueries(timeout=self.default_timeout if timeout is None else timeout)
+        return queries
+
+    def timed_out(self, route_path: str):
+        self.route(route_path).timeouts += 1
+
+    def cancelled(self, route_path: str):
+        self.route(route_path).cancelled += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "statement_timeout_ms": self.default_timeout,
+            "cancel_on_disconnect": self.cancel_on_disconnect,
+            "timeouts": sum(queries.timeouts for queries in self.routes.values()),
+            "cancelled": sum(queries.cancelled for queries in self.routes.values()),
+            "routes": {path: queries.snapshot() for path, queries in sorted(self.routes.items())},
+        }
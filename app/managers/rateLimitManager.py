@@ -0,0 +1,228 @@
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Tuple
+from sqlalchemy import Float, Integer, String, bindparam, text
+from app.utils.singleton import Singleton
+
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" keeps the state per process, "postgres" shares it between workers and instances
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Failed attempts allowed in a burst and refilled per minute, per client address and per username
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "10"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "10"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "10"))
+# Lockout after LOGIN_LOCKOUT_THRESHOLD failures within LOGIN_LOCKOUT_WINDOW seconds, doubling on every further failure
+LOGIN_LOCKOUT_THRESHOLD = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", "5"))
+LOGIN_LOCKOUT_WINDOW = float(os.getenv("LOGIN_LOCKOUT_WINDOW", "900"))
+LOGIN_LOCKOUT_BASE = float(os.getenv("LOGIN_LOCKOUT_BASE", "30"))
+LOGIN_LOCKOUT_MAX = float(os.getenv("LOGIN_LOCKOUT_MAX", "900"))
+
+class InMemoryRateLimitBackend:
+    """
+    Per-process rate limit state.
+
+    Buckets are stored in their GCRA form: one "theoretical arrival time" per key, equivalent to a token
+    bucket without a refill step. Failures are a sliding-window log of timestamps. Keys are evicted in
+    least-recently-used order past `max_keys`, so spraying addresses or usernames cannot grow memory.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._failures: "OrderedDict[str, Tuple[Deque[float], float]]" = OrderedDict()
+
+    def _touch(self, store: OrderedDict, key: str, value):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_keys:
+            store.popitem(last=False)
+
+    async def take(self, key: str, burst: int, interval: float, now: float) -> float:
+        """Take a token, return 0 when granted or the seconds until one is available."""
+        tat = max(self._tats.get(key, now), now)
+        wait = tat + interval - now - burst * interval
+        if wait > 0:
+            return wait
+        self._touch(self._tats, key, tat + interval)
+        return 0.0
+
+    async def give_back(self, key: str, interval: float, now: float):
+        if key in self._tats:
+            self._tats[key] = max(self._tats[key] - interval, now)
+
+    async def locked_for(self, key: str, now: float) -> float:
+        _, locked_until = self._failures.get(key, (None, 0.0))
+        return max(locked_until - now, 0.0)
+
+    async def record_failure(self, key: str, window: float, now: float) -> int:
+        """Log a failure and return how many happened within the window."""
+        failures, locked_until = self._failures.get(key, (deque(), 0.0))
+        failures.append(now)
+        while failures[0] <= now - window:
+            failures.popleft()
+        self._touch(self._failures, key, (failures, locked_until))
+        return len(failures)
+
+    async def lock(self, key: str, until: float):
+        failures, _ = self._failures.get(key, (deque(), 0.0))
+        self._touch(self._failures, key, (failures, until))
+
+    async def clear_failures(self, key: str):
+        self._failures.pop(key, None)
+
+class PostgresRateLimitBackend:
+    """
+    Rate limit state in the `rate_limits` table, shared by every worker and instance.
+
+    Each operation is a single statement on its own short transaction, outside the request's session.
+    The failure window is fixed from the first failure rather than sliding.
+    """
+
+    def __init__(self, engine=None, purge_every: int = 1_000):
+        self._engine = engine
+        self.purge_every = purge_every
+        self._operations = 0
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = DatabaseManager().engine
+        return self._engine
+
+    async def _execute(self, statement: str, **params):
+        types = {str: String, int: Integer, float: Float}
+        statement = text(statement).bindparams(*(bindparam(name, type_=types[type(value)]) for name, value in params.items()))
+        async with self.engine.begin() as connection:
+            return await connection.execute(statement, params)
+
+    async def take(self, key: str, burst: int, interval: float, now: float) -> float:
+        self._operations += 1
+        if self._operations % self.purge_every == 0:
+            await self.purge(now)
+
+        result = await self._execute(
+            "INSERT INTO rate_limits AS r (key, tat) VALUES (:key, :now + :interval) "
+            "ON CONFLICT (key) DO UPDATE SET tat = GREATEST(r.tat, :now) + :interval "
+            "WHERE GREATEST(r.tat, :now) + :interval - :now <= :burst * :interval "
+            "RETURNING tat",
+            key=key, now=now, interval=interval, burst=burst,
+        )
+        if result.first() is not None:
+            return 0.0
+        tat = (await self._execute("SELECT tat FROM rate_limits WHERE key = :key", key=key)).scalar()
+        return max(max(tat, now) + interval - now - burst * interval, 0.0)
+
+    async def give_back(self, key: str, interval: float, now: float):
+        await self._execute(
+            "UPDATE rate_limits SET tat = GREATEST(tat - :interval, :now) WHERE key = :key",
+            key=key, interval=interval, now=now,
+        )
+
+    async def locked_for(self, key: str, now: float) -> float:
+        locked_until = (await self._execute("SELECT locked_until FROM rate_limits WHERE key = :key", key=key)).scalar()
+        return max((locked_until or 0.0) - now, 0.0)
+
+    async def record_failure(self, key: str, window: float, now: float) -> int:
+        result = await self._execute(
+            "INSERT INTO rate_limits AS r (key, failures, window_start) VALUES (:key, 1, :now) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "failures = CASE WHEN r.window_start <= :now - :window THEN 1 ELSE r.failures + 1 END, "
+            "window_start = CASE WHEN r.window_start <= :now - :window THEN :now ELSE r.window_start END "
+            "RETURNING failures",
+            key=key, now=now, window=window,
+        )
+        return result.scalar()
+
+    async def lock(self, key: str, until: float):
+        await self._execute("UPDATE rate_limits SET locked_until = :until WHERE key = :key", key=key, until=until)
+
+    async def clear_failures(self, key: str):
+        await self._execute("DELETE FROM rate_limits WHERE key = :key", key=key)
+
+    async def purge(self, now: float, window: float = LOGIN_LOCKOUT_WINDOW):
+        """Delete rows holding no state anymore: full bucket, no lock and no failure in the window."""
+        await self._execute(
+            "DELETE FROM rate_limits WHERE tat <= :now AND locked_until <= :now AND window_start <= :now - :window",
+            now=now, window=window,
+        )
+
+class RateLimitManager(metaclass=Singleton):
+    """
+    Throttles login attempts before any password hash is verified.
+
+    A token is taken from the client address bucket and from the username bucket before verifying; a
+    successful login gives both back, so only failed attempts are really counted. Failures of a username
+    from one address are logged and lock that pair out for `lockout_base` seconds at the threshold,
+    doubling on each further failure up to `lockout_max`: an attacker elsewhere cannot lock the owner out.
+    """
+
+    def __init__(self, backend=None, clock=time.time, enabled: bool = LOGIN_RATE_LIMIT_ENABLED):
+        if backend is None:
+            backend = PostgresRateLimitBackend() if RATE_LIMIT_BACKEND == "postgres" else InMemoryRateLimitBackend()
+        self.backend = backend
+        self.clock = clock
+        self.enabled = enabled
+        self.ip_burst = LOGIN_IP_BURST
+        self.ip_interval = 60 / LOGIN_IP_PER_MINUTE
+        self.user_burst = LOGIN_USER_BURST
+        self.user_interval = 60 / LOGIN_USER_PER_MINUTE
+        self.lockout_threshold = LOGIN_LOCKOUT_THRESHOLD
+        self.lockout_window = LOGIN_LOCKOUT_WINDOW
+        self.lockout_base = LOGIN_LOCKOUT_BASE
+        self.lockout_max = LOGIN_LOCKOUT_MAX
+
+    @staticmethod
+    def _keys(ip: str, username: str) -> Tuple[str, str, str]:
+        username = username.strip().lower()
+        return f"ip:{ip}", f"user:{username}", f"lock:{ip}:{username}"
+
+    async def check_login(self, ip: str, username: str) -> float:
+        """Reserve an attempt, return 0 when it may proceed or the seconds to wait (for Retry-After)."""
+        if not self.enabled:
+            return 0.0
+        ip_key, user_key, lock_key = self._keys(ip, username)
+        now = self.clock()
+
+        locked_for = await self.backend.locked_for(lock_key, now)
+        if locked_for:
+            return locked_for
+
+        wait = await self.backend.take(ip_key, self.ip_burst, self.ip_interval, now)
+        if wait:
+            return wait
+        wait = await self.backend.take(user_key, self.user_burst, self.user_interval, now)
+        if wait:
+            await self.backend.give_back(ip_key, self.ip_interval, now)
+        return wait
+
+    async def login_failed(self, ip: str, username: str) -> float:
+        """Record a failed attempt, return the lockout it triggered in seconds (0 if none)."""
+        if not self.enabled:
+            return 0.0
+        _, _, lock_key = self._keys(ip, username)
+        now = self.clock()
+
+        failures = await self.backend.record_failure(lock_key, self.lockout_window, now)
+        if failures < self.lockout_threshold:
+            return 0.0
+        duration = min(self.lockout_base * 2 ** (failures - self.lockout_threshold), self.lockout_max)
+        await self.backend.lock(lock_key, now + duration)
+        return duration
+
+    async def login_succeeded(self, ip: str, username: str):
+        """Give the reserved tokens back and forget the pair's failures."""
+        if not self.enabled:
+            return
+        ip_key, user_key, lock_key = self._keys(ip, username)
+        now = self.clock()
+
+        await self.backend.give_back(ip_key, self.ip_interval, now)
+        await self.backend.give_back(user_key, self.user_interval, now)
+        await self.backend.clear_failures(lock_key)
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(math.ceil(seconds), 1))}
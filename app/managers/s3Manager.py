@@ -1,5 +1,4 @@
 import os
-from boto3 import session
 from fastapi import HTTPException, UploadFile
 from app.utils.singleton import Singleton
 
@@ -9,13 +8,24 @@ class S3Manager(metaclass=Singleton):
     """
 
     def __init__(self):
-        self.s3_client = self.__get_client()
+        self._s3_client = None
         self.bucket_name = os.getenv('BUCKET_NAME')
 
+    @property
+    def s3_client(self):
+        """
+        The boto3 client, created (and boto3 imported) on first use.
+        """
+        if self._s3_client is None:
+            self._s3_client = self.__get_client()
+        return self._s3_client
+
     def __get_client(self):
         """
         Establishes a connection to the S3 (MinIO) client.
         """
+        from boto3 import session
+
         try:
             session_obj = session.Session()
             client = session_obj.client(
@@ -30,6 +40,14 @@ class S3Manager(metaclass=Singleton):
         except Exception as e:
             raise Exception(f"Failed to establish S3 client connection: {str(e)}")
 
+    def close(self):
+        """
+        Closes the client's HTTP connection pool.
+        """
+        if self._s3_client is not None:
+            self._s3_client.close()
+            self._s3_client = None
+
     def upload_file(self, file: UploadFile, object_name: str = None, public: bool = False) -> str:
         """
         Uploads an UploadFile to the specified S3 bucket.
@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.changeFeedManager import RELOAD, ChangeFeedManager
+from app.utils.singleton import Singleton
+
+# Keep a word index of the hotels in memory for autocomplete, about 600 MiB per million hotels. Off, every
+# suggestion scans the hotels: only for small databases
+AUTOCOMPLETE_ENABLED = os.getenv("AUTOCOMPLETE_ENABLED", "true").lower() == "true"
+# Seconds a client is told to wait while the index loads, about 25 s per million hotels
+AUTOCOMPLETE_RETRY_AFTER = 5
+# Hotels read at once while loading, and changes while following the feed
+SEARCH_INDEX_BATCH_SIZE = 5000
+# Words a query of one prefix expands to, the first ones in order
+MAX_EXPANSIONS = 256
+# Words the last of several query words expands to before hotels are checked against the prefix
+# itself rather than against the words it expands to
+MAX_CHECKED_EXPANSIONS = 65536
+# Matches gathered before ranking, per suggestion asked for
+CANDIDATES_PER_SUGGESTION = 4
+
+WORD = re.compile(r"\w+")
+
+logger = logging.getLogger(__name__)
+
+def fold(text: str) -> str:
+    """A text with its case and accents folded."""
+    folded = text.casefold()
+    if not folded.isascii():
+        folded = "".join(char for char in unicodedata.normalize("NFKD", folded) if not unicodedata.combining(char))
+    return folded
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Words of a text, case and accents folded."""
+    if not text:
+        return []
+    return WORD.findall(fold(text))
+
+def _accented_letters() -> Dict[str, List[str]]:
+    """The Latin characters folding to each ASCII letter, in either case."""
+    letters: Dict[str, List[str]] = {}
+    for code in chain(range(0xC0, 0x250), range(0x1E00, 0x1F00)):
+        folded = fold(chr(code))
+        if len(folded) == 1 and folded.isascii() and folded.isalpha():
+            letters.setdefault(folded, []).append(chr(code))
+    return letters
+
+ACCENTED_LETTERS = _accented_letters()
+
+def word_pattern(word: str) -> str:
+    """
+    A Postgres regular expression matching a folded word in text that still has its accents, for the
+    scans standing in for the index. Alternations rather than brackets, which would match single bytes
+    of a database in SQL_ASCII.
+    """
+    return "".join(f"(?:{'|'.join([char, *ACCENTED_LETTERS[char]])})" if char in ACCENTED_LETTERS else char for char in word)
+
+class SearchIndexManager(metaclass=Singleton):
+    """
+    Words of each hotel's name, address and description, indexed in memory for autocomplete.
+
+    Each word has the ids of the hotels using it, in an array, and each hotel the ids of its words,
+    to take it out of them when it changes. A search starts from the query word matching the fewest
+    hotels, the last word matching as a prefix, and checks the hotels it lists against the other
+    words. The index is loaded from a scan at startup, then follows the hotel changes of the change
+    feed; hotels written by this process are indexed as soon as they are committed.
+    """
+
+    def __init__(self, enabled: bool = AUTOCOMPLETE_ENABLED, engine=None):
+        self.enabled = enabled
+        self.ready = False
+        self.cursor: Optional[Tuple[int, int]] = None
+        # Words in order, for prefixes, and the word of each word id
+        self.vocabulary: List[str] = []
+        self.words: List[str] = []
+        self.word_ids: Dict[str, int] = {}
+        self.postings: List[array] = []
+        # Name, city and word ids of each hotel
+        self.hotels: Dict[int, Tuple[str, Optional[str], array]] = {}
+        self.postings_size = 0
+        self.text_bytes = 0
+        self.searches = 0
+        self.load_seconds = 0.0
+        self._loading = False
+        self._engine = engine
+        self._own_engine = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = self._own_engine = DatabaseManager().dedicated_engine()
+        return self._engine
+
+    def _word_id(self, word: str) -> int:
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = self.word_ids[word] = len(self.words)
+            self.words.append(word)
+            self.postings.append(array("i"))
+            self.text_bytes += sys.getsizeof(word)
+            # Sorted once the load is over
+            if not self._loading:
+                insort(self.vocabulary, word)
+        return word_id
+
+    def put(self, hotel_id: int, name: str, address: Optional[str], city: Optional[str], description: Optional[str]):
+        """Index a hotel, replacing what was indexed of it."""
+        self.remove(hotel_id)
+        word_ids = array("i", {self._word_id(word) for text in (name, address, description) for word in tokenize(text)})
+        for word_id in word_ids:
+            self.postings[word_id].append(hotel_id)
+        self.postings_size += len(word_ids)
+        self.hotels[hotel_id] = (name, sys.intern(city) if city else None, word_ids)
+        self.text_bytes += sys.getsizeof(name) + sys.getsizeof(word_ids)
+
+    def remove(self, hotel_id: int):
+        hotel = self.hotels.pop(hotel_id, None)
+        if hotel is None:
+            return
+        name, _, word_ids = hotel
+        for word_id in word_ids:
+            self.postings[word_id].remove(hotel_id)
+        self.postings_size -= len(word_ids)
+        self.text_bytes -= sys.getsizeof(name) + sys.getsizeof(word_ids)
+
+    def _expand(self, prefix: str, limit: int) -> List[int]:
+        """Ids of the words starting with the prefix, up to one past `limit`."""
+        start = bisect_left(self.vocabulary, prefix)
+        expansions = []
+        for word in self.vocabulary[start:start + limit + 1]:
+            if not word.startswith(prefix):
+                break
+            expansions.append(self.word_ids[word])
+        return expansions
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Hotels having every word of the query, the last one as a prefix, in their name, address or
+        description. Hotels whose name has them all come first, then the shortest names.
+        """
+        self.searches += 1
+        words = tokenize(query)
+        if not words:
+            return []
+        # Per query word, the word ids it accepts
+        accepted = [[self.word_ids[word]] if word in self.word_ids else [] for word in words[:-1]]
+        prefix = words[-1]
+        accepted.append(self._expand(prefix, MAX_EXPANSIONS if len(words) == 1 else MAX_CHECKED_EXPANSIONS))
+        if not all(accepted):
+            return []
+
+        def size(word_ids):
+            return sum(len(self.postings[word_id]) for word_id in word_ids) if len(word_ids) <= MAX_CHECKED_EXPANSIONS else sys.maxsize
+        start = min(range(len(accepted)), key=lambda index: size(accepted[index]))
+        others = [set(word_ids) for index, word_ids in enumerate(accepted) if index != start]
+        if start != len(accepted) - 1 and len(accepted[-1]) > MAX_CHECKED_EXPANSIONS:
+            # Too many words to list: the prefix is checked on the hotel's words themselves
+            others[-1] = None
+
+        def matches(hotel_id):
+            hotel_words = self.hotels[hotel_id][2]
+            return all(
+                any(self.words[word_id].startswith(prefix) for word_id in hotel_words) if word_ids is None
+                else not word_ids.isdisjoint(hotel_words)
+                for word_ids in others
+            )
+
+        found = []
+        seen = set()
+        candidates = (hotel_id for word_id in accepted[start] for hotel_id in self.postings[word_id])
+        for hotel_id in candidates:
+            if hotel_id not in seen:
+                seen.add(hotel_id)
+                if matches(hotel_id):
+                    found.append(hotel_id)
+                    if len(found) == limit * CANDIDATES_PER_SUGGESTION:
+                        break
+
+        def rank(hotel_id):
+            name = self.hotels[hotel_id][0]
+            name_words = tokenize(name)
+            in_name = all(word in name_words for word in words[:-1]) and any(word.startswith(prefix) for word in name_words)
+            return not in_name, len(name), hotel_id
+        return [
+            {"id": hotel_id, "name": self.hotels[hotel_id][0], "city": self.hotels[hotel_id][1]}
+            for hotel_id in sorted(found, key=rank)[:limit]
+        ]
+
+    async def load(self):
+        """Index every hotel from a streamed scan, then follow the changes made since it began."""
+        from app.models.hotelModel import Hotel
+        from app.services.changeService import ChangeService
+
+        started = asyncio.get_running_loop().time()
+        query = (
+            select(Hotel.id, Hotel.name, Hotel.address, Hotel.city, Hotel.description)
+            .execution_options(yield_per=SEARCH_INDEX_BATCH_SIZE)
+        )
+        self._loading = True
+        try:
+            async with AsyncSession(self.engine) as db:
+                # Changes committed during the scan are replayed over it, which indexes their hotels again
+                cursor = await ChangeService.head(db)
+                result = await db.stream(query)
+                async for rows in result.partitions():
+                    for row in rows:
+                        self.put(row.id, row.name, row.address, row.city, row.description)
+        finally:
+            self._loading = False
+            self.vocabulary = sorted(self.word_ids)
+        self.cursor = cursor
+        self.ready = True
+        self.load_seconds = asyncio.get_running_loop().time() - started
+
+    async def reload(self):
+        """Index every hotel again from a scan, searches fall back to SQL meanwhile."""
+        self.ready = False
+        self.vocabulary, self.words, self.word_ids, self.postings, self.hotels = [], [], {}, [], {}
+        self.postings_size = self.text_bytes = 0
+        await self.load()
+
+    async def follow(self) -> int:
+        """Apply the hotel changes committed since the cursor, return how many were read."""
+        from app.models.changeModel import Change
+        from app.services.changeService import visible_after
+
+        cursor = self.cursor
+        if cursor is None:
+            return 0
+        query = (
+            select(Change.txid, Change.id, Change.entity_id, Change.operation, Change.data)
+            .where(Change.entity == "hotel", *visible_after(cursor))
+            .order_by(Change.txid, Change.id)
+            .limit(SEARCH_INDEX_BATCH_SIZE)
+        )
+        async with AsyncSession(self.engine) as db:
+            rows = (await db.execute(query)).all()
+        if any(row.operation == RELOAD for row in rows):
+            await self.reload()
+            return 0
+
+        for row in rows:
+            if row.operation == "delete":
+                self.remove(row.entity_id)
+            else:
+                data = row.data
+                self.put(row.entity_id, data["name"], data["address"], data.get("city"), data["description"])
+
+        if rows and self.cursor == cursor:
+            self.cursor = (rows[-1].txid, rows[-1].id)
+        return len(rows)
+
+    async def _follow_loop(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        feed_manager = ChangeFeedManager()
+        while not self._stopping and not self.ready:
+            try:
+                await self.load()
+            except CONNECTION_ERRORS as e:
+                logger.warning("Search index cannot reach the database: %s", e)
+                await asyncio.sleep(feed_manager.poll_interval)
+
+        ticket = feed_manager.ticket()
+        while not self._stopping:
+            await feed_manager.wait(ticket, feed_manager.poll_interval)
+            ticket = feed_manager.ticket()
+            try:
+                while await self.follow() == SEARCH_INDEX_BATCH_SIZE:
+                    pass
+            except CONNECTION_ERRORS as e:
+                logger.warning("Search index cannot reach the database: %s", e)
+            except Exception:
+                logger.exception("Search index follower error")
+
+    def start(self):
+        """Load the index and follow the change feed on the running loop, once."""
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._follow_loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._own_engine is not None:
+            await self._own_engine.dispose()
+            self._engine = self._own_engine = None
+
+    def snapshot(self) -> dict:
+        # Approximate: arrays and strings as measured, the containers holding them at their current size
+        memory = (
+            self.text_bytes
+            + self.postings_size * 4 + len(self.postings) * sys.getsizeof(array("i"))
+            + len(self.hotels) * sys.getsizeof((None, None, None))
+            + sum(sys.getsizeof(container) for container in (self.vocabulary, self.words, self.word_ids, self.postings, self.hotels))
+        )
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "hotels": len(self.hotels),
+            "words": len(self.words),
+            "postings": self.postings_size,
+            "searches": self.searches,
+            "memory_bytes": memory,
+            "load_seconds": round(self.load_seconds, 3),
+        }
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, func, select
+from app.utils.singleton import Singleton
+
+ACCESS_TOKEN_EXPIRE_MINUTES = float(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Sessions whose claims are kept in memory per worker, least recently refreshed evicted first
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# How often each worker pulls the sessions revoked by the others
+SESSION_SYNC_INTERVAL = float(os.getenv("SESSION_SYNC_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SessionRecord:
+    """What a worker remembers of a session: enough to issue its next access token."""
+    user_id: int
+    claims: dict
+    expires_at: float
+
+class SessionManager(metaclass=Singleton):
+    """
+    In-memory side of the session store.
+
+    Access tokens are only checked against `revoked`, which maps a session id to the time its last
+    access token expires at the latest, so authenticating a request is one dict lookup and no query.
+    A revocation only has to be remembered for one access token lifetime, which keeps the list small.
+    Each worker pulls the sessions revoked elsewhere from the `sessions` table every `sync_interval`.
+
+    `sessions` is an LRU of session claims, so a refresh on the worker that issued the previous token
+    does not reload the user and its role.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_CACHE_SIZE,
+        access_ttl: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        sync_interval: float = SESSION_SYNC_INTERVAL,
+        engine=None,
+        clock=time.time,
+        purge_every: int = 720,
+    ):
+        self.max_sessions = max_sessions
+        self.access_ttl = access_ttl
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self.purge_every = purge_every
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self.revoked: Dict[str, float] = {}
+        self._engine = engine
+        self._syncs = 0
+        self._sync_task: Optional[asyncio.Task] = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.managers.databaseManager import DatabaseManager
+            self._engine = DatabaseManager().engine
+        return self._engine
+
+    def remember(self, session_id: str, record: SessionRecord):
+        self.sessions[session_id] = record
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+    def lookup(self, session_id: str) -> Optional[SessionRecord]:
+        record = self.sessions.get(session_id)
+        if record is None:
+            return None
+        if record.expires_at <= self.clock():
+            del self.sessions[session_id]
+            return None
+        self.sessions.move_to_end(session_id)
+        return record
+
+    def forget_user(self, user_id: int):
+        """Drop the cached claims of a user whose profile or role changed, the next refresh reloads them."""
+        for session_id in [session_id for session_id, record in self.sessions.items() if record.user_id == user_id]:
+            del self.sessions[session_id]
+
+    def revoke(self, session_id: str, revoked_at: Optional[float] = None):
+        self.sessions.pop(session_id, None)
+        self.revoked[session_id] = (revoked_at if revoked_at is not None else self.clock()) + self.access_ttl
+
+    def is_revoked(self, session_id: str) -> bool:
+        until = self.revoked.get(session_id)
+        return until is not None and until > self.clock()
+
+    def prune(self):
+        now = self.clock()
+        for session_id in [session_id for session_id, until in self.revoked.items() if until <= now]:
+            del self.revoked[session_id]
+
+    async def sync(self):
+        """Learn the revocations of the last access token lifetime, and purge dead sessions now and then."""
+        from app.models.sessionModel import UserSession
+
+        async with self.engine.begin() as connection:
+            rows = await connection.execute(
+                select(UserSession.id, UserSession.revoked_at)
+                .where(UserSession.revoked_at > func.now() - timedelta(seconds=self.access_ttl))
+            )
+            for session_id, revoked_at in rows:
+                self.revoke(session_id, revoked_at.timestamp())
+
+            self._syncs += 1
+            if self._syncs % self.purge_every == 0:
+                await connection.execute(
+                    delete(UserSession)
+                    .where(func.coalesce(UserSession.revoked_at, UserSession.expires_at) < func.now() - timedelta(seconds=self.access_ttl))
+                )
+        self.prune()
+
+    async def _try_sync(self):
+        from app.managers.databaseManager import CONNECTION_ERRORS
+
+        try:
+            await self.sync()
+        except CONNECTION_ERRORS as e:
+            logger.warning("Could not sync revoked sessions: %s", e)
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self._try_sync()
+
+    async def warm_up(self):
+        """Learn the current revocations before serving requests, then keep pulling them."""
+        await self._try_sync()
+        self.start()
+
+    def start(self):
+        """Start pulling revocations on the running loop, once."""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
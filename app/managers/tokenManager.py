@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import jwt
+from jwt.algorithms import get_default_algorithms
+from app.utils.singleton import Singleton
+
+# HS256 signs with a shared secret; RS256 and EdDSA sign with JWT_PRIVATE_KEY_FILE and publish the public key
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# `kid` header of new tokens, change it with the key so tokens signed with the previous one stay valid
+JWT_KEY_ID = os.getenv("JWT_KEY_ID", "default")
+# SECRET_KEY alone is already the S3 secret
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE")
+# JWKS of retired keys, still accepted until the tokens they signed expire
+JWT_RETIRED_KEYS_FILE = os.getenv("JWT_RETIRED_KEYS_FILE")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "EdDSA"}
+SUPPORTED_ALGORITHMS = {"HS256"} | ASYMMETRIC_ALGORITHMS
+
+@dataclass
+class VerificationKey:
+    algorithm: str
+    key: Any
+
+def load_signing_key(algorithm: str = JWT_ALGORITHM) -> Any:
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        return JWT_SECRET_KEY
+    if not JWT_PRIVATE_KEY_FILE:
+        raise ValueError(f"JWT_PRIVATE_KEY_FILE is required with JWT_ALGORITHM={algorithm}")
+    with open(JWT_PRIVATE_KEY_FILE, "rb") as key_file:
+        return key_file.read()
+
+def load_retired_keys() -> List[dict]:
+    if not JWT_RETIRED_KEYS_FILE:
+        return []
+    with open(JWT_RETIRED_KEYS_FILE) as keys_file:
+        return json.load(keys_file)["keys"]
+
+class TokenManager(metaclass=Singleton):
+    """
+    Signs access tokens with the current key and verifies them against every key of the ring.
+
+    Verified tokens are remembered in an LRU keyed by their digest until their `exp`, so a client
+    reusing its access token only pays for the signature check once per worker. Only the claims of
+    tokens that passed verification are cached, and a hit still expires with the token.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = JWT_ALGORITHM,
+        key_id: str = JWT_KEY_ID,
+        signing_key: Any = None,
+        retired_keys: Optional[List[dict]] = None,
+        cache_size: int = TOKEN_CACHE_SIZE,
+        clock=time.time,
+    ):
+        if algorithm not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT_ALGORITHM {algorithm}, expected one of {sorted(SUPPORTED_ALGORITHMS)}")
+
+        self.algorithm = algorithm
+        self.key_id = key_id
+        self.cache_size = cache_size
+        self.clock = clock
+
+        implementation = get_default_algorithms()[algorithm]
+        self.signing_key = implementation.prepare_key(signing_key if signing_key is not None else load_signing_key(algorithm))
+        public_key = self.signing_key.public_key() if algorithm in ASYMMETRIC_ALGORITHMS else self.signing_key
+
+        self.keys: Dict[str, VerificationKey] = {}
+        for jwk in retired_keys if retired_keys is not None else load_retired_keys():
+            retired = jwt.PyJWK(jwk)
+            self.keys[retired.key_id] = VerificationKey(retired.algorithm_name, retired.key)
+        self.keys[key_id] = VerificationKey(algorithm, public_key)
+
+        self._cache: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, self.signing_key, algorithm=self.algorithm, headers={"kid": self.key_id})
+
+    def decode(self, token: str) -> dict:
+        """Verified claims of a token, raise jwt.InvalidTokenError otherwise. The claims are shared, do not mutate them."""
+        digest = hashlib.blake2b(token.encode(), digest_size=32).digest()
+        cached = self._cache.get(digest)
+        if cached is not None:
+            claims, expires_at = cached
+            if expires_at > self.clock():
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return claims
+            del self._cache[digest]
+        self.misses += 1
+
+        # Tokens issued before key ids were introduced were signed with the current key
+        key_id = jwt.get_unverified_header(token).get("kid", self.key_id)
+        key = self.keys.get(key_id)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown key id {key_id!r}")
+        claims = jwt.decode(token, key.key, algorithms=[key.algorithm])
+
+        if "exp" in claims:
+            self._cache[digest] = (claims, claims["exp"])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def jwks(self) -> dict:
+        """Public keys of the ring as a JWKS, for services verifying tokens without the secret."""
+        keys = []
+        for key_id, key in self.keys.items():
+            if key.algorithm not in ASYMMETRIC_ALGORITHMS:
+                continue
+            jwk = get_default_algorithms()[key.algorithm].to_jwk(key.key, as_dict=True)
+            keys.append({**jwk, "kid": key_id, "alg": key.algorithm, "use": "sig"})
+        return {"keys": keys}
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "algorithm": self.algorithm,
+            "key_id": self.key_id,
+            "accepted_key_ids": sorted(self.keys),
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
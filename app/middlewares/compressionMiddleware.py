@@ -0,0 +1,109 @@
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.managers.compressionManager import CompressionManager, StreamCompressor, compressible, negotiate
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best encoding the client accepts: zstd, brotli or gzip.
+
+    A body sent in one message is compressed whole if it reaches the manager's minimum size, from
+    the cache of compressed bodies when the request is public (a GET without credentials). A body
+    streamed in several messages is compressed as it streams. Event streams and bodies already
+    encoded go out untouched.
+    """
+
+    def __init__(self, app: ASGIApp, manager: Optional[CompressionManager] = None):
+        self.app = app
+        self._manager = manager
+
+    @property
+    def manager(self) -> CompressionManager:
+        return self._manager or CompressionManager()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        manager = self.manager
+        if scope["type"] != "http" or not manager.enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        public = scope["method"] == "GET" and "authorization" not in headers and "cookie" not in headers
+        await self.app(scope, receive, CompressingSend(send, manager, encoding, public))
+
+class CompressingSend:
+    """
+    The `send` of one response. The start message of a compressible response is held until the first
+    body message tells whether the body is small, whole or streamed.
+    """
+
+    def __init__(self, send: Send, manager: CompressionManager, encoding: str, public: bool):
+        self.send = send
+        self.manager = manager
+        self.encoding = encoding
+        self.public = public
+        self.start: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            message.setdefault("headers", [])
+            if self._compressible(message["status"], MutableHeaders(scope=message)):
+                self.start = message
+            else:
+                # Sent right away: an event stream may not send its first body for minutes
+                await self.send(message)
+            return
+        start, self.start = self.start, None
+        if message["type"] != "http.response.body":
+            if start is not None:
+                await self.send(start)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if start is not None:
+            headers = MutableHeaders(scope=start)
+            if not more_body and len(body) < self.manager.min_size:
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = await self.manager.compress(body, self.encoding, cache=self.public and "set-cookie" not in headers)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+            # Streamed: the compressed length is only known at the end
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            self.compressor = self.manager.stream(self.encoding)
+            await self.send(start)
+        elif self.compressor is None:
+            await self.send(message)
+            return
+
+        body = await self.manager.compress_chunk(self.compressor, body)
+        if not more_body:
+            body += self.compressor.finish()
+            self.manager.streamed(self.compressor)
+        if body or not more_body:
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    @staticmethod
+    def _compressible(status: int, headers: MutableHeaders) -> bool:
+        return (
+            200 <= status and status not in (204, 304)
+            and "content-encoding" not in headers
+            and compressible(headers.get("content-type", ""))
+        )
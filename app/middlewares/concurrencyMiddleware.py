@@ -0,0 +1,86 @@
+import time
+from typing import Optional
+from urllib.parse import parse_qs
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.managers.concurrencyManager import ConcurrencyManager, route_priority
+from app.utils.responses import SchemaJSONResponse
+
+# Never queued nor shed: health, docs and the metrics themselves must stay reachable under overload
+EXEMPT_PATHS = {
+    "/", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json",
+    "/metrics/concurrency", "/metrics/tokens", "/metrics/jobs", "/metrics/availability",
+    "/metrics/idempotency", "/metrics/geocoding", "/metrics/facets",
+    "/metrics/autocomplete", "/metrics/compression", "/metrics/queries",
+}
+# Exempt only when waiting: the change feed's long-polls and streams spend their time waiting, not loading
+# the server, its plain reads are limited like any other
+WAITING_PATHS = {"/changes"}
+# Same for these routes: event streams stay open while idle, and are bounded by their own managers
+EXEMPT_ROUTES = {"/hotels/{hotel_id}/availability/stream"}
+# Admitted and shed like the others, at the lowest priority, but their latency is left out of the limit:
+# imports last as long as their upload and would pass for an overload
+UNSAMPLED_ROUTES = {"/hotels/import"}
+
+def _route_path(scope: Scope) -> Optional[str]:
+    """Path template of the route serving the request, so metrics are per route and not per URL."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return None
+
+def _waits(scope: Scope) -> bool:
+    """Whether the request is a long-poll, with a positive `wait`, or an event stream."""
+    if b"text/event-stream" in dict(scope["headers"]).get(b"accept", b""):
+        return True
+    try:
+        return float(parse_qs(scope["query_string"].decode("latin-1")).get("wait", ["0"])[-1]) > 0
+    except ValueError:
+        return False
+
+class ConcurrencyLimitMiddleware:
+    """
+    Admits each HTTP request through the ConcurrencyManager.
+
+    Shed requests get a 503 with Retry-After before reaching the application. The time from admission
+    to the last body chunk is the request's latency sample for the adaptive limit.
+    """
+
+    def __init__(self, app: ASGIApp, manager: Optional[ConcurrencyManager] = None):
+        self.app = app
+        self._manager = manager
+
+    @property
+    def manager(self) -> ConcurrencyManager:
+        return self._manager or ConcurrencyManager()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        manager = self.manager
+        if (
+            scope["type"] != "http" or not manager.enabled or scope["path"] in EXEMPT_PATHS
+            or scope["path"] in WAITING_PATHS and _waits(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route_path = _route_path(scope)
+        if route_path is None or route_path in EXEMPT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = manager.route(f"{scope['method']} {route_path}", route_priority(scope["method"], route_path))
+        if not await manager.acquire(metrics):
+            response = SchemaJSONResponse(
+                {"detail": "Server overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(manager.retry_after(metrics.priority))},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            manager.release(metrics, time.perf_counter() - started, sampled=route_path not in UNSAMPLED_ROUTES)
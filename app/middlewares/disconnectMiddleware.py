@@ -0,0 +1,69 @@
+import asyncio
+from typing import Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.managers.queryTimeoutManager import QueryTimeoutManager
+
+# Requests without a body to read, whose only message left to receive is the disconnect
+CANCELLABLE_METHODS = {"GET", "HEAD"}
+
+class DisconnectMiddleware:
+    """
+    Cancels a read request whose client disconnects before its response starts.
+
+    Starlette only notices a disconnect when it sends the response, so a client giving up on a slow
+    search would leave its query running on Postgres and its connection out of the pool. The request
+    runs in a task of its own while this middleware listens for the disconnect, and cancels the task
+    when it comes first; cancelling the task cancels its query. Messages read while listening are
+    handed on to the application, which still sees the disconnect of a streamed response.
+    """
+
+    def __init__(self, app: ASGIApp, manager: Optional[QueryTimeoutManager] = None):
+        self.app = app
+        self._manager = manager
+
+    @property
+    def manager(self) -> QueryTimeoutManager:
+        return self._manager or QueryTimeoutManager()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        manager = self.manager
+        if scope["type"] != "http" or scope["method"] not in CANCELLABLE_METHODS or not manager.cancel_on_disconnect:
+            await self.app(scope, receive, send)
+            return
+
+        messages: "asyncio.Queue[Message]" = asyncio.Queue()
+        response_started = False
+        disconnected = False
+
+        async def send_watched(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        request = asyncio.ensure_future(self.app(scope, messages.get, send_watched))
+
+        async def listen():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not response_started and not request.done():
+                        disconnected = True
+                        request.cancel()
+                    return
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await request
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            # Nobody is left to answer; routing filled in the route when the request got that far
+            route = scope.get("route")
+            manager.cancelled(route.path if route is not None else scope["path"])
+        finally:
+            listener.cancel()
+            if not request.done():
+                request.cancel()
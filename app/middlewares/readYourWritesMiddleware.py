@@ -0,0 +1,34 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.managers.databaseManager import DatabaseManager, ReplicaRouter
+
+# Requests that never write, their responses leave the client's reads where they are
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the read-your-writes cookie on the responses to writes, when reads may go to replicas.
+
+    The cookie holds the time of the write: any worker reading it sends the client's reads to the
+    primary until the stickiness window ends, whatever token or address the client comes with.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @property
+    def router(self) -> ReplicaRouter:
+        return DatabaseManager().replica_router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        router = self.router
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not router.replicas or router.stickiness_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message: Message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (b"set-cookie", router.write_cookie().encode("latin-1"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
@@ -1,4 +1,10 @@
 from .userModel import User
 from .userRoleModel import UserRole
 from .bookingModel import Booking
-from .roomModel import Room
\ No newline at end of file
+from .roomModel import Room
+from .hotelModel import Hotel
+from .rateLimitModel import RateLimit
+from .sessionModel import UserSession
+from .jobModel import Job
+from .changeModel import Change
+from .idempotencyModel import IdempotencyKey
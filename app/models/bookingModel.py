@@ -1,17 +1,21 @@
-from sqlalchemy import Column, Integer, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Date, Boolean, Index, false
 from sqlalchemy.orm import relationship
 from app.managers.databaseManager import Base
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_room_id_start_date", "room_id", "start_date"),
+        Index("ix_bookings_user_id_start_date", "user_id", "start_date"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
     nbr_people = Column(Integer, nullable=False)
-    breakfast = Column(Boolean, default=False)
+    breakfast = Column(Boolean, default=False, server_default=false())
 
     user = relationship("User", back_populates="bookings")
     room = relationship("Room", back_populates="bookings")
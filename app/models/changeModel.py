@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.managers.databaseManager import Base
+
+class Change(Base):
+    """A change to a booking, room or hotel, written in the transaction making it."""
+    __tablename__ = "changes"
+    __table_args__ = (
+        Index("ix_changes_txid_id", "txid", "id"),
+        # Changes past their retention are deleted by age
+        Index("ix_changes_created_at", "created_at"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # Id of the writing transaction: the feed is read in (txid, id) order, up to the oldest transaction still running
+    txid = Column(BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint"))
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)
+    # The entity after the change, null for deletions
+    data = Column(JSONB, nullable=True)
+    # The entity before an update, null for creations and deletions
+    previous = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,12 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, Float, Index, false
+from sqlalchemy.orm import relationship
 from app.managers.databaseManager import Base
 
 class Hotel(Base):
     __tablename__ = "hotels"
+    __table_args__ = (
+        # Nearby searches scan the latitude band of their bounding box and filter longitudes in the index
+        Index("ix_hotels_latitude_longitude", "latitude", "longitude"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
-    address = Column(String, nullable=False)
-    description = Column(String, nullable=True)
-    rating = Column(Float, nullable=True)
-    breakfast = Column(Boolean, default=False)
\ No newline at end of file
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    address = Column(String(255), nullable=False)
+    # Set on write, the address being free text; hotels are counted per city in faceted searches
+    city = Column(String(100), nullable=True, index=True)
+    description = Column(Text, nullable=True)
+    rating = Column(DECIMAL(2, 1), nullable=True)
+    breakfast = Column(Boolean, default=False, server_default=false())
+    # Geocoded from the address when the hotel is written, null when it could not be
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+    # Loaded on demand with selectinload, rooms go with their hotel in the database
+    rooms = relationship("Room", back_populates="hotel", order_by="Room.id", passive_deletes=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, LargeBinary, SmallInteger, func
+from app.managers.databaseManager import Base
+
+class IdempotencyKey(Base):
+    """The outcome of a request sent with an Idempotency-Key, replayed to the retries of that request."""
+    __tablename__ = "idempotency_keys"
+
+    # BLAKE2b-256 of the route, the caller and the client's key, whatever the key's length
+    key_hash = Column(LargeBinary(32), primary_key=True)
+    # BLAKE2b-256 of the request body, a key reused for another request is refused
+    request_hash = Column(LargeBinary(32), nullable=False)
+    # Both null until the response is stored: the row is only visible once the request's writes commit,
+    # so a row left without them belongs to a request that ran and whose response was lost
+    status_code = Column(SmallInteger, nullable=True)
+    response = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.managers.databaseManager import Base
+
+class Job(Base):
+    """A background job, written in the transaction of the change that triggers it."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the earliest due job among pending ones and running ones whose lease expired
+        Index("ix_jobs_due_run_at", "run_at", postgresql_where=text("status IN ('pending', 'running')")),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    # Enqueueing a second job with the same key is a no-op
+    idempotency_key = Column(String(255), nullable=True, unique=True)
+    status = Column(String(20), nullable=False, server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False)
+    # When a pending job is due, or when the lease of a running one expires
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Float, Integer, String, text
+from app.managers.databaseManager import Base
+
+class RateLimit(Base):
+    __tablename__ = "rate_limits"
+
+    key = Column(String(255), primary_key=True)
+    # Token bucket in its GCRA form: the epoch at which the bucket is full again
+    tat = Column(Float, nullable=False, server_default=text("0"))
+    failures = Column(Integer, nullable=False, server_default=text("0"))
+    window_start = Column(Float, nullable=False, server_default=text("0"))
+    locked_until = Column(Float, nullable=False, server_default=text("0"))
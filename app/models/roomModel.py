@@ -5,9 +5,10 @@ from app.managers.databaseManager import Base
 class Room(Base):
     __tablename__ = "rooms"
 
-    id = Column(Integer, primary_key=True, index=True)
-    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, index=True)
     price = Column(DECIMAL(10, 2), nullable=False)
     number_of_beds = Column(Integer, nullable=False)
 
+    hotel = relationship("Hotel", back_populates="rooms")
     bookings = relationship("Booking", back_populates="room", cascade="all, delete-orphan")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, LargeBinary, String, func
+from app.managers.databaseManager import Base
+
+class UserSession(Base):
+    """A login session, the server side of a refresh token."""
+    __tablename__ = "sessions"
+
+    id = Column(String(32), primary_key=True)
+    # Revoked sessions outlive their user until purged, so other workers still learn of the revocation
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    # SHA-256 of the current refresh token secret, and of the one it replaced to detect reuse
+    refresh_hash = Column(LargeBinary(32), nullable=False)
+    previous_hash = Column(LargeBinary(32), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True, index=True)
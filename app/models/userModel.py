@@ -4,7 +4,7 @@ from app.managers.databaseManager import Base
 class User(Base):
     __tablename__ = 'users'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, nullable=False)
     pseudo = Column(String(100), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
@@ -1,13 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, false
 from sqlalchemy.orm import relationship
 from app.managers.databaseManager import Base
 
 class UserRole(Base):
     __tablename__ = 'user_roles'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True)
-    is_admin = Column(Boolean, default=False, nullable=False)
+    is_admin = Column(Boolean, default=False, server_default=false(), nullable=False)
 
     user = relationship(
         "User",
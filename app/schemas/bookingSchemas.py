@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, TypeAdapter, ConfigDict
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 class BookingBase(BaseModel):
     room_id: int
@@ -30,3 +30,4 @@ class BookingResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+BookingResponseList = TypeAdapter(List[BookingResponse])
@@ -0,0 +1,21 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import List, Literal, Optional
+
+class ChangeResponse(BaseModel):
+    id: int
+    cursor: str
+    entity: Literal["booking", "room", "hotel"]
+    entity_id: int
+    operation: Literal["create", "update", "delete"]
+    data: Optional[dict] = None
+    # The entity before an update
+    previous: Optional[dict] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ChangeFeedResponse(BaseModel):
+    changes: List[ChangeResponse]
+    # Pass it back as `since` to get the changes that follow
+    next: str
@@ -1,12 +1,30 @@
-from pydantic import BaseModel, condecimal, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter, condecimal, confloat, constr, ConfigDict, model_validator
+from decimal import Decimal
+from typing import Dict, List, Optional
+from app.schemas.roomSchemas import RoomResponse
+
+Latitude = confloat(ge=-90, le=90)
+Longitude = confloat(ge=-180, le=180)
+
+def _coordinates_together(hotel):
+    if (hotel.latitude is None) != (hotel.longitude is None):
+        raise ValueError("latitude and longitude must be given together")
+    return hotel
 
 class HotelBase(BaseModel):
     name: str
     address: str
+    city: Optional[constr(max_length=100)] = None
     description: Optional[str] = None
     rating: Optional[condecimal(max_digits=2, decimal_places=1)] = None 
     breakfast: bool = False
+    # Geocoded from the address when left out
+    latitude: Optional[Latitude] = None
+    longitude: Optional[Longitude] = None
+
+    @model_validator(mode="after")
+    def coordinates_together(self):
+        return _coordinates_together(self)
 
 class HotelCreate(HotelBase):
     pass
@@ -14,12 +32,52 @@ class HotelCreate(HotelBase):
 class HotelUpdate(BaseModel):
     name: Optional[str] = None
     address: Optional[str] = None
+    city: Optional[constr(max_length=100)] = None
     description: Optional[str] = None
     rating: Optional[condecimal(max_digits=2, decimal_places=1)] = None
     breakfast: Optional[bool] = None
+    latitude: Optional[Latitude] = None
+    longitude: Optional[Longitude] = None
+
+    @model_validator(mode="after")
+    def coordinates_together(self):
+        return _coordinates_together(self)
 
 class HotelResponse(HotelBase):
     id: int
 
     model_config = ConfigDict(from_attributes=True)
 
+class HotelSummary(BaseModel):
+    rooms: int
+    beds: int
+    # Null without rooms
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+
+class HotelDetailResponse(HotelResponse):
+    # Only set when asked for with `include`
+    rooms: Optional[List[RoomResponse]] = None
+    summary: Optional[HotelSummary] = None
+
+class HotelNearbyResponse(HotelResponse):
+    # Great-circle distance from the searched point, in kilometres
+    distance: float
+
+class FacetValue(BaseModel):
+    value: str
+    # Hotels matching the other facets' filters that have this value
+    count: int
+
+class FacetedHotelSearchResponse(BaseModel):
+    hotels: List[HotelResponse]
+    # Hotels matching every filter, None with no facets when counting them ran out of time
+    total: Optional[int]
+    facets: Dict[str, List[FacetValue]]
+
+class HotelSuggestion(BaseModel):
+    id: int
+    name: str
+    city: Optional[str] = None
+
+HotelResponseList = TypeAdapter(List[HotelResponse])
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, conint, constr, field_validator
+from typing import List
+from app.schemas.hotelSchemas import HotelCreate
+from app.schemas.roomSchemas import RoomCreate
+
+class HotelImport(HotelCreate):
+    # Bounded like their columns: rows are copied without the round trip that would reject them one by one
+    name: constr(max_length=255)
+    address: constr(max_length=255)
+
+    @field_validator("name", "address", "city", "description")
+    @classmethod
+    def no_nul(cls, value):
+        # Postgres text cannot hold NUL, one would fail the COPY of the whole chunk
+        if value is not None and "\x00" in value:
+            raise ValueError("NUL characters are not allowed")
+        return value
+
+class RoomImport(RoomCreate):
+    number_of_beds: conint(ge=-2**31, lt=2**31)
+
+class ImportRowError(BaseModel):
+    # Line of the rejected row in the uploaded file, the header being line 1 of a CSV
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    hotels: int = 0
+    rooms: int = 0
+    error_count: int = 0
+    # The first errors only, `error_count` counts them all
+    errors: List[ImportRowError] = []
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, condecimal, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, TypeAdapter, condecimal, ConfigDict
+from typing import List, Optional
 
 class RoomBase(BaseModel):
     hotel_id: int
@@ -18,3 +18,4 @@ class RoomResponse(RoomBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+RoomResponseList = TypeAdapter(List[RoomResponse])
@@ -24,3 +24,12 @@ class UserWithRoleResponse(UserResponse):
     is_admin: bool
 
     model_config = ConfigDict(from_attributes=True)
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
@@ -1,60 +1,65 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 import jwt
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.managers.databaseManager import get_db
-from app.services.userService import UserService
+from app.managers.sessionManager import ACCESS_TOKEN_EXPIRE_MINUTES, SessionManager
+from app.managers.tokenManager import TokenManager
+from app.schemas.userSchemas import UserWithRoleResponse
 
 
-SECRET_KEY = "your-secret-key"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
-
-# Gestion du hash des mots de passe
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Gestion du hash des mots de passe, le contexte passlib est créé au premier usage
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 Form pour recevoir `username` et `password`
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 # Fonction pour hacher un mot de passe
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 # Vérification entre un mot de passe en clair et son hash
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 # Génération d'un JWT Token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return TokenManager().encode(to_encode)
 
-# Décoder et vérifier le token JWT
+# Décoder et vérifier le token JWT, avec la clé de son `kid` et le cache des tokens déjà vérifiés
 def decode_access_token(token: str):
     """Décode et vérifie le JWT."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return TokenManager().decode(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expiré")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
 
-# Dépendance pour sécuriser les routes
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    """Récupère l'utilisateur actuel à partir du JWT."""
+# Claims du token d'accès, vérifiés sans requête : signature, expiration et liste de révocation
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """Décode le JWT et refuse les sessions révoquées."""
     payload = decode_access_token(token)
-    pseudo = payload.get("sub")
-    
-    if not pseudo:
+    if not payload.get("sub") or "uid" not in payload or "sid" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
+    if SessionManager().is_revoked(payload["sid"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session révoquée")
+    return payload
 
-    user = await UserService.get_user_by_pseudo(db, pseudo)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Utilisateur introuvable")
-    return user
+# Dépendance pour sécuriser les routes
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> UserWithRoleResponse:
+    """Récupère l'utilisateur actuel à partir du JWT, tel qu'il était au dernier login ou refresh."""
+    # Les claims signés ont été validés à leur émission
+    return UserWithRoleResponse.model_construct(
+        id=payload["uid"],
+        email=payload["email"],
+        pseudo=payload["sub"],
+        is_admin=payload.get("adm", False),
+    )
@@ -0,0 +1,60 @@
+"""
+Production server settings, loaded by gunicorn with `--config python:app.server`.
+
+The gunicorn master imports the application once (`preload_app`) and forks uvicorn workers running
+on uvloop and httptools; each worker warms its own pools in the application lifespan. This profile
+speaks HTTP/1.1; `app.http2Server` runs the same application on hypercorn for HTTP/2.
+"""
+import os
+import sys
+from uvicorn_worker import UvicornWorker
+
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Idle seconds a client connection is kept open for its next request. Longer than the 60 s idle
+# timeout of common load balancers, so they close idle connections first and never reuse one the
+# server is closing; mobile clients coming back within the window skip the TCP and TLS handshakes
+KEEPALIVE = int(os.getenv("KEEPALIVE", "75"))
+# Connections waiting to be accepted, for bursts of new connections
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+# Open connections plus running requests per worker beyond which new requests get a 503 before
+# reaching the application. Idle keep-alive connections count, so keep it well above the traffic
+# of a worker; under it, ConcurrencyLimitMiddleware queues and sheds requests by priority
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", "4096"))
+
+def worker_count() -> int:
+    """WEB_CONCURRENCY when set, otherwise one worker per CPU available to the process."""
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class AppWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop and httptools, which fails to boot when the lifespan startup fails."""
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": GRACEFUL_TIMEOUT,
+        "limit_concurrency": LIMIT_CONCURRENCY or None,
+    }
+
+# gunicorn settings
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = worker_count()
+worker_class = "app.server.AppWorker"
+preload_app = True
+# On SIGTERM workers stop accepting connections and get this long to finish in-flight requests
+graceful_timeout = GRACEFUL_TIMEOUT
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = KEEPALIVE
+backlog = BACKLOG
+accesslog = "-"
+
+def main():
+    """Launched with `poetry run serve` at root level"""
+    from gunicorn.app.wsgiapp import run
+
+    sys.argv = ["gunicorn", "--config", "python:app.server", "app.main:app", *sys.argv[1:]]
+    run()
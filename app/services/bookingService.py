@@ -1,12 +1,17 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, exists, or_, update
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Collection, List, Optional
 from app.models.bookingModel import Booking
-from app.schemas.bookingSchemas import BookingCreate, BookingUpdate, BookingResponse
+from app.schemas.bookingSchemas import BookingCreate, BookingUpdate, BookingResponse, BookingResponseList
 from app.schemas.userSchemas import UserResponse
 from app.services.userService import UserService
+from app.services.userRoleService import UserRoleService
 from app.services.roomService import RoomService
+from app.services.jobService import JobService
+from app.services.changeService import ChangeService
+from app.utils.jsonQuery import json_array, schema_columns
 from fastapi import HTTPException, status
 
 class BookingService:
@@ -18,15 +23,26 @@ class BookingService:
         booking = result.scalars().first()
         return BookingResponse.from_orm(booking) if booking else None
 
+    @staticmethod
+    async def _bookings_query(db: AsyncSession, columns, current_user: UserResponse):
+        """Admins list every booking, other users only their own."""
+        query = select(*columns)
+        if not await UserService.is_admin(db, current_user.id):
+            query = query.filter(Booking.user_id == current_user.id)
+        return query
+
     @staticmethod
     async def get_bookings(db: AsyncSession, current_user: UserResponse) -> List[BookingResponse]:
         """Retrieve all bookings. Admins get all bookings, users get their own."""
-        if await UserService.is_admin(db, current_user.id):
-            result = await db.execute(select(Booking))
-        else:
-            result = await db.execute(select(Booking).filter(Booking.user_id == current_user.id))
-        bookings = result.scalars().all()
-        return [BookingResponse.from_orm(booking) for booking in bookings]
+        result = await db.execute(await BookingService._bookings_query(db, Booking.__table__.c, current_user))
+        return BookingResponseList.validate_python([dict(row) for row in result.mappings()])
+
+    @staticmethod
+    async def get_bookings_json(db: AsyncSession, current_user: UserResponse, fields: Optional[Collection[str]] = None) -> str:
+        """Same listing as `get_bookings`, as a JSON array serialized by Postgres, of `fields` only if given."""
+        columns = schema_columns(Booking.__table__, BookingResponse, fields)
+        result = await db.execute(json_array(await BookingService._bookings_query(db, columns, current_user)))
+        return result.scalar()
 
     @staticmethod
     async def create_booking(db: AsyncSession, booking_data: BookingCreate, current_user: UserResponse) -> BookingResponse:
@@ -46,6 +62,13 @@ class BookingService:
 
         db.add(new_booking)
         try:
+            await db.flush()
+            # Committed with the booking or not at all
+            await JobService.enqueue(
+                db, "booking.confirmation", {"booking_id": new_booking.id},
+                idempotency_key=f"booking.confirmation:{new_booking.id}",
+            )
+            ChangeService.record(db, "booking", new_booking.id, "create", BookingResponse.from_orm(new_booking))
             await db.commit()
             await db.refresh(new_booking)
             return BookingResponse.from_orm(new_booking)
@@ -54,44 +77,55 @@ class BookingService:
             raise HTTPException(status_code=400, detail="Invalid booking data.")
 
     @staticmethod
-    async def update_booking(db: AsyncSession, booking_id: int, booking_data: BookingUpdate, current_user: UserResponse) -> Optional[BookingResponse]:
-        """Update an existing booking if authorized."""
-        booking = await db.get(Booking, booking_id)
-        if not booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        
-        if booking.user_id != current_user.id and not await UserService.is_admin(db, current_user.id):
-            raise HTTPException(status_code=403, detail="Not authorized to update this booking")
+    def _writable(booking_id: int, current_user: UserResponse):
+        """The booking, if the current user owns it or is an admin."""
+        return Booking.id == booking_id, or_(Booking.user_id == current_user.id, UserRoleService.admin_exists(current_user.id))
 
-        for key, value in booking_data.dict(exclude_unset=True).items():
-            setattr(booking, key, value)
-        
+    @staticmethod
+    async def _not_written(db: AsyncSession, booking_id: int, action: str) -> HTTPException:
+        """Why a write matched no booking: it does not exist, or it belongs to someone else."""
+        await db.rollback()
+        if not await db.scalar(select(exists().where(Booking.id == booking_id))):
+            return HTTPException(status_code=404, detail="Booking not found")
+        return HTTPException(status_code=403, detail=f"Not authorized to {action} this booking")
+
+    @staticmethod
+    async def update_booking(db: AsyncSession, booking_id: int, booking_data: BookingUpdate, current_user: UserResponse) -> Optional[BookingResponse]:
+        """Update an existing booking if authorized, in one statement."""
+        # An empty update still checks the booking exists and may be written
+        values = booking_data.model_dump(exclude_unset=True) or {"id": Booking.id}
+        statement = update(Booking).where(*BookingService._writable(booking_id, current_user)).values(**values)
         try:
-            await db.commit()
-            await db.refresh(booking)
-            return BookingResponse.from_orm(booking)
+            result = await db.execute(ChangeService.returning(db, statement, Booking.__table__, BookingResponse, "booking", "update"))
+            row = result.mappings().first()
         except IntegrityError:
             await db.rollback()
             raise HTTPException(status_code=400, detail="Invalid booking data.")
+        if row is None:
+            raise await BookingService._not_written(db, booking_id, "update")
+        await db.commit()
+        return BookingResponse.model_validate(dict(row))
 
     @staticmethod
     async def delete_booking(db: AsyncSession, booking_id: int, current_user: UserResponse) -> bool:
-        """Delete a booking if authorized."""
-        booking = await db.get(Booking, booking_id)
-        if not booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        
-        if booking.user_id != current_user.id and not await UserService.is_admin(db, current_user.id):
-            raise HTTPException(status_code=403, detail="Not authorized to delete this booking")
-
-        await db.delete(booking)
+        """Delete a booking if authorized, in one statement."""
+        statement = delete(Booking).where(*BookingService._writable(booking_id, current_user))
+        result = await db.execute(ChangeService.returning(db, statement, Booking.__table__, BookingResponse, "booking", "delete"))
+        if result.first() is None:
+            raise await BookingService._not_written(db, booking_id, "delete")
         await db.commit()
         return True
     
     @staticmethod
     async def get_bookings_by_user(db: AsyncSession, user_id: int) -> List[BookingResponse]:
         """Retrieve all bookings for a specific user."""
-        result = await db.execute(select(Booking).filter(Booking.user_id == user_id))
-        bookings = result.scalars().all()
-        return [BookingResponse.from_orm(booking) for booking in bookings]
+        result = await db.execute(select(Booking.__table__).filter(Booking.user_id == user_id))
+        return BookingResponseList.validate_python([dict(row) for row in result.mappings()])
+
+    @staticmethod
+    async def get_bookings_by_user_json(db: AsyncSession, user_id: int, fields: Optional[Collection[str]] = None) -> str:
+        """Bookings of a user as a JSON array serialized by Postgres, of `fields` only if given."""
+        query = select(*schema_columns(Booking.__table__, BookingResponse, fields)).filter(Booking.user_id == user_id)
+        result = await db.execute(json_array(query))
+        return result.scalar()
 
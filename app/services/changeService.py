@@ -0,0 +1,161 @@
+import re
+import time
+from itertools import chain
+from typing import AsyncIterator, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, String, Table, Text, bindparam, cast, event, func, insert, literal, literal_column, select, tuple_
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import Update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.changeFeedManager import CHANGE_HEARTBEAT_SECONDS, ChangeFeedManager
+from app.managers.databaseManager import DatabaseManager
+from app.models.changeModel import Change
+from app.schemas.changeSchemas import ChangeFeedResponse, ChangeResponse
+from app.utils.jsonQuery import schema_columns
+
+Cursor = Tuple[int, int]
+
+CURSOR_PATTERN = re.compile(r"^(\d{1,19})-(\d{1,19})$")
+FEED_START = "0-0"
+
+def parse_cursor(cursor: str) -> Cursor:
+    """`<txid>-<id>` of the last change read, ValueError when malformed."""
+    match = CURSOR_PATTERN.match(cursor)
+    if not match:
+        raise ValueError(f"Invalid cursor {cursor!r}, expected '<txid>-<id>' as returned in 'next'")
+    return int(match.group(1)), int(match.group(2))
+
+def format_cursor(txid: int, change_id: int) -> str:
+    return f"{txid}-{change_id}"
+
+def _notify_feed(session):
+    ChangeFeedManager().notify()
+
+def _horizon():
+    """Transaction id of the oldest transaction still running: changes from it onwards may yet be joined."""
+    return cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+def visible_after(since: Cursor):
+    """Conditions selecting the committed changes following `since` that no running transaction can precede."""
+    after = tuple_(bindparam("since_txid", since[0], type_=BigInteger), bindparam("since_id", since[1], type_=BigInteger))
+    return tuple_(Change.txid, Change.id) > after, Change.txid < _horizon()
+
+class ChangeService:
+    """
+    Change feed of bookings, rooms and hotels.
+
+    Mutations record their change in their own transaction. The feed is read in (transaction id, id)
+    order and only up to the oldest transaction still running, so a transaction committing late can
+    never land behind a cursor already handed out.
+    """
+
+    @staticmethod
+    def record(db: AsyncSession, entity: str, entity_id: int, operation: str, data: Optional[BaseModel] = None):
+        """Add a change to the session's transaction, it is published once the caller commits."""
+        db.add(Change(
+            entity=entity,
+            entity_id=entity_id,
+            operation=operation,
+            data=data.model_dump(mode="json") if data is not None else None,
+        ))
+        event.listen(db.sync_session, "after_commit", _notify_feed, once=True)
+
+    @staticmethod
+    def returning(db: AsyncSession, statement, table: Table, schema: Type[BaseModel], entity: str, operation: str) -> Select:
+        """
+        `statement`, an UPDATE or DELETE of `table`, returning the rows it wrote and recording their change
+        in the same statement: the new state and the one it replaced for an update, the last one for a delete.
+        """
+        def state(rows):
+            columns = schema_columns(rows, schema)
+            return func.jsonb_build_object(*chain.from_iterable((literal_column(f"'{name}'"), column) for name, column in zip(schema.model_fields, columns)))
+
+        if isinstance(statement, Update):
+            # The rows as the update finds them, locked until it commits so no other write lands in between
+            before = select(*table.c).where(statement.whereclause).with_for_update().cte("before")
+            written = statement.where(table.c.id == before.c.id).returning(*table.c).cte("written")
+            columns = ["entity", "entity_id", "operation", "data", "previous"]
+            changes = select(literal(entity, String), written.c.id, literal(operation, String), state(written), state(before)).join(
+                before, before.c.id == written.c.id,
+            )
+        else:
+            written = statement.returning(*table.c).cte("written")
+            columns = ["entity", "entity_id", "operation", "data"]
+            changes = select(literal(entity, String), written.c.id, literal(operation, String), state(written))
+        recorded = insert(Change).from_select(columns, changes).cte("recorded")
+        event.listen(db.sync_session, "after_commit", _notify_feed, once=True)
+        return select(*written.c).add_cte(recorded)
+
+    @staticmethod
+    async def get_changes(db: AsyncSession, since: Cursor, limit: int, entities: Optional[List[str]] = None) -> ChangeFeedResponse:
+        """The changes following the `since` cursor."""
+        query = select(Change).where(*visible_after(since))
+        if entities:
+            query = query.where(Change.entity.in_(entities))
+        result = await db.execute(query.order_by(Change.txid, Change.id).limit(limit))
+
+        changes = [
+            ChangeResponse(
+                id=change.id,
+                cursor=format_cursor(change.txid, change.id),
+                entity=change.entity,
+                entity_id=change.entity_id,
+                operation=change.operation,
+                data=change.data,
+                previous=change.previous,
+                created_at=change.created_at,
+            )
+            for change in result.scalars()
+        ]
+        return ChangeFeedResponse(changes=changes, next=changes[-1].cursor if changes else format_cursor(*since))
+
+    @staticmethod
+    async def head(db: AsyncSession) -> Cursor:
+        """Cursor of the last change readable now, to follow only the changes to come."""
+        result = await db.execute(
+            select(Change.txid, Change.id).where(Change.txid < _horizon()).order_by(Change.txid.desc(), Change.id.desc()).limit(1)
+        )
+        row = result.first()
+        return (row.txid, row.id) if row else (0, 0)
+
+    @staticmethod
+    async def wait_for_changes(
+        db: AsyncSession, since: Cursor, limit: int, wait: float, entities: Optional[List[str]] = None
+    ) -> ChangeFeedResponse:
+        """Long-poll: the changes following `since`, waiting up to `wait` seconds for the first one."""
+        feed_manager = ChangeFeedManager()
+        deadline = time.monotonic() + wait
+        while True:
+            ticket = feed_manager.ticket()
+            feed = await ChangeService.get_changes(db, since, limit, entities)
+            remaining = deadline - time.monotonic()
+            if feed.changes or remaining <= 0:
+                return feed
+            # The connection goes back to the pool while waiting
+            await db.rollback()
+            await feed_manager.wait(ticket, remaining)
+
+    @staticmethod
+    async def stream(since: Cursor, limit: int, entities: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Server-sent events, one per change with its cursor as event id, until the client leaves."""
+        db_manager = DatabaseManager()
+        feed_manager = ChangeFeedManager()
+        last_sent = time.monotonic()
+        while True:
+            ticket = feed_manager.ticket()
+            # A session per read, the stream outlives the request's dependencies
+            async with db_manager.async_session() as db:
+                feed = await ChangeService.get_changes(db, since, limit, entities)
+
+            for change in feed.changes:
+                yield f"id: {change.cursor}\nevent: change\ndata: {change.model_dump_json()}\n\n"
+            since = parse_cursor(feed.next)
+            if feed.changes:
+                last_sent = time.monotonic()
+                if len(feed.changes) == limit:
+                    continue
+            elif time.monotonic() - last_sent >= CHANGE_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await feed_manager.wait(ticket, CHANGE_HEARTBEAT_SECONDS)
@@ -1,9 +1,85 @@
+import math
+from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Numeric, and_, case, cast, delete, exists, func, or_, true, tuple_, update
 from sqlalchemy.future import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import selectinload
+from app.managers.facetManager import (
+    BREAKFAST_VALUES, FACETS, NO_ROOMS, PRICE_BOUNDS, PRICE_BUCKETS, PRICE_VALUES, RATING_BUCKETS, RATING_VALUES, UNRATED,
+    FacetManager,
+)
+from app.managers.geocodingManager import GeocodingManager
+from app.managers.queryTimeoutManager import statement_timed_out
+from app.managers.searchIndexManager import AUTOCOMPLETE_RETRY_AFTER, SearchIndexManager, tokenize, word_pattern
 from app.models.hotelModel import Hotel
-from app.schemas.hotelSchemas import HotelCreate, HotelUpdate, HotelResponse
-from typing import List, Optional
+from app.models.roomModel import Room
+from app.schemas.hotelSchemas import (
+    FacetedHotelSearchResponse, FacetValue, HotelCreate, HotelDetailResponse, HotelResponse, HotelResponseList,
+    HotelSuggestion, HotelSummary, HotelUpdate,
+)
+from app.schemas.roomSchemas import RoomResponse
+from app.services.changeService import ChangeService
+from app.services.userRoleService import UserRoleService
+from fastapi import HTTPException
+from app.utils.jsonQuery import json_aggregate, json_array, schema_columns
+from typing import Collection, Dict, List, Optional
+
+# Mean Earth radius, the distances are great-circle distances on a sphere
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# Nearby searches start with a circle NEARBY_WIDENING ** NEARBY_STEPS times smaller than asked, but no
+# smaller than NEARBY_MIN_RADIUS_KM, and widen it by NEARBY_WIDENING until it holds the page
+NEARBY_WIDENING = 4
+NEARBY_STEPS = 2
+NEARBY_MIN_RADIUS_KM = 0.5
+# Cities listed in a faceted search, the most common first, besides those filtered on
+FACET_CITY_LIMIT = 20
+
+def _distance_km(latitude: float, longitude: float):
+    """Haversine distance from the point to each hotel, in SQL."""
+    half_dlat = func.radians(Hotel.latitude - latitude) / 2
+    half_dlon = func.radians(Hotel.longitude - longitude) / 2
+    a = func.power(func.sin(half_dlat), 2) + (
+        math.cos(math.radians(latitude)) * func.cos(func.radians(Hotel.latitude)) * func.power(func.sin(half_dlon), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+def _bounding_box(latitude: float, longitude: float, radius_km: float) -> list:
+    """
+    Conditions on the box around the circle, which the coordinates index can answer. Meridians
+    converge towards the poles: a circle reaching one spans every longitude, and a box crossing the
+    antimeridian is split in two ranges.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    conditions = [Hotel.latitude.between(latitude - dlat, latitude + dlat)]
+    if abs(latitude) + dlat >= 90:
+        return conditions
+    dlon = math.degrees(math.asin(math.sin(math.radians(dlat)) / math.cos(math.radians(latitude))))
+    west, east = longitude - dlon, longitude + dlon
+    if west < -180:
+        conditions.append(or_(Hotel.longitude >= west + 360, Hotel.longitude <= east))
+    elif east > 180:
+        conditions.append(or_(Hotel.longitude >= west, Hotel.longitude <= east - 360))
+    else:
+        conditions.append(Hotel.longitude.between(west, east))
+    return conditions
+
+def _rating_bucket(rating):
+    """Rating bucket in SQL, as `facetManager.rating_bucket` labels it."""
+    return case(
+        (rating.is_(None), UNRATED),
+        *((rating >= index, RATING_BUCKETS[index]) for index in reversed(range(1, len(RATING_BUCKETS)))),
+        else_=RATING_BUCKETS[0],
+    )
+
+def _price_bucket(price):
+    """Price bucket in SQL, as `facetManager.price_bucket` places it."""
+    return case(
+        (price.is_(None), NO_ROOMS),
+        *((price >= PRICE_BOUNDS[index], PRICE_BUCKETS[index + 1]) for index in reversed(range(len(PRICE_BOUNDS)))),
+        else_=PRICE_BUCKETS[0],
+    )
 
 class HotelService:
 
@@ -14,6 +90,48 @@ class HotelService:
         hotel = result.scalars().first()
         return HotelResponse.model_validate(hotel) if hotel else None
 
+    @staticmethod
+    async def get_hotel_detail(db: AsyncSession, hotel_id: int, include: Collection[str] = ()) -> Optional[HotelDetailResponse]:
+        """
+        Retrieve a hotel with what `include` asks for: its `rooms`, and a `summary` of them. The rooms
+        are loaded along with the hotel, the summary computed from them then, from one aggregate
+        otherwise. The response only sets the fields asked for.
+        """
+        query = select(Hotel).filter(Hotel.id == hotel_id)
+        if "rooms" in include:
+            query = query.options(selectinload(Hotel.rooms))
+        hotel = (await db.execute(query)).scalars().first()
+        if hotel is None:
+            return None
+
+        extra = {}
+        if "rooms" in include:
+            extra["rooms"] = [RoomResponse.model_validate(room) for room in hotel.rooms]
+        if "summary" in include:
+            if "rooms" in include:
+                prices = [room.price for room in hotel.rooms]
+                rooms, beds = len(hotel.rooms), sum(room.number_of_beds for room in hotel.rooms)
+                min_price, max_price = (min(prices), max(prices)) if prices else (None, None)
+            else:
+                rooms, beds, min_price, max_price = (await db.execute(
+                    select(func.count(), func.coalesce(func.sum(Room.number_of_beds), 0), func.min(Room.price), func.max(Room.price))
+                    .where(Room.hotel_id == hotel_id)
+                )).one()
+            extra["summary"] = HotelSummary(rooms=rooms, beds=beds, min_price=min_price, max_price=max_price)
+        return HotelDetailResponse(**HotelResponse.model_validate(hotel).model_dump(), **extra)
+
+    @staticmethod
+    def _hotels_query(columns, name: Optional[str], address: Optional[str], limit: int, offset: int):
+        """Build the hotel search query over plain columns, no ORM entities are loaded."""
+        query = select(*columns)
+
+        if name:
+            query = query.filter(Hotel.name.ilike(f"%{name}%"))
+        if address:
+            query = query.filter(Hotel.address.ilike(f"%{address}%"))
+
+        return query.limit(limit).offset(offset)
+
     @staticmethod
     async def get_hotels(
         db: AsyncSession, 
@@ -23,66 +141,344 @@ class HotelService:
         offset: int = 0
     ) -> List[HotelResponse]:
         """Retrieve hotels with optional filtering by name and address, and pagination."""
-        
-        query = select(Hotel)
+        query = HotelService._hotels_query(Hotel.__table__.c, name, address, limit, offset)
+        result = await db.execute(query)
+        return HotelResponseList.validate_python([dict(row) for row in result.mappings()])
+
+    @staticmethod
+    async def get_hotels_json(
+        db: AsyncSession,
+        name: Optional[str] = None,
+        address: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0,
+        fields: Optional[Collection[str]] = None,
+    ) -> str:
+        """Same search as `get_hotels`, returned as a JSON array serialized by Postgres, of `fields` only if given."""
+        columns = schema_columns(Hotel.__table__, HotelResponse, fields)
+        result = await db.execute(json_array(HotelService._hotels_query(columns, name, address, limit, offset)))
+        return result.scalar()
 
+
+    @staticmethod
+    def _nearby_query(
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        breakfast: Optional[bool],
+        min_rating: Optional[Decimal],
+        limit: int,
+        offset: int,
+        fields: Optional[Collection[str]] = None,
+    ):
+        """
+        Hotels within `radius_km` of the point, nearest first, with their distance rounded to the metre,
+        and the expressions they are ordered by.
+        """
+        distance = _distance_km(latitude, longitude)
+        columns = schema_columns(Hotel.__table__, HotelResponse, fields)
+        if fields is None or "distance" in fields:
+            columns.append(func.round(cast(distance, Numeric), 3).label("distance"))
+        query = select(*columns).where(*_bounding_box(latitude, longitude, radius_km), distance <= radius_km)
+
+        if breakfast is not None:
+            query = query.where(Hotel.breakfast.is_(breakfast))
+        if min_rating is not None:
+            query = query.where(Hotel.rating >= min_rating)
+
+        order_by = [distance, Hotel.id]
+        return query.order_by(*order_by).limit(limit).offset(offset), order_by
+
+    @staticmethod
+    async def get_nearby_hotels_json(
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        breakfast: Optional[bool] = None,
+        min_rating: Optional[Decimal] = None,
+        limit: int = 10,
+        offset: int = 0,
+        fields: Optional[Collection[str]] = None,
+    ) -> str:
+        """
+        Hotels around a point, nearest first, as a JSON array of `HotelNearbyResponse` serialized by Postgres,
+        of `fields` only if given.
+
+        Every hotel of the circle has to be sorted by distance, there being no nearest-neighbour index:
+        in a dense city that is tens of thousands. The search starts with a much smaller circle instead
+        and widens it until the page is full, the nearest hotels of a circle being the nearest of any
+        larger one too.
+        """
+        radius = max(radius_km / NEARBY_WIDENING ** NEARBY_STEPS, min(radius_km, NEARBY_MIN_RADIUS_KM))
+        while True:
+            query, order_by = HotelService._nearby_query(latitude, longitude, radius, breakfast, min_rating, limit, offset, fields)
+            array, rows = json_aggregate(query, order_by)
+            hotels, count = (await db.execute(select(array, func.count()).select_from(rows))).one()
+            if count == limit or radius >= radius_km:
+                return hotels
+            radius = min(radius * NEARBY_WIDENING, radius_km)
+
+    @staticmethod
+    def _facet_hotels(name: Optional[str], address: Optional[str]):
+        """Subquery of the hotels matching the text filters, with their value of each facet."""
+        # Lateral, the cheapest room is looked up once per hotel however often the bucket compares it
+        prices = select(func.min(Room.price).label("price")).where(Room.hotel_id == Hotel.id).lateral("p")
+        query = select(
+            Hotel.id, _rating_bucket(Hotel.rating).label("rating"), Hotel.breakfast, Hotel.city, _price_bucket(prices.c.price).label("price"),
+        ).outerjoin(prices, true())
         if name:
-            query = query.filter(Hotel.name.ilike(f"%{name}%"))
+            query = query.where(Hotel.name.ilike(f"%{name}%"))
         if address:
-            query = query.filter(Hotel.address.ilike(f"%{address}%"))
+            query = query.where(Hotel.address.ilike(f"%{address}%"))
+        return query.subquery("h")
 
-        query = query.limit(limit).offset(offset)
+    @staticmethod
+    def _facet_conditions(hotels, filters: Dict[str, List[str]]) -> dict:
+        """Condition per facet filtered on, over a query exposing the facets as columns."""
+        conditions = {}
+        for facet in FACETS:
+            if filters.get(facet):
+                values = [value == "true" for value in filters[facet]] if facet == "breakfast" else filters[facet]
+                conditions[facet] = hotels.c[facet].in_(values)
+        return conditions
 
-        result = await db.execute(query)
-        hotels = result.scalars().all()
+    @staticmethod
+    async def _count_facets(db: AsyncSession, hotels, filters: Dict[str, List[str]]):
+        """
+        Count the facets of the hotels of a subquery in one grouped query: a grouping set per facet,
+        each group counting the hotels that pass the filters of the other facets, and an empty set
+        for the hotels passing them all.
+        """
+        conditions = HotelService._facet_conditions(hotels, filters)
+        columns = [hotels.c[facet] for facet in FACETS]
+        counts = [
+            func.count().filter(and_(true(), *(condition for other, condition in conditions.items() if other != facet))).label(f"{facet}_count")
+            for facet in FACETS
+        ]
+        query = select(
+            *columns, func.grouping(*columns).label("grouping"), *counts,
+            func.count().filter(and_(true(), *conditions.values())).label("total"),
+        ).group_by(func.grouping_sets(*(tuple_(column) for column in columns), tuple_()))
 
-        return [HotelResponse.model_validate(hotel) for hotel in hotels]
+        # GROUPING sets a bit per column left out of the set, the first column's bit being the highest
+        sets = {(1 << len(FACETS)) - 1 - (1 << (len(FACETS) - 1 - index)): facet for index, facet in enumerate(FACETS)}
+        total, facets = 0, {facet: {} for facet in FACETS}
+        for row in (await db.execute(query)).mappings():
+            facet = sets.get(row["grouping"])
+            if facet is None:
+                total = row["total"]
+            elif row[facet] is not None and row[f"{facet}_count"]:
+                value = str(row[facet]).lower() if facet == "breakfast" else row[facet]
+                facets[facet][value] = row[f"{facet}_count"]
+        return total, facets
 
+    @staticmethod
+    def _facet_values(facets: Dict[str, Dict[str, int]], filters: Dict[str, List[str]]) -> Dict[str, List[FacetValue]]:
+        """Every bucket in order, and the most common cities along with those filtered on."""
+        values = {
+            "rating": RATING_VALUES,
+            "breakfast": BREAKFAST_VALUES,
+            "price": PRICE_VALUES,
+            "city": sorted(facets["city"], key=lambda city: (-facets["city"][city], city))[:FACET_CITY_LIMIT],
+        }
+        values["city"] += [city for city in dict.fromkeys(filters.get("city") or []) if city not in values["city"]]
+        return {
+            facet: [FacetValue(value=value, count=facets[facet].get(value, 0)) for value in values[facet]]
+            for facet in FACETS
+        }
+
+    @staticmethod
+    async def search_faceted(
+        db: AsyncSession,
+        name: Optional[str] = None,
+        address: Optional[str] = None,
+        rating: Optional[List[str]] = None,
+        breakfast: Optional[bool] = None,
+        city: Optional[List[str]] = None,
+        price: Optional[List[str]] = None,
+        limit: int = 10,
+        offset: int = 0,
+    ) -> FacetedHotelSearchResponse:
+        """
+        A page of the hotels matching the filters, their total, and per facet how many hotels each
+        value would match. Filters on the same facet are alternatives, filters on different facets
+        all apply.
+
+        Without a name or address filter the counts come from the `FacetManager`, in memory, which
+        may lag the page by the changes it has yet to follow. Otherwise the hotels matching the text
+        filters are counted in one grouped query; one running out of time leaves the page without a
+        total or facets rather than failing it.
+        """
+        filters = {
+            "rating": rating or [],
+            "breakfast": [] if breakfast is None else [str(breakfast).lower()],
+            "city": city or [],
+            "price": price or [],
+        }
+        hotels = HotelService._facet_hotels(name, address)
+
+        page = (
+            select(*Hotel.__table__.c)
+            .join(hotels, hotels.c.id == Hotel.id)
+            .where(*HotelService._facet_conditions(hotels, filters).values())
+            .order_by(Hotel.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        rows = HotelResponseList.validate_python([dict(row) for row in (await db.execute(page)).mappings()])
+
+        facet_manager = FacetManager()
+        if facet_manager.ready and not name and not address:
+            total, facets = facet_manager.count(filters)
+        else:
+            try:
+                async with db.begin_nested():
+                    total, facets = await HotelService._count_facets(db, hotels, filters)
+            except DBAPIError as error:
+                if not statement_timed_out(error):
+                    raise
+                return FacetedHotelSearchResponse(hotels=rows, total=None, facets={})
+        return FacetedHotelSearchResponse(hotels=rows, total=total, facets=HotelService._facet_values(facets, filters))
+
+    @staticmethod
+    async def autocomplete(db: AsyncSession, query: str, limit: int = 10) -> List[HotelSuggestion]:
+        """
+        Hotels having every word of the query, the last one as a prefix, in their name, address or
+        description, those whose name has them first.
+
+        Answered by the `SearchIndexManager`, a 503 while it loads: a scan per keystroke takes seconds
+        on a large database. With the index off the hotels are scanned, a scan out of time suggesting
+        nothing.
+        """
+        search_index = SearchIndexManager()
+        if search_index.ready:
+            return [HotelSuggestion(**hotel) for hotel in search_index.search(query, limit)]
+        if search_index.enabled:
+            raise HTTPException(
+                status_code=503, detail="Autocomplete is loading, retry later", headers={"Retry-After": str(AUTOCOMPLETE_RETRY_AFTER)},
+            )
+
+        try:
+            return await HotelService._scan_suggestions(db, query, limit)
+        except DBAPIError as error:
+            if not statement_timed_out(error):
+                raise
+            await db.rollback()
+            return []
+
+    @staticmethod
+    async def _scan_suggestions(db: AsyncSession, query: str, limit: int) -> List[HotelSuggestion]:
+        """The suggestions of the index, from a scan of the hotels."""
+        words = tokenize(query)
+        if not words:
+            return []
+        # Whole words, the last one only anchored at its start, accents folded, as the index matches them
+        patterns = [rf"\m{word_pattern(word)}\M" for word in words[:-1]] + [rf"\m{word_pattern(words[-1])}"]
+        in_name = and_(*(Hotel.name.op("~*")(pattern) for pattern in patterns))
+        statement = (
+            select(Hotel.id, Hotel.name, Hotel.city)
+            .where(*(or_(*(column.op("~*")(pattern) for column in (Hotel.name, Hotel.address, Hotel.description))) for pattern in patterns))
+            .order_by(in_name.desc(), func.length(Hotel.name), Hotel.id)
+            .limit(limit)
+        )
+        return [HotelSuggestion(**row) for row in (await db.execute(statement)).mappings()]
+
+    @staticmethod
+    def _index(hotel: HotelResponse):
+        """Index a hotel this process just wrote, the change feed brings it to the other processes."""
+        search_index = SearchIndexManager()
+        if search_index.ready:
+            search_index.put(hotel.id, hotel.name, hotel.address, hotel.city, hotel.description)
+
+    @staticmethod
+    def _needs_geocoding(values: dict) -> bool:
+        return "address" in values and "latitude" not in values and "longitude" not in values
+
+    @staticmethod
+    async def _geocode(db: AsyncSession, values: dict) -> dict:
+        """
+        Fill in the coordinates of a hotel written with an address but without coordinates. An address
+        the geocoder cannot place leaves the hotel without coordinates rather than at its old location.
+
+        The transaction of the reads so far is ended first, so that no connection sits idle in a
+        transaction while the geocoder answers: the write starts a transaction of its own.
+        """
+        if HotelService._needs_geocoding(values):
+            await db.commit()
+            coordinates = await GeocodingManager().geocode(values["address"]) if values["address"] else None
+            values["latitude"], values["longitude"] = coordinates or (None, None)
+        return values
 
     @staticmethod
     async def create_hotel(db: AsyncSession, hotel_data: HotelCreate, user_id: int) -> HotelResponse:
         """Create a hotel and assign the user as owner."""
-        new_hotel = Hotel(**hotel_data.model_dump())
+        new_hotel = Hotel(**await HotelService._geocode(db, hotel_data.model_dump(exclude_none=True)))
 
         db.add(new_hotel)
         try:
+            await db.flush()
+            ChangeService.record(db, "hotel", new_hotel.id, "create", HotelResponse.model_validate(new_hotel))
             await db.commit()
             await db.refresh(new_hotel)
 
-            return HotelResponse.model_validate(new_hotel)
+            hotel = HotelResponse.model_validate(new_hotel)
+            HotelService._index(hotel)
+            return hotel
         except IntegrityError:
             await db.rollback()
             raise ValueError("A hotel with this name or address might already exist.")
         
     @staticmethod
-    async def update_hotel(db: AsyncSession, hotel_id: int, update_data: HotelUpdate) -> Optional[HotelResponse]:
-        """Update hotel details."""
-        result = await db.execute(select(Hotel).filter(Hotel.id == hotel_id))
-        hotel = result.scalars().first()
-
-        if not hotel:
-            return None
+    async def _not_written(db: AsyncSession, admin_id: Optional[int], detail: str) -> None:
+        """A write matched no hotel: forbidden unless `admin_id` is an admin, in which case the hotel does not exist."""
+        await db.rollback()
+        if admin_id is not None and not await db.scalar(select(UserRoleService.admin_exists(admin_id))):
+            raise HTTPException(status_code=403, detail=detail)
 
-        for key, value in update_data.model_dump(exclude_unset=True).items():
-            setattr(hotel, key, value)
+    @staticmethod
+    def _writable(hotel_id: int, admin_id: Optional[int]):
+        """The hotel, and when `admin_id` is given only if that user is an admin."""
+        conditions = [Hotel.id == hotel_id]
+        if admin_id is not None:
+            conditions.append(UserRoleService.admin_exists(admin_id))
+        return conditions
 
+    @staticmethod
+    async def update_hotel(db: AsyncSession, hotel_id: int, update_data: HotelUpdate, admin_id: Optional[int] = None) -> Optional[HotelResponse]:
+        """Update a hotel in one statement, None when it does not exist."""
+        values = update_data.model_dump(exclude_unset=True)
+        if HotelService._needs_geocoding(values):
+            # The external geocoder is only called for a write that is allowed, the UPDATE checks it again
+            if not await db.scalar(select(exists().where(*HotelService._writable(hotel_id, admin_id)))):
+                await HotelService._not_written(db, admin_id, "Only admins can update hotel information.")
+                return None
+            values = await HotelService._geocode(db, values)
+        # An empty update still tells whether the hotel exists
+        values = values or {"id": Hotel.id}
+        statement = update(Hotel).where(*HotelService._writable(hotel_id, admin_id)).values(**values)
         try:
-            await db.commit()
-            await db.refresh(hotel)
-            return HotelResponse.model_validate(hotel)
+            result = await db.execute(ChangeService.returning(db, statement, Hotel.__table__, HotelResponse, "hotel", "update"))
+            row = result.mappings().first()
         except IntegrityError:
             await db.rollback()
             raise ValueError("Unable to update hotel due to integrity constraints.")
+        if row is None:
+            await HotelService._not_written(db, admin_id, "Only admins can update hotel information.")
+            return None
+        await db.commit()
+        hotel = HotelResponse.model_validate(dict(row))
+        HotelService._index(hotel)
+        return hotel
 
     @staticmethod
-    async def delete_hotel(db: AsyncSession, hotel_id: int) -> bool:
-        """Delete a hotel."""
-        result = await db.execute(select(Hotel).filter(Hotel.id == hotel_id))
-        hotel = result.scalars().first()
-
-        if not hotel:
+    async def delete_hotel(db: AsyncSession, hotel_id: int, admin_id: Optional[int] = None) -> bool:
+        """Delete a hotel in one statement, False when it does not exist."""
+        statement = delete(Hotel).where(*HotelService._writable(hotel_id, admin_id))
+        result = await db.execute(ChangeService.returning(db, statement, Hotel.__table__, HotelResponse, "hotel", "delete"))
+        if result.first() is None:
+            await HotelService._not_written(db, admin_id, "Only admins can delete hotels.")
             return False
-        
-        await db.delete(hotel)
         await db.commit()
+        SearchIndexManager().remove(hotel_id)
         return True
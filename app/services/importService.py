@@ -0,0 +1,269 @@
+import codecs
+import csv
+import json
+import os
+from collections import deque
+from typing import AsyncIterator, List, Tuple, Union
+import asyncpg
+from pydantic import ValidationError
+from sqlalchemy import Integer, String, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.changeFeedManager import ChangeFeedManager
+from app.managers.geocodingManager import GeocodingManager
+from app.schemas.importSchemas import HotelImport, ImportReport, ImportRowError, RoomImport
+
+# Rows copied and committed at once: memory stays bounded by it, however large the upload
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+# Rejected rows detailed in the report, past that they are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Longest line accepted, a quoted CSV field running over several lines included
+IMPORT_MAX_LINE_LENGTH = int(os.getenv("IMPORT_MAX_LINE_LENGTH", "65536"))
+
+CSV_COLUMNS = {
+    "type", "name", "address", "city", "description", "rating", "breakfast", "latitude", "longitude", "price", "number_of_beds",
+}
+
+HOTEL_COLUMNS = ["id", "name", "address", "city", "description", "rating", "breakfast", "latitude", "longitude"]
+ROOM_COLUMNS = ["id", "hotel_id", "price", "number_of_beds"]
+CHANGE_COLUMNS = ["entity", "entity_id", "operation", "data"]
+
+# A parsed row, or why it could not be parsed, with the line it starts on
+Record = Tuple[int, Union[dict, str]]
+
+class ImportAborted(Exception):
+    """The upload cannot be read past this point: the rows before it are kept."""
+
+    def __init__(self, line: int, error: str):
+        super().__init__(error)
+        self.line = line
+        self.error = error
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Numbered lines of a UTF-8 byte stream, decoded as the chunks arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending, number = "", 0
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            if "\n" not in pending:
+                if len(pending) > IMPORT_MAX_LINE_LENGTH:
+                    raise ImportAborted(number + 1, f"Line longer than {IMPORT_MAX_LINE_LENGTH} characters, import stopped")
+                continue
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                number += 1
+                yield number, line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ImportAborted(number + 1, "Invalid UTF-8, import stopped")
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+async def ndjson_records(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Record]:
+    """One object per line, a hotel may carry its rooms in a `rooms` list."""
+    async for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, "Expected a JSON object"
+            continue
+
+        rooms = record.pop("rooms", None) if record.get("type") == "hotel" else None
+        yield number, record
+        if rooms is None:
+            continue
+        if not isinstance(rooms, list):
+            yield number, "rooms: Expected a list of rooms"
+            continue
+        for room in rooms:
+            yield number, {**room, "type": "room"} if isinstance(room, dict) else "rooms: Expected a JSON object"
+
+async def csv_records(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Record]:
+    """Rows under a header naming their columns, empty fields left out."""
+    header = None
+    parts: List[str] = []
+    start = 0
+    async for number, line in lines:
+        if not parts:
+            start = number
+        parts.append(line)
+        record = "\n".join(parts)
+        if record.count('"') % 2:
+            # A quoted field goes on over the next line
+            if len(record) > IMPORT_MAX_LINE_LENGTH:
+                raise ImportAborted(start, f"Row longer than {IMPORT_MAX_LINE_LENGTH} characters, import stopped")
+            continue
+        parts = []
+        if not record.strip():
+            continue
+
+        row = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in row]
+            unknown = sorted(set(header) - CSV_COLUMNS)
+            if "type" not in header or unknown:
+                raise ValueError(f"The CSV header needs a 'type' column and only these: {', '.join(sorted(CSV_COLUMNS))}")
+            continue
+        if len(row) != len(header):
+            yield start, f"Expected {len(header)} fields, got {len(row)}"
+            continue
+        yield start, {name: value for name, value in zip(header, row) if value != ""}
+    if parts:
+        yield start, "Unterminated quoted field"
+
+IMPORT_FORMATS = {
+    "application/x-ndjson": ndjson_records,
+    "application/jsonl": ndjson_records,
+    "text/csv": csv_records,
+}
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors())
+
+def _reject(report: ImportReport, line: int, error: str, max_errors: int, rows: int = 1):
+    report.error_count += rows
+    if len(report.errors) < max_errors:
+        report.errors.append(ImportRowError(line=line, error=error))
+
+async def _allocate_ids(db: AsyncSession, table: str, count: int) -> List[int]:
+    """Take `count` ids from the table's sequence, so rows can be copied with their ids known beforehand."""
+    query = text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)").bindparams(
+        bindparam("table", type_=String), bindparam("count", type_=Integer),
+    )
+    return list((await db.execute(query, {"table": table, "count": count})).scalars())
+
+class ImportService:
+    """
+    Bulk import of hotels and their rooms from a CSV or NDJSON upload.
+
+    Rows are parsed and validated as the body arrives, each room going to the hotel above it. Valid
+    rows are gathered in chunks, hotels without coordinates geocoded, then each chunk is copied with
+    its change feed entries and committed, so memory stays constant and a row rejected never holds
+    back the others. A chunk the database refuses is rolled back and reported, the chunks before and
+    after it are kept.
+    """
+
+    @staticmethod
+    async def import_hotels(
+        db: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        media_type: str,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        max_errors: int = IMPORT_MAX_ERRORS,
+    ) -> ImportReport:
+        """Import the rows of an upload of type `media_type`, one of IMPORT_FORMATS, and report the rejected ones."""
+        report = ImportReport()
+        hotels: List[tuple] = []
+        rooms: List[RoomImport] = []
+        hotel_ids: deque = deque()
+        # Id of the hotel taking the rooms that follow, None after a rejected hotel
+        hotel_id = None
+        # Lines of the first and last rows of the chunk being gathered
+        lines = [0, 0]
+
+        async def flush():
+            nonlocal hotel_id
+            in_chunk = any(pending_id == hotel_id for pending_id, _ in hotels)
+            if not await ImportService._copy(db, hotels, rooms, report, lines, max_errors) and in_chunk:
+                # Its rooms further down would reference a hotel that was not imported
+                hotel_id = None
+
+        try:
+            async for line, record in IMPORT_FORMATS[media_type](_lines(chunks)):
+                if isinstance(record, str):
+                    _reject(report, line, record, max_errors)
+                    continue
+
+                kind = record.pop("type", None)
+                try:
+                    if kind == "hotel":
+                        hotel_id = None
+                        hotel = HotelImport.model_validate(record)
+                        if not hotel_ids:
+                            hotel_ids.extend(await _allocate_ids(db, "hotels", chunk_size))
+                        hotel_id = hotel_ids.popleft()
+                        row = (hotel_id, hotel)
+                    elif kind == "room":
+                        if hotel_id is None:
+                            _reject(report, line, "Room without a valid hotel above it", max_errors)
+                            continue
+                        row = RoomImport.model_validate({**record, "hotel_id": hotel_id})
+                    else:
+                        _reject(report, line, "type: Expected 'hotel' or 'room'", max_errors)
+                        continue
+                except ValidationError as e:
+                    _reject(report, line, _describe(e), max_errors)
+                    continue
+
+                if not hotels and not rooms:
+                    lines[0] = line
+                lines[1] = line
+                (hotels if kind == "hotel" else rooms).append(row)
+
+                if len(hotels) + len(rooms) >= chunk_size:
+                    await flush()
+        except ImportAborted as e:
+            _reject(report, e.line, e.error, max_errors)
+
+        await flush()
+        return report
+
+    @staticmethod
+    async def _copy(
+        db: AsyncSession, hotels: List[tuple], rooms: List[RoomImport], report: ImportReport, lines: List[int], max_errors: int,
+    ) -> bool:
+        """
+        COPY a chunk of hotels and rooms with their changes, commit it, and empty the lists. False when
+        the database refused it: the chunk is rolled back and its rows are reported from its first line.
+        """
+        if not hotels and not rooms:
+            return True
+        geocoding_manager = GeocodingManager()
+        missing = [hotel for _, hotel in hotels if hotel.latitude is None] if geocoding_manager.enabled else []
+        if missing:
+            # Ends the transaction the hotel ids were taken in: none stays open while the geocoder answers
+            await db.commit()
+            for hotel, coordinates in zip(missing, await geocoding_manager.geocode_many([hotel.address for hotel in missing])):
+                if coordinates is not None:
+                    hotel.latitude, hotel.longitude = coordinates
+
+        count = len(hotels) + len(rooms)
+        try:
+            # Also opens the transaction the COPY below runs in, once the chunk is geocoded
+            room_ids = await _allocate_ids(db, "rooms", len(rooms))
+            connection = (await (await db.connection()).get_raw_connection()).driver_connection
+
+            changes = []
+            hotel_records = []
+            for hotel_id, hotel in hotels:
+                hotel_records.append((
+                    hotel_id, hotel.name, hotel.address, hotel.city, hotel.description, hotel.rating, hotel.breakfast, hotel.latitude, hotel.longitude,
+                ))
+                changes.append(("hotel", hotel_id, "create", json.dumps({"id": hotel_id, **hotel.model_dump(mode="json")}, ensure_ascii=False)))
+            room_records = []
+            for room_id, room in zip(room_ids, rooms):
+                room_records.append((room_id, room.hotel_id, room.price, room.number_of_beds))
+                changes.append(("room", room_id, "create", json.dumps({"id": room_id, **room.model_dump(mode="json")}, ensure_ascii=False)))
+
+            await connection.copy_records_to_table("hotels", records=hotel_records, columns=HOTEL_COLUMNS)
+            await connection.copy_records_to_table("rooms", records=room_records, columns=ROOM_COLUMNS)
+            await connection.copy_records_to_table("changes", records=changes, columns=CHANGE_COLUMNS)
+            await db.commit()
+        except asyncpg.PostgresError as e:
+            await db.rollback()
+            first, last = lines
+            _reject(report, first, f"Rows from line {first} to {last} not imported: {e}", max_errors, rows=count)
+            return False
+        finally:
+            hotels.clear()
+            rooms.clear()
+
+        ChangeFeedManager().notify()
+        report.hotels += len(hotel_records)
+        report.rooms += len(room_records)
+        return True
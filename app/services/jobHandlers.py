@@ -0,0 +1,27 @@
+import logging
+from sqlalchemy import select
+from app.managers.databaseManager import DatabaseManager
+from app.managers.jobManager import JobManager
+from app.models.bookingModel import Booking
+from app.models.userModel import User
+
+logger = logging.getLogger(__name__)
+jobs = JobManager()
+
+@jobs.register("booking.confirmation")
+async def send_booking_confirmation(payload: dict):
+    """Confirm a booking to its user, no mail provider is configured yet so the confirmation is logged."""
+    async with DatabaseManager().async_session() as db:
+        result = await db.execute(
+            select(Booking, User.email).join(User, User.id == Booking.user_id).filter(Booking.id == payload["booking_id"])
+        )
+        row = result.first()
+
+    # Cancelled before the job ran: nothing to confirm
+    if row is None:
+        return
+    booking, email = row
+    logger.info(
+        "Booking %s confirmed to %s: room %s from %s to %s",
+        booking.id, email, booking.room_id, booking.start_date, booking.end_date,
+    )
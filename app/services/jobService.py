@@ -0,0 +1,42 @@
+from datetime import timedelta
+from typing import Optional
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.jobManager import JOB_MAX_ATTEMPTS, JobManager
+from app.models.jobModel import Job
+
+class JobService:
+
+    @staticmethod
+    async def enqueue(
+        db: AsyncSession,
+        kind: str,
+        payload: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
+        delay: float = 0,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> Optional[int]:
+        """
+        Add a job to the session's transaction, it only exists once the caller commits.
+
+        Returns the job id, or None when a job with the same idempotency key was already enqueued.
+        """
+        statement = (
+            insert(Job)
+            .values(
+                kind=kind,
+                payload=payload or {},
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts,
+                run_at=func.now() + timedelta(seconds=delay),
+            )
+            .on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+            .returning(Job.id)
+        )
+        job_id = (await db.execute(statement)).scalar()
+
+        # Workers of this process start on it right after the commit, the others at their next poll
+        if job_id is not None and not delay:
+            event.listen(db.sync_session, "after_commit", lambda session: JobManager().wake(), once=True)
+        return job_id
@@ -1,9 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, update
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
 from app.models.roomModel import Room
-from app.schemas.roomSchemas import RoomCreate, RoomUpdate, RoomResponse
-from typing import List, Optional
+from app.schemas.roomSchemas import RoomCreate, RoomUpdate, RoomResponse, RoomResponseList
+from app.services.changeService import ChangeService
+from app.services.userRoleService import UserRoleService
+from fastapi import HTTPException
+from app.utils.jsonQuery import json_array, schema_columns
+from typing import Collection, List, Optional
 
 class RoomService:
 
@@ -15,11 +20,24 @@ class RoomService:
         return RoomResponse.model_validate(room) if room else None
 
     @staticmethod
-    async def get_rooms_by_hotel(db: AsyncSession, hotel_id: int) -> List[RoomResponse]:
-        """Retrieve all rooms for a specific hotel."""
-        result = await db.execute(select(Room).filter(Room.hotel_id == hotel_id))
-        rooms = result.scalars().all()
-        return [RoomResponse.model_validate(room) for room in rooms]
+    def _rooms_by_hotel_query(columns, hotel_id: int, limit: int, offset: int):
+        """Build a page of a hotel's rooms over plain columns."""
+        return select(*columns).filter(Room.hotel_id == hotel_id).order_by(Room.id).limit(limit).offset(offset)
+
+    @staticmethod
+    async def get_rooms_by_hotel(db: AsyncSession, hotel_id: int, limit: int = 100, offset: int = 0) -> List[RoomResponse]:
+        """Retrieve a page of the rooms of a specific hotel, in id order."""
+        result = await db.execute(RoomService._rooms_by_hotel_query(Room.__table__.c, hotel_id, limit, offset))
+        return RoomResponseList.validate_python([dict(row) for row in result.mappings()])
+
+    @staticmethod
+    async def get_rooms_by_hotel_json(
+        db: AsyncSession, hotel_id: int, limit: int = 100, offset: int = 0, fields: Optional[Collection[str]] = None,
+    ) -> str:
+        """Same page as `get_rooms_by_hotel`, returned as a JSON array serialized by Postgres, of `fields` only if given."""
+        columns = schema_columns(Room.__table__, RoomResponse, fields)
+        result = await db.execute(json_array(RoomService._rooms_by_hotel_query(columns, hotel_id, limit, offset), order_by=[Room.id]))
+        return result.scalar()
 
     @staticmethod
     async def create_room(db: AsyncSession, room_data: RoomCreate) -> RoomResponse:
@@ -28,6 +46,8 @@ class RoomService:
         
         db.add(new_room)
         try:
+            await db.flush()
+            ChangeService.record(db, "room", new_room.id, "create", RoomResponse.model_validate(new_room))
             await db.commit()
             await db.refresh(new_room)
             return RoomResponse.model_validate(new_room)
@@ -36,34 +56,45 @@ class RoomService:
             raise ValueError("Integrity error while adding the room.")
 
     @staticmethod
-    async def update_room(db: AsyncSession, room_id: int, update_data: RoomUpdate) -> Optional[RoomResponse]:
-        """Update a room."""
-        result = await db.execute(select(Room).filter(Room.id == room_id))
-        room = result.scalars().first()
-
-        if not room:
-            return None
+    async def _not_written(db: AsyncSession, admin_id: Optional[int], detail: str) -> None:
+        """A write matched no room: forbidden unless `admin_id` is an admin, in which case the room does not exist."""
+        await db.rollback()
+        if admin_id is not None and not await db.scalar(select(UserRoleService.admin_exists(admin_id))):
+            raise HTTPException(status_code=403, detail=detail)
 
-        for key, value in update_data.model_dump(exclude_unset=True).items():
-            setattr(room, key, value)
+    @staticmethod
+    def _writable(room_id: int, admin_id: Optional[int]):
+        """The room, and when `admin_id` is given only if that user is an admin."""
+        conditions = [Room.id == room_id]
+        if admin_id is not None:
+            conditions.append(UserRoleService.admin_exists(admin_id))
+        return conditions
 
+    @staticmethod
+    async def update_room(db: AsyncSession, room_id: int, update_data: RoomUpdate, admin_id: Optional[int] = None) -> Optional[RoomResponse]:
+        """Update a room in one statement, None when it does not exist."""
+        # An empty update still tells whether the room exists
+        values = update_data.model_dump(exclude_unset=True) or {"id": Room.id}
+        statement = update(Room).where(*RoomService._writable(room_id, admin_id)).values(**values)
         try:
-            await db.commit()
-            await db.refresh(room)
-            return RoomResponse.model_validate(room)
+            result = await db.execute(ChangeService.returning(db, statement, Room.__table__, RoomResponse, "room", "update"))
+            row = result.mappings().first()
         except IntegrityError:
             await db.rollback()
             raise ValueError("Integrity error updating room.")
+        if row is None:
+            await RoomService._not_written(db, admin_id, "Only admins can update rooms.")
+            return None
+        await db.commit()
+        return RoomResponse.model_validate(dict(row))
 
     @staticmethod
-    async def delete_room(db: AsyncSession, room_id: int) -> bool:
-        """Delete a room."""
-        result = await db.execute(select(Room).filter(Room.id == room_id))
-        room = result.scalars().first()
-        
-        if not room:
+    async def delete_room(db: AsyncSession, room_id: int, admin_id: Optional[int] = None) -> bool:
+        """Delete a room in one statement, False when it does not exist."""
+        statement = delete(Room).where(*RoomService._writable(room_id, admin_id))
+        result = await db.execute(ChangeService.returning(db, statement, Room.__table__, RoomResponse, "room", "delete"))
+        if result.first() is None:
+            await RoomService._not_written(db, admin_id, "Only admins can delete rooms.")
             return False
-
-        await db.delete(room)
         await db.commit()
         return True
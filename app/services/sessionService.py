@@ -0,0 +1,128 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.sessionManager import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, SessionManager, SessionRecord
+from app.models.sessionModel import UserSession
+from app.models.userModel import User
+from app.schemas.userSchemas import TokenResponse
+from app.security import create_access_token
+from app.services.userRoleService import UserRoleService
+
+def _digest(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode()).digest()
+
+class SessionService:
+    """
+    Login sessions: a short-lived JWT access token plus an opaque refresh token `<session id>.<secret>`.
+
+    Only the hash of the refresh secret is stored, and every refresh replaces it. Presenting a secret
+    that was already replaced means the token leaked, so the whole session is revoked.
+    """
+
+    @staticmethod
+    async def _claims(db: AsyncSession, user: User) -> dict:
+        role = await UserRoleService.get_role_by_user(db, user.id)
+        return {"sub": user.pseudo, "uid": user.id, "email": user.email, "adm": role.is_admin if role else False}
+
+    @staticmethod
+    def _tokens(session_id: str, secret: str, claims: dict) -> TokenResponse:
+        return TokenResponse(
+            access_token=create_access_token({**claims, "sid": session_id}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+            refresh_token=f"{session_id}.{secret}",
+            expires_in=int(ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+        )
+
+    @staticmethod
+    async def create_session(db: AsyncSession, user: User) -> TokenResponse:
+        """Open a session for a user who just logged in."""
+        claims = await SessionService._claims(db, user)
+        session_id, secret = secrets.token_urlsafe(16), secrets.token_urlsafe(32)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+        db.add(UserSession(id=session_id, user_id=user.id, refresh_hash=_digest(secret), expires_at=expires_at))
+        await db.commit()
+
+        SessionManager().remember(session_id, SessionRecord(user.id, claims, expires_at.timestamp()))
+        return SessionService._tokens(session_id, secret, claims)
+
+    @staticmethod
+    async def refresh_session(db: AsyncSession, refresh_token: str) -> Optional[TokenResponse]:
+        """Rotate a refresh token, None when it is unknown, expired, revoked or reused."""
+        session_id, _, secret = refresh_token.partition(".")
+        manager = SessionManager()
+        if not secret or manager.is_revoked(session_id):
+            return None
+
+        presented, new_secret = _digest(secret), secrets.token_urlsafe(32)
+        # Compare-and-swap on the stored hash, so two refreshes with the same token cannot both win
+        result = await db.execute(
+            update(UserSession)
+            .where(
+                UserSession.id == session_id,
+                UserSession.refresh_hash == presented,
+                UserSession.revoked_at.is_(None),
+                UserSession.expires_at > func.now(),
+            )
+            .values(refresh_hash=_digest(new_secret), previous_hash=presented, last_used_at=func.now())
+            .returning(UserSession.user_id, UserSession.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+
+        if row is None:
+            reused = await db.execute(
+                update(UserSession)
+                .where(UserSession.id == session_id, UserSession.previous_hash == presented, UserSession.revoked_at.is_(None))
+                .values(revoked_at=func.now())
+                .returning(UserSession.revoked_at)
+                .execution_options(synchronize_session=False)
+            )
+            revoked_at = reused.scalar()
+            await db.commit()
+            if revoked_at is not None:
+                manager.revoke(session_id, revoked_at.timestamp())
+            return None
+
+        await db.commit()
+        record = manager.lookup(session_id)
+        if record is None:
+            user = await db.get(User, row.user_id)
+            record = SessionRecord(row.user_id, await SessionService._claims(db, user), row.expires_at.timestamp())
+            manager.remember(session_id, record)
+        return SessionService._tokens(session_id, new_secret, record.claims)
+
+    @staticmethod
+    async def revoke_session(db: AsyncSession, session_id: str):
+        """Log a session out, its access tokens are refused from now on."""
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.id == session_id, UserSession.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .returning(UserSession.revoked_at)
+            .execution_options(synchronize_session=False)
+        )
+        revoked_at = result.scalar()
+        await db.commit()
+        if revoked_at is not None:
+            SessionManager().revoke(session_id, revoked_at.timestamp())
+
+    @staticmethod
+    async def revoke_user_sessions(db: AsyncSession, user_id: int):
+        """Log every session of a user out, before deleting the user."""
+        result = await db.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .returning(UserSession.id, UserSession.revoked_at)
+            .execution_options(synchronize_session=False)
+        )
+        revoked = result.all()
+        await db.commit()
+
+        manager = SessionManager()
+        for session_id, revoked_at in revoked:
+            manager.revoke(session_id, revoked_at.timestamp())
+        manager.forget_user(user_id)
@@ -1,4 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import exists
 from sqlalchemy.future import select
 from app.models.userRoleModel import UserRole
 from app.schemas.userRoleSchemas import UserRoleCreate, UserRoleResponse
@@ -15,6 +16,11 @@ class UserRoleService:
         await db.refresh(new_role)
         return UserRoleResponse.model_validate(new_role)
 
+    @staticmethod
+    def admin_exists(user_id: int):
+        """SQL condition true when the user is an admin, to authorize a write in its own WHERE clause."""
+        return exists().where(UserRole.user_id == user_id, UserRole.is_admin.is_(True))
+
     @staticmethod
     async def get_role_by_user(db: AsyncSession, user_id: int) -> Optional[UserRoleResponse]:
         """Retrieve a user's role by user ID."""
@@ -1,10 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, exists, false, func, or_, update
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
 from app.models.userModel import User
+from app.models.userRoleModel import UserRole
 from app.schemas.userSchemas import UserCreate, UserUpdate, UserResponse, UserWithRoleResponse
 from app.services.userRoleService import UserRoleService
-from typing import List, Optional
+from app.utils.jsonQuery import json_array, schema_columns
+from typing import Collection, List, Optional
+from fastapi import HTTPException
 import bcrypt
 
 class UserService:
@@ -16,24 +20,28 @@ class UserService:
         user = result.scalars().first()
         return UserResponse.model_validate(user) if user else None
 
+    @staticmethod
+    def _users_query(fields: Optional[Collection[str]] = None):
+        """Users over plain columns, their role joined only when `is_admin` is selected."""
+        user_fields = [name for name in UserWithRoleResponse.model_fields if name != "is_admin" and (fields is None or name in fields)]
+        columns = schema_columns(User.__table__, UserWithRoleResponse, user_fields)
+        query = select(*columns).select_from(User)
+        if fields is None or "is_admin" in fields:
+            query = query.add_columns(func.coalesce(UserRole.is_admin, false()).label("is_admin"))
+            query = query.outerjoin(UserRole, UserRole.user_id == User.id)
+        return query.order_by(User.id)
+
     @staticmethod
     async def get_users(db: AsyncSession) -> List[UserWithRoleResponse]:
         """Retrieve all users along with their roles."""
+        result = await db.execute(UserService._users_query())
+        return [UserWithRoleResponse(**row) for row in result.mappings()]
 
-        result = await db.execute(select(User))
-        users = result.scalars().all()
-
-        user_responses = []
-        for user in users:
-            role = await UserRoleService.get_role_by_user(db, user.id)
-            user_responses.append(UserWithRoleResponse(
-                id=user.id,
-                email=user.email,
-                pseudo=user.pseudo,
-                is_admin=role.is_admin if role else False
-            ))
-
-        return user_responses
+    @staticmethod
+    async def get_users_json(db: AsyncSession, fields: Optional[Collection[str]] = None) -> str:
+        """Same listing as `get_users`, as a JSON array serialized by Postgres, of `fields` only if given."""
+        result = await db.execute(json_array(UserService._users_query(fields), order_by=[User.id]))
+        return result.scalar()
 
     @staticmethod
     async def create_user(db: AsyncSession, user_data: UserCreate) -> UserResponse:
@@ -56,37 +64,57 @@ class UserService:
             raise ValueError("Cet email ou pseudo est déjà utilisé.")
 
     @staticmethod
-    async def update_user(db: AsyncSession, user_id: int, update_data: UserUpdate) -> Optional[UserResponse]:
-        """Met à jour un utilisateur et retourne le schéma mis à jour."""
-        user = await UserService.get_user(db, user_id)
-        if not user:
-            return None
-        
-        user_db = await db.execute(select(User).filter(User.id == user_id))
-        user_db = user_db.scalars().first()
-        
-        for key, value in update_data.dict(exclude_unset=True).items():
-            if key == "password":
-                value = bcrypt.hashpw(value.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            setattr(user_db, key, value)
-
+    async def update_user(
+        db: AsyncSession, user_id: int, update_data: UserUpdate, current_user: Optional[UserResponse] = None
+    ) -> Optional[UserResponse]:
+        """
+        Met à jour un utilisateur en une seule requête et retourne le schéma mis à jour, None s'il n'existe pas.
+
+        Avec `current_user`, l'autorisation fait partie du WHERE : l'utilisateur lui-même ou un admin, et
+        seulement un admin pour changer le statut admin. Sinon 403.
+        """
+        values = update_data.model_dump(exclude_unset=True, exclude={"is_admin"})
+        if "password" in values:
+            values["password"] = bcrypt.hashpw(values["password"].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+        conditions = [User.id == user_id]
+        if current_user is not None:
+            if update_data.is_admin is not None:
+                conditions.append(UserRoleService.admin_exists(current_user.id))
+                forbidden = "Only admins can change admin status."
+            else:
+                conditions.append(or_(User.id == current_user.id, UserRoleService.admin_exists(current_user.id)))
+                forbidden = "You cannot update this account."
+
+        # Sans champ à modifier, la requête vérifie quand même l'existence et l'autorisation
+        statement = (
+            update(User)
+            .where(*conditions)
+            .values(**(values or {"id": User.id}))
+            .returning(User.id, User.email, User.pseudo)
+            .execution_options(synchronize_session=False)
+        )
         try:
-            await db.commit()
-            await db.refresh(user_db)
-            return UserResponse.model_validate(user_db)
+            row = (await db.execute(statement)).mappings().first()
         except IntegrityError:
             await db.rollback()
             raise ValueError("Cet email ou pseudo est déjà utilisé.")
+
+        if row is None:
+            await db.rollback()
+            if current_user is not None and await db.scalar(select(exists().where(User.id == user_id))):
+                raise HTTPException(status_code=403, detail=forbidden)
+            return None
+        await db.commit()
+        return UserResponse.model_validate(dict(row))
     
     @staticmethod
     async def delete_user(db: AsyncSession, user_id: int) -> bool:
-        """Supprime un utilisateur et renvoie un booléen pour succès/échec."""
-        user = await db.get(User, user_id)
-        
-        if not user:
+        """Supprime un utilisateur en une seule requête et renvoie un booléen pour succès/échec."""
+        result = await db.execute(delete(User).where(User.id == user_id).returning(User.id).execution_options(synchronize_session=False))
+        if result.first() is None:
+            await db.rollback()
             return False
-        
-        await db.delete(user)
         await db.commit()
         return True
 
@@ -0,0 +1,123 @@
+import uuid
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from app.managers.changeFeedManager import RELOAD
+from app.managers.searchIndexManager import SearchIndexManager
+from app.schemas.hotelSchemas import HotelCreate, HotelUpdate
+from app.services.hotelService import HotelService
+from app.tests.conftest import fresh
+from app.utils.singleton import Singleton
+
+@pytest.fixture
+async def search_index(monkeypatch, db_engine):
+    """A loaded index standing in for the process's own."""
+    index = fresh(SearchIndexManager, enabled=True, engine=db_engine)
+    await index.load()
+    monkeypatch.setitem(Singleton._instances, SearchIndexManager, index)
+    return index
+
+@pytest.fixture
+async def town(db_session, test_user):
+    """Three hotels of a town of their own, named after it or not."""
+    town = f"Zq{uuid.uuid4().hex[:8]}"
+    hotels = [
+        await HotelService.create_hotel(db_session, HotelCreate(name=f"Grand {town} Palace", address=f"1 Main Street, {town}", city=town), test_user["id"]),
+        await HotelService.create_hotel(db_session, HotelCreate(name="Harbour Inn", address=f"2 Quay, {town}", city=town, description="Sea views"), test_user["id"]),
+        await HotelService.create_hotel(db_session, HotelCreate(name="Hotel du Lac", address="3 Lake Road", description=f"Quiet, an hour from {town}"), test_user["id"]),
+    ]
+    yield town, hotels
+    for hotel in hotels:
+        await HotelService.delete_hotel(db_session, hotel.id)
+
+@pytest.mark.asyncio
+async def test_index_matches_the_scan(db_session, db_engine, town):
+    town, hotels = town
+    index = fresh(SearchIndexManager, enabled=True, engine=db_engine)
+    await index.load()
+
+    for query in (town, town[:5], f"{town} grand", f"{town.upper()} pal", f"sea {town}", f"{town} lac"):
+        assert index.search(query) == [suggestion.model_dump() for suggestion in await HotelService._scan_suggestions(db_session, query, 10)]
+
+    assert [hotel["id"] for hotel in index.search(town[:6])] == [hotels[0].id, hotels[1].id, hotels[2].id]
+    assert [hotel["id"] for hotel in index.search(f"harbour {town}")] == [hotels[1].id]
+    assert index.search(f"{town} nowhere") == []
+    assert index.snapshot()["memory_bytes"] > 0
+
+@pytest.mark.asyncio
+async def test_writes_update_the_index(db_session, test_user, search_index, town):
+    town, hotels = town
+
+    renamed = await HotelService.update_hotel(db_session, hotels[1].id, HotelUpdate(name=f"{town} Harbour Inn"))
+    await HotelService.delete_hotel(db_session, hotels[2].id)
+    created = await HotelService.create_hotel(db_session, HotelCreate(name=f"New {town} Lodge", address="4 Hill"), test_user["id"])
+
+    try:
+        suggestions = [hotel.id for hotel in await HotelService.autocomplete(db_session, town)]
+        assert suggestions == [created.id, renamed.id, hotels[0].id]
+    finally:
+        await HotelService.delete_hotel(db_session, created.id)
+    assert [hotel.id for hotel in await HotelService.autocomplete(db_session, f"new {town}")] == []
+
+@pytest.mark.asyncio
+async def test_index_follows_other_processes(db_session, db_engine, town):
+    town, hotels = town
+    index = fresh(SearchIndexManager, enabled=True, engine=db_engine)
+    await index.load()
+
+    # Written without the index knowing, as another process would
+    await HotelService.update_hotel(db_session, hotels[0].id, HotelUpdate(name="Summit Lodge"))
+    await HotelService.delete_hotel(db_session, hotels[1].id)
+    assert [hotel["id"] for hotel in index.search(f"{town} grand")] == [hotels[0].id]
+
+    await index.follow()
+    assert index.search(f"{town} grand") == []
+    assert [hotel["id"] for hotel in index.search(f"summit {town}")] == [hotels[0].id]
+    assert [hotel["id"] for hotel in index.search(town)] == [hotels[0].id, hotels[2].id]
+
+@pytest.mark.asyncio
+async def test_scan_folds_accents_as_the_index_does(db_session, db_engine, test_user, town):
+    town, hotels = town
+    accented = await HotelService.create_hotel(db_session, HotelCreate(name=f"Hôtel Crémieux {town}", address="5 Quai"), test_user["id"])
+    try:
+        index = fresh(SearchIndexManager, enabled=True, engine=db_engine)
+        await index.load()
+
+        for query in (f"hotel cremieux {town}", f"{town} HÔTEL crem", f"{town} cré"):
+            suggestions = await HotelService._scan_suggestions(db_session, query, 10)
+            assert [suggestion.id for suggestion in suggestions] == [accented.id]
+            assert index.search(query) == [suggestion.model_dump() for suggestion in suggestions]
+    finally:
+        await HotelService.delete_hotel(db_session, accented.id)
+
+@pytest.mark.asyncio
+async def test_index_reloads_after_a_bulk_load(db_session, db_engine, town):
+    town, hotels = town
+    index = fresh(SearchIndexManager, enabled=True, engine=db_engine)
+    await index.load()
+
+    # Copied in without a change of its own, as the seeder does
+    bulk_id = (await db_session.execute(
+        text("INSERT INTO hotels (name, address) VALUES (:name, 'Bulk Road') RETURNING id"), {"name": f"Bulk {town} Hotel"}
+    )).scalar()
+    await db_session.execute(text("INSERT INTO changes (entity, entity_id, operation) VALUES ('hotel', 0, :operation)"), {"operation": RELOAD})
+    await db_session.commit()
+    try:
+        assert await index.follow() == 0
+        assert index.ready
+        assert [hotel["id"] for hotel in index.search(f"bulk {town}")] == [bulk_id]
+        assert {hotel["id"] for hotel in index.search(town)} == {bulk_id, *(hotel.id for hotel in hotels)}
+    finally:
+        await db_session.execute(text("DELETE FROM hotels WHERE id = :id"), {"id": bulk_id})
+
+@pytest.mark.asyncio
+async def test_no_scan_while_the_index_loads(monkeypatch, db_session, town):
+    town, hotels = town
+    monkeypatch.setitem(Singleton._instances, SearchIndexManager, fresh(SearchIndexManager, enabled=True))
+    with pytest.raises(HTTPException) as loading:
+        await HotelService.autocomplete(db_session, town)
+    assert loading.value.status_code == 503 and loading.value.headers["Retry-After"]
+
+    # With the index off the hotels are scanned
+    monkeypatch.setitem(Singleton._instances, SearchIndexManager, fresh(SearchIndexManager, enabled=False))
+    assert {hotel.id for hotel in await HotelService.autocomplete(db_session, town)} == {hotel.id for hotel in hotels}
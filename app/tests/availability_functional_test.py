@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.managers.availabilityManager import RESYNC, AvailabilityManager
+from app.models.hotelModel import Hotel
+from app.models.roomModel import Room
+from app.schemas.bookingSchemas import BookingCreate, BookingUpdate
+from app.schemas.userSchemas import UserResponse
+from app.services.bookingService import BookingService
+from app.tests.conftest import fresh
+
+BASE_URL = "http://localhost:8000"
+
+def make_manager(**kwargs) -> AvailabilityManager:
+    """A manager outside the singleton, already following the feed so subscribing needs no database."""
+    manager = fresh(AvailabilityManager, **kwargs)
+    manager.cursor = (0, 0)
+    return manager
+
+def drain(subscription) -> list:
+    frames = []
+    while not subscription.queue.empty():
+        frames.append(subscription.queue.get_nowait())
+    return frames
+
+@pytest.mark.asyncio
+async def test_deltas_fan_out_to_the_hotel_subscribers_only():
+    manager = make_manager()
+    first, second = await manager.subscribe(1), await manager.subscribe(1)
+    other = await manager.subscribe(2)
+
+    manager.publish(1, "event: create\ndata: {}\n\n")
+    assert drain(first) == drain(second) == ["event: create\ndata: {}\n\n"]
+    assert drain(other) == []
+
+    manager.unsubscribe(first)
+    manager.unsubscribe(first)
+    assert manager.snapshot()["subscribers"] == 2
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_are_told_to_resync():
+    manager = make_manager(buffer_size=2)
+    subscription = await manager.subscribe(1)
+
+    for n in range(4):
+        manager.publish(1, f"event: create\ndata: {n}\n\n")
+    # What was pending is dropped for a resync, then the deltas go on
+    assert drain(subscription) == [RESYNC, "event: create\ndata: 3\n\n"]
+    assert manager.snapshot()["resyncs"] == 1
+
+@pytest.mark.asyncio
+async def test_subscribers_are_bounded():
+    manager = make_manager(max_subscribers=2)
+    assert await manager.subscribe(1) and await manager.subscribe(1)
+    assert await manager.subscribe(2) is None
+
+@pytest.mark.asyncio
+async def test_streams_are_bounded_per_client():
+    manager = make_manager(max_per_client=2)
+    first = await manager.subscribe(1, "198.51.100.7")
+    assert await manager.subscribe(2, "198.51.100.7")
+    assert await manager.subscribe(3, "198.51.100.7") is None
+    assert await manager.subscribe(3, "203.0.113.9")
+
+    manager.unsubscribe(first)
+    assert manager.streams_of("198.51.100.7") == 1
+    assert await manager.subscribe(3, "198.51.100.7")
+    assert manager.snapshot()["clients"] == 2
+
+@pytest.mark.asyncio
+async def test_booking_changes_are_published_to_their_hotel(db_session: AsyncSession, test_user, test_room):
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    manager = fresh(AvailabilityManager, engine=engine)
+    try:
+        subscription = await manager.subscribe(test_room["hotel_id"])
+        elsewhere = await manager.subscribe(test_room["hotel_id"] + 1)
+
+        booking_data = BookingCreate(
+            room_id=test_room["id"], start_date=date.today(), end_date=date.today() + timedelta(days=2), nbr_people=1,
+        )
+        user = UserResponse(id=test_user["id"], email=test_user["email"], pseudo=test_user["pseudo"])
+        booking = await BookingService.create_booking(db_session, booking_data, user)
+        await manager.follow()
+    finally:
+        await engine.dispose()
+
+    frame, = drain(subscription)
+    event, data = frame.splitlines()[:2]
+    assert event == "event: create"
+    assert json.loads(data[len("data: "):]) == {
+        "operation": "create",
+        "booking_id": booking.id,
+        "room_id": test_room["id"],
+        "start_date": booking_data.start_date.isoformat(),
+        "end_date": booking_data.end_date.isoformat(),
+    }
+    assert drain(elsewhere) == []
+
+def delta(frame: str) -> tuple:
+    event, data = frame.splitlines()[:2]
+    return event, json.loads(data[len("data: "):])
+
+@pytest.mark.asyncio
+async def test_updates_carry_what_they_replaced_and_moves_reach_both_hotels(db_session: AsyncSession, test_user, test_room):
+    other_hotel = Hotel(name=f"Availability {uuid.uuid4().hex[:8]}", address=f"{uuid.uuid4().hex[:8]} Move Street")
+    db_session.add(other_hotel)
+    await db_session.flush()
+    other_room = Room(hotel_id=other_hotel.id, price=80, number_of_beds=1)
+    db_session.add(other_room)
+    await db_session.commit()
+
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    manager = fresh(AvailabilityManager, engine=engine)
+    user = UserResponse(id=test_user["id"], email=test_user["email"], pseudo=test_user["pseudo"])
+    start = date.today() + timedelta(days=30)
+    try:
+        booking = await BookingService.create_booking(
+            db_session, BookingCreate(room_id=test_room["id"], start_date=start, end_date=start + timedelta(days=2), nbr_people=1), user,
+        )
+        subscription = await manager.subscribe(test_room["hotel_id"])
+        elsewhere = await manager.subscribe(other_hotel.id)
+
+        await BookingService.update_booking(db_session, booking.id, BookingUpdate(end_date=start + timedelta(days=3)), user)
+        await manager.follow()
+        event, moved = delta(*drain(subscription))
+        assert event == "event: update"
+        assert (moved["end_date"], moved["previous"]) == (
+            (start + timedelta(days=3)).isoformat(),
+            {"room_id": test_room["id"], "start_date": start.isoformat(), "end_date": (start + timedelta(days=2)).isoformat()},
+        )
+        assert drain(elsewhere) == []
+
+        await BookingService.update_booking(db_session, booking.id, BookingUpdate(room_id=other_room.id), user)
+        await manager.follow()
+        assert [(event, left["room_id"]) for event, left in map(delta, drain(subscription))] == [("event: delete", test_room["id"])]
+        assert [(event, entered["room_id"]) for event, entered in map(delta, drain(elsewhere))] == [("event: create", other_room.id)]
+    finally:
+        await BookingService.delete_booking(db_session, booking.id, user)
+        await db_session.delete(other_room)
+        await db_session.delete(other_hotel)
+        await db_session.commit()
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_pushes_new_bookings(test_user, test_room):
+    async with AsyncClient(base_url=BASE_URL, timeout=10) as ac:
+        assert (await ac.get("/hotels/999999999/availability/stream")).status_code == 404
+
+        async with ac.stream("GET", f"/hotels/{test_room['hotel_id']}/availability/stream") as stream:
+            assert stream.status_code == 200
+            assert stream.headers["content-type"].startswith("text/event-stream")
+
+            booking_data = {
+                "room_id": test_room["id"],
+                "start_date": str(date.today()),
+                "end_date": str(date.today() + timedelta(days=1)),
+                "nbr_people": 1,
+            }
+            async with AsyncClient(base_url=BASE_URL) as other:
+                response = await other.post("/bookings/", json=booking_data, headers=test_user["headers"])
+                assert response.status_code == 201, response.text
+
+            event = await asyncio.wait_for(anext(stream.aiter_text()), timeout=5)
+    assert event.startswith("event: create\n")
+    assert f'"booking_id": {response.json()["id"]}' in event
@@ -1,3 +1,4 @@
+import json
 import pytest
 from app.services.bookingService import BookingService
 from app.schemas.bookingSchemas import BookingCreate, BookingUpdate, BookingResponse
@@ -343,4 +344,24 @@ async def test_get_bookings_by_user_nonexistent_user(db_session):
     bookings = await BookingService.get_bookings_by_user(db_session, non_existent_user_id)
     
     assert isinstance(bookings, list)
-    assert len(bookings) == 0, f"Expected 0 bookings for non-existent user, got {len(bookings)}"
\ No newline at end of file
+    assert len(bookings) == 0, f"Expected 0 bookings for non-existent user, got {len(bookings)}"
+
+@pytest.mark.asyncio
+async def test_get_bookings_json_matches_schema(db_session: AsyncSession, test_user, test_room):
+    """The pre-serialized booking lists are identical to serializing the response schemas."""
+    booking_data = BookingCreate(
+        room_id=test_room["id"],
+        start_date=date.today(),
+        end_date=date.today() + timedelta(days=2),
+        nbr_people=2,
+        breakfast=True
+    )
+    userReponse = UserResponse(id=test_user["id"], email=test_user["email"], pseudo=test_user["pseudo"])
+    await BookingService.create_booking(db_session, booking_data, userReponse)
+
+    bookings = await BookingService.get_bookings(db_session, userReponse)
+    assert json.loads(await BookingService.get_bookings_json(db_session, userReponse)) == [booking.model_dump(mode="json") for booking in bookings]
+
+    bookings = await BookingService.get_bookings_by_user(db_session, test_user["id"])
+    assert len(bookings) == 1
+    assert json.loads(await BookingService.get_bookings_by_user_json(db_session, test_user["id"])) == [booking.model_dump(mode="json") for booking in bookings]
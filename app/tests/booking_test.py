@@ -617,3 +617,25 @@ async def test_get_bookings_by_user_as_self_nonexistent_user(test_user, db_sessi
     
     assert response.status_code == 403, f"Expected 403, got {response.status_code}"
     assert response.json()["detail"] == "Not authorized to view these bookings"
+
+@pytest.mark.asyncio
+async def test_get_bookings_with_fields(test_user, test_room, db_session):
+    """Test that bookings can be listed with only some of their fields."""
+    booking_create = BookingCreate(
+        room_id=test_room["id"],
+        start_date=date.today(),
+        end_date=date.today() + timedelta(days=2),
+        nbr_people=2,
+        breakfast=True
+    )
+    user_response = UserResponse(id=test_user["id"], email=test_user["email"], pseudo=test_user["pseudo"])
+    booking = await BookingService.create_booking(db_session, booking_create, user_response)
+
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        response = await ac.get("/bookings/", params={"fields": "start_date,id"}, headers=test_user["headers"])
+        by_user = await ac.get(f"/bookings/user/{test_user['id']}", params={"fields": "room_id"}, headers=test_user["headers"])
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.json() == [{"id": booking.id, "start_date": date.today().isoformat()}]
+    assert by_user.status_code == 200, f"Expected 200, got {by_user.status_code}"
+    assert by_user.json() == [{"room_id": test_room["id"]}]
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import random
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.managers.changeFeedManager import ChangeFeedManager
+from app.managers.databaseManager import DatabaseManager
+from app.schemas.hotelSchemas import HotelResponse
+from app.services.changeService import ChangeService, parse_cursor
+from app.tests.conftest import fresh
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture
+async def entity_id():
+    """An entity id no other test records changes for, deleted from the feed afterwards."""
+    entity_id = random.randint(1_000_000_000, 2_000_000_000)
+    yield entity_id
+
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    async with engine.begin() as connection:
+        await connection.execute(text("DELETE FROM changes WHERE entity_id = :id"), {"id": entity_id})
+    await engine.dispose()
+
+async def feed_of(db: AsyncSession, entity_id: int, since, limit=10_000):
+    feed = await ChangeService.get_changes(db, since, limit, ["hotel"])
+    return [change for change in feed.changes if change.entity_id == entity_id], feed
+
+def hotel(entity_id: int, name: str) -> HotelResponse:
+    return HotelResponse(id=entity_id, name=name, address="1 Feed Street", description=None, rating=None, breakfast=False)
+
+@pytest.mark.asyncio
+async def test_changes_are_published_with_their_transaction(db_session: AsyncSession, entity_id):
+    head = await ChangeService.head(db_session)
+    ChangeService.record(db_session, "hotel", entity_id, "create", hotel(entity_id, "Rolled back"))
+    await db_session.rollback()
+    assert (await feed_of(db_session, entity_id, head))[0] == []
+
+    ChangeService.record(db_session, "hotel", entity_id, "create", hotel(entity_id, "Committed"))
+    await db_session.commit()
+    changes, _ = await feed_of(db_session, entity_id, head)
+    assert [(change.operation, change.data["name"]) for change in changes] == [("create", "Committed")]
+
+@pytest.mark.asyncio
+async def test_cursors_page_through_the_feed(db_session: AsyncSession, entity_id):
+    head = await ChangeService.head(db_session)
+    for operation in ("create", "update", "delete"):
+        ChangeService.record(db_session, "hotel", entity_id, operation)
+        await db_session.commit()
+
+    since, seen = head, []
+    while True:
+        page = await ChangeService.get_changes(db_session, since, 1, ["hotel"])
+        if not page.changes:
+            break
+        seen += [change.operation for change in page.changes if change.entity_id == entity_id]
+        since = parse_cursor(page.next)
+    assert seen == ["create", "update", "delete"]
+    # An exhausted feed hands the same cursor back
+    assert page.next == "%d-%d" % since
+
+@pytest.mark.asyncio
+async def test_open_transactions_hold_back_later_commits(db_session: AsyncSession, entity_id):
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    other = sessionmaker(bind=engine, class_=AsyncSession)()
+    head = await ChangeService.head(db_session)
+    await db_session.rollback()
+    try:
+        # Started first, so its transaction id is the lower one, but commits last
+        ChangeService.record(other, "hotel", entity_id, "update")
+        await other.flush()
+
+        ChangeService.record(db_session, "hotel", entity_id, "create")
+        await db_session.commit()
+        changes, _ = await feed_of(db_session, entity_id, head)
+        assert changes == []
+
+        await other.commit()
+        changes, _ = await feed_of(db_session, entity_id, head)
+        assert [change.operation for change in changes] == ["update", "create"]
+    finally:
+        await other.close()
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_long_poll_returns_once_a_change_commits(db_session: AsyncSession, entity_id):
+    since = await ChangeService.head(db_session)
+    await db_session.rollback()
+
+    async def commit_later():
+        await asyncio.sleep(0.2)
+        ChangeService.record(db_session, "hotel", entity_id, "create")
+        await db_session.commit()
+
+    async with DatabaseManager().async_session() as reader:
+        writer = asyncio.create_task(commit_later())
+        feed = await ChangeService.wait_for_changes(reader, since, 100, 5, ["hotel"])
+        await writer
+    await DatabaseManager().engine.dispose()
+    assert entity_id in [change.entity_id for change in feed.changes]
+
+@pytest.mark.asyncio
+async def test_stream_sends_changes_as_server_sent_events(db_session: AsyncSession, entity_id):
+    head = await ChangeService.head(db_session)
+    ChangeService.record(db_session, "hotel", entity_id, "delete")
+    await db_session.commit()
+
+    stream = ChangeService.stream(head, 100, ["hotel"])
+    try:
+        event = await asyncio.wait_for(stream.__anext__(), timeout=5)
+    finally:
+        await stream.aclose()
+        await DatabaseManager().engine.dispose()
+
+    lines = event.splitlines()
+    assert lines[0].startswith("id: ") and lines[1] == "event: change" and event.endswith("\n\n")
+    assert f'"entity_id":{entity_id}' in lines[2]
+
+@pytest.mark.asyncio
+async def test_feed_is_for_admins_only(test_user, test_admin_user):
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        assert (await ac.get("/changes", headers=test_user["headers"])).status_code == 403
+        assert (await ac.get("/changes", params={"since": "nope"}, headers=test_admin_user["headers"])).status_code == 400
+
+        response = await ac.get("/changes", params={"entity": "hotel", "limit": 5}, headers=test_admin_user["headers"])
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["changes"]) <= 5 and all(change["entity"] == "hotel" for change in body["changes"])
+
+@pytest.mark.asyncio
+async def test_mutations_record_their_changes(db_session: AsyncSession, test_room):
+    head = await ChangeService.head(db_session)
+    await db_session.rollback()
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        response = await ac.patch(f"/rooms/{test_room['id']}", json={"number_of_beds": 3}, headers=test_room["headers"])
+        assert response.status_code == 200, response.text
+
+    feed = await ChangeService.get_changes(db_session, head, 1000, ["room"])
+    changes = [change for change in feed.changes if change.entity_id == test_room["id"]]
+    assert [(change.operation, change.data["number_of_beds"], change.previous["number_of_beds"]) for change in changes] == [("update", 3, 2)]
+
+@pytest.mark.asyncio
+async def test_changes_past_their_retention_are_purged(db_session: AsyncSession, entity_id):
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    manager = fresh(ChangeFeedManager, retention_seconds=86400, engine=engine)
+    try:
+        head = await ChangeService.head(db_session)
+        ChangeService.record(db_session, "hotel", entity_id, "create")
+        ChangeService.record(db_session, "hotel", entity_id, "update")
+        await db_session.commit()
+        await db_session.execute(
+            text("UPDATE changes SET created_at = now() - interval '2 days' WHERE entity_id = :id AND operation = 'create'"), {"id": entity_id},
+        )
+        await db_session.commit()
+
+        assert await manager.purge() >= 1
+        changes, _ = await feed_of(db_session, entity_id, head)
+        assert [change.operation for change in changes] == ["update"]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,128 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from app.managers.compressionManager import CompressionManager, negotiate
+from app.middlewares.compressionMiddleware import CompressionMiddleware
+from app.tests.conftest import fresh
+from app.utils.responses import EventStreamResponse
+
+BASE_URL = "http://localhost:8000"
+BODY = b'{"hotels": [' + b",".join(b'{"id": %d, "name": "Hotel %d"}' % (i, i) for i in range(200)) + b"]}"
+
+def make_manager(min_size: int = 1024, cache_bytes: int = 1024 * 1024, thread_min_size: int = 64 * 1024) -> CompressionManager:
+    """A manager outside the singleton."""
+    return fresh(CompressionManager, enabled=True, min_size=min_size, cache_bytes=cache_bytes, thread_min_size=thread_min_size)
+
+def make_app(manager: CompressionManager) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, manager=manager)
+
+    @app.get("/large")
+    async def large():
+        return Response(BODY, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for i in range(100):
+                yield b'{"id": %d, "name": "Hotel %d"}\n' % (i, i)
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            yield b"data: " + BODY + b"\n\n"
+        return EventStreamResponse(stream())
+
+    return app
+
+def client(manager: CompressionManager) -> AsyncClient:
+    # httpx decodes the bodies, their Content-Length is the compressed one
+    return AsyncClient(transport=ASGITransport(app=make_app(manager)), base_url="http://test", headers={"Accept-Encoding": "identity"})
+
+def test_negotiate():
+    assert negotiate("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate("gzip, br;q=0.9") == "gzip"
+    assert negotiate("br;q=0.5, gzip;q=0.5") == "br"
+    assert negotiate("*;q=0.1, zstd;q=0") == "br"
+    assert negotiate("identity") is None
+    assert negotiate("") is None
+    assert negotiate("gzip;q=0") is None
+
+@pytest.mark.asyncio
+async def test_public_responses_are_compressed_once():
+    manager = make_manager()
+
+    async with client(manager) as ac:
+        for encoding in ("gzip", "br", "zstd"):
+            for _ in range(3):
+                response = await ac.get("/large", headers={"Accept-Encoding": encoding})
+                assert response.headers["Content-Encoding"] == encoding
+                assert response.headers["Vary"] == "Accept-Encoding"
+                assert int(response.headers["Content-Length"]) < len(BODY)
+                assert response.content == BODY
+
+        authenticated = await ac.get("/large", headers={"Accept-Encoding": "br", "Authorization": "Bearer token"})
+        assert authenticated.headers["Content-Encoding"] == "br" and authenticated.content == BODY
+
+    snapshot = manager.snapshot()
+    assert (snapshot["misses"], snapshot["hits"], snapshot["cached"]) == (3, 6, 3)
+    assert snapshot["responses"] == {"zstd": 3, "br": 4, "gzip": 3}
+
+@pytest.mark.asyncio
+async def test_small_bodies_and_event_streams_go_out_as_they_are():
+    manager = make_manager()
+
+    async with client(manager) as ac:
+        small = await ac.get("/small", headers={"Accept-Encoding": "gzip"})
+        events = await ac.get("/events", headers={"Accept-Encoding": "gzip"})
+        identity = await ac.get("/large")
+
+    assert "Content-Encoding" not in small.headers and small.content == b'{"ok": true}'
+    assert "Content-Encoding" not in events.headers and events.content == b"data: " + BODY + b"\n\n"
+    assert "Content-Encoding" not in identity.headers and identity.content == BODY
+    assert manager.snapshot()["bytes_in"] == 0
+
+@pytest.mark.asyncio
+async def test_streamed_responses_are_compressed_as_they_stream():
+    manager = make_manager()
+
+    async with client(manager) as ac:
+        response = await ac.get("/export", headers={"Accept-Encoding": "zstd"})
+
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert "Content-Length" not in response.headers
+    assert response.content == b"".join(b'{"id": %d, "name": "Hotel %d"}\n' % (i, i) for i in range(100))
+    snapshot = manager.snapshot()
+    assert snapshot["streams"] == 1 and 0 < snapshot["bytes_out"] < snapshot["bytes_in"]
+
+@pytest.mark.asyncio
+async def test_large_bodies_are_compressed_off_the_event_loop():
+    manager = make_manager(thread_min_size=len(BODY))
+
+    async with client(manager) as ac:
+        for encoding in ("gzip", "br", "zstd"):
+            response = await ac.get("/large", headers={"Accept-Encoding": encoding})
+            assert response.content == BODY
+        small = await ac.get("/export", headers={"Accept-Encoding": "gzip"})
+        assert small.headers["Content-Encoding"] == "gzip"
+
+    # The three whole bodies went to a thread, the small chunks of the stream did not
+    assert manager.snapshot()["threaded"] == 3
+
+@pytest.mark.asyncio
+async def test_server_compresses_responses(test_hotel):
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        schema = await ac.get("/openapi.json", headers={"Accept-Encoding": "br"})
+        hotels = await ac.get("/hotels/search", params={"name": test_hotel["name"], "limit": 1000}, headers={"Accept-Encoding": "gzip"})
+
+    assert schema.headers["Content-Encoding"] == "br"
+    assert int(schema.headers["Content-Length"]) < len(schema.content)
+    assert "/hotels/search" in schema.json()["paths"]
+    assert hotels.status_code == 200, f"Expected 200, got {hotels.status_code}, response: {hotels.text}"
+    assert any(hotel["id"] == test_hotel["id"] for hotel in hotels.json())
@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from app.managers.concurrencyManager import (
+    PRIORITY_CRITICAL, PRIORITY_LOW, PRIORITY_STANDARD, AIMDLimit, ConcurrencyManager, route_priority,
+)
+from app.middlewares.concurrencyMiddleware import ConcurrencyLimitMiddleware
+from app.tests.conftest import fresh
+
+def make_manager(limit: int, max_queue: int = 10, max_wait: float = 1.0) -> ConcurrencyManager:
+    """A manager outside the singleton, with a fixed limit."""
+    return fresh(ConcurrencyManager, limit=AIMDLimit(initial=limit, minimum=limit, maximum=limit), max_queue=max_queue, max_wait=max_wait, enabled=True)
+
+def test_route_priorities():
+    assert route_priority("POST", "/bookings/") == PRIORITY_CRITICAL
+    assert route_priority("GET", "/bookings/user/{user_id}") == PRIORITY_CRITICAL
+    assert route_priority("GET", "/hotels/search") == PRIORITY_STANDARD
+    assert route_priority("GET", "/users/") == PRIORITY_LOW
+    assert route_priority("POST", "/users/") == PRIORITY_STANDARD
+    assert route_priority("POST", "/hotels/import") == PRIORITY_LOW
+
+def test_aimd_grows_when_used_and_backs_off_on_latency():
+    now = [0.0]
+    limit = AIMDLimit(initial=10, minimum=2, maximum=12, backoff=0.5, decrease_interval=1.0, clock=lambda: now[0])
+
+    limit.update(latency=0.01, baseline=0.01, in_flight=1)
+    assert limit.value == 10
+
+    for _ in range(100):
+        limit.update(latency=0.01, baseline=0.01, in_flight=10)
+    assert limit.value == 12
+
+    limit.update(latency=0.05, baseline=0.01, in_flight=10)
+    limit.update(latency=0.05, baseline=0.01, in_flight=10)
+    assert limit.value == 6
+
+    now[0] += 1
+    for _ in range(5):
+        limit.update(latency=0.05, baseline=0.01, in_flight=10)
+        now[0] += 1
+    assert limit.value == 2
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority():
+    manager = make_manager(limit=1)
+    holder = manager.route("GET /hotels/search", PRIORITY_STANDARD)
+    assert await manager.acquire(holder)
+
+    order = []
+
+    async def request(key, priority):
+        metrics = manager.route(key, priority)
+        assert await manager.acquire(metrics)
+        order.append(key)
+        manager.release(metrics, 0.001)
+
+    tasks = [
+        asyncio.create_task(request("GET /users/", PRIORITY_LOW)),
+        asyncio.create_task(request("GET /hotels/search", PRIORITY_STANDARD)),
+        asyncio.create_task(request("POST /bookings/", PRIORITY_CRITICAL)),
+    ]
+    await asyncio.sleep(0)
+    assert manager.snapshot()["queued"] == {"critical": 1, "standard": 1, "low": 1}
+
+    manager.release(holder, 0.001)
+    await asyncio.gather(*tasks)
+
+    assert order == ["POST /bookings/", "GET /hotels/search", "GET /users/"]
+    assert manager.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_full_queue_and_slow_queue_are_shed():
+    manager = make_manager(limit=1, max_queue=2, max_wait=0.05)
+    holder = manager.route("POST /bookings/", PRIORITY_CRITICAL)
+    assert await manager.acquire(holder)
+
+    low = manager.route("GET /users/", PRIORITY_LOW)
+    # The low class gets a quarter of the queue and of the wait: one place, shed after 12.5 ms
+    results = await asyncio.gather(manager.acquire(low), manager.acquire(low))
+
+    assert sorted(results) == [False, False]
+    assert manager.snapshot()["routes"]["GET /users/"]["rejected"] == 2
+    assert manager.snapshot()["queued"]["low"] == 0
+
+    manager.release(holder, 0.001)
+    assert await manager.acquire(low)
+
+def make_app(manager: ConcurrencyManager) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ConcurrencyLimitMiddleware, manager=manager)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @app.get("/users/")
+    async def list_users():
+        return []
+
+    @app.get("/changes")
+    async def changes():
+        return {"changes": []}
+
+    @app.post("/hotels/import")
+    async def import_hotels():
+        await asyncio.sleep(0.2)
+        return {"hotels": 0}
+
+    return app
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after_and_reports_metrics():
+    manager = make_manager(limit=1, max_queue=4, max_wait=0.05)
+
+    async with AsyncClient(transport=ASGITransport(app=make_app(manager)), base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.05)
+        shed = await client.get("/users/")
+        assert (await slow).status_code == 200
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+
+    routes = manager.snapshot()["routes"]
+    assert routes["GET /slow"]["admitted"] == 1
+    assert routes["GET /slow"]["avg_latency_ms"] >= 200
+    assert routes["GET /users/"]["priority"] == "low"
+    assert (routes["GET /users/"]["admitted"], routes["GET /users/"]["rejected"], routes["GET /users/"]["queued"]) == (0, 1, 0)
+
+@pytest.mark.asyncio
+async def test_imports_are_limited_without_feeding_the_limit():
+    manager = make_manager(limit=1, max_queue=4, max_wait=0.05)
+
+    async with AsyncClient(transport=ASGITransport(app=make_app(manager)), base_url="http://test") as client:
+        running = asyncio.create_task(client.post("/hotels/import"))
+        await asyncio.sleep(0.05)
+        shed = await client.post("/hotels/import")
+        assert (await running).status_code == 200
+
+    assert shed.status_code == 503
+    imports = manager.snapshot()["routes"]["POST /hotels/import"]
+    assert (imports["priority"], imports["admitted"], imports["rejected"]) == ("low", 1, 1)
+    assert imports["avg_latency_ms"] >= 200 and imports["baseline_ms"] is None
+
+@pytest.mark.asyncio
+async def test_only_waiting_feed_reads_are_exempt():
+    manager = make_manager(limit=1, max_queue=4, max_wait=0.05)
+
+    async with AsyncClient(transport=ASGITransport(app=make_app(manager)), base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.05)
+        read = await client.get("/changes")
+        long_poll = await client.get("/changes", params={"wait": 5})
+        stream = await client.get("/changes", headers={"Accept": "text/event-stream"})
+        await slow
+
+    assert (read.status_code, long_poll.status_code, stream.status_code) == (503, 200, 200)
+    assert manager.snapshot()["routes"]["GET /changes"]["rejected"] == 1
@@ -17,6 +17,17 @@ TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
 engine = create_async_engine(TEST_DATABASE_URL, echo=True, future=True, poolclass=NullPool)
 TestingSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+def fresh(cls, **kwargs):
+    """An instance of a singleton manager outside the singleton, as another worker would have"""
+    instance = object.__new__(cls)
+    instance.__init__(**kwargs)
+    return instance
+
+@pytest.fixture()
+def db_engine():
+    """The engine of the test sessions, for managers reading the database on connections of their own"""
+    return engine
+
 @pytest.fixture()
 async def db_session():
     """Create an isolated session for each functional test"""
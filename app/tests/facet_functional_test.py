@@ -0,0 +1,118 @@
+import uuid
+from decimal import Decimal
+import pytest
+from sqlalchemy import text
+from app.managers.changeFeedManager import RELOAD
+from app.managers.facetManager import FacetManager
+from app.schemas.hotelSchemas import HotelCreate, HotelUpdate
+from app.schemas.roomSchemas import RoomCreate
+from app.services.hotelService import HotelService
+from app.services.roomService import RoomService
+from app.tests.conftest import fresh
+
+FILTERS = [
+    {},
+    {"rating": ["4-5"]},
+    {"rating": ["4-5", "unrated"], "price": ["50-100"]},
+    {"breakfast": ["true"], "price": ["no-rooms", "100-200"]},
+]
+
+@pytest.fixture
+async def city_hotels(db_session, test_user):
+    """Three hotels of a city of their own: rated 4.5 with breakfast, rated 2 and unrated, without rooms."""
+    city = f"Facetville {uuid.uuid4().hex[:8]}"
+    hotels = [
+        await HotelService.create_hotel(db_session, HotelCreate(name=f"{city} {rating}", address=city, city=city, rating=rating, breakfast=rating == 4.5), test_user["id"])
+        for rating in (4.5, 2, None)
+    ]
+    await RoomService.create_room(db_session, RoomCreate(hotel_id=hotels[0].id, price=Decimal("80"), number_of_beds=2))
+    await RoomService.create_room(db_session, RoomCreate(hotel_id=hotels[0].id, price=Decimal("150"), number_of_beds=3))
+    await RoomService.create_room(db_session, RoomCreate(hotel_id=hotels[1].id, price=Decimal("500"), number_of_beds=1))
+    yield city, hotels
+    for hotel in hotels:
+        await HotelService.delete_hotel(db_session, hotel.id)
+
+@pytest.fixture
+def facet_manager(db_engine) -> FacetManager:
+    """A manager outside the singleton, reading through the test engine."""
+    return fresh(FacetManager, enabled=True, engine=db_engine)
+
+@pytest.mark.asyncio
+async def test_counts_in_memory_match_grouped_query(db_session, city_hotels, facet_manager):
+    city, _ = city_hotels
+    manager = facet_manager
+    await manager.load()
+
+    for filters in FILTERS + [{**filters, "city": [city]} for filters in FILTERS]:
+        assert manager.count(filters) == await HotelService._count_facets(db_session, HotelService._facet_hotels(None, None), filters)
+
+    total, facets = manager.count({"city": [city]})
+    assert total == 3
+    assert facets["rating"] == {"4-5": 1, "2-3": 1, "unrated": 1}
+    assert {value: facets["price"].get(value) for value in ("50-100", "500+", "no-rooms")} == {"50-100": 1, "500+": 1, "no-rooms": 1}
+    assert facets["city"][city] == 3
+
+@pytest.mark.asyncio
+async def test_counts_follow_changes(db_session, city_hotels, facet_manager):
+    city, hotels = city_hotels
+    manager = facet_manager
+    await manager.load()
+
+    await HotelService.update_hotel(db_session, hotels[1].id, HotelUpdate(rating=Decimal("4.0"), breakfast=True))
+    await RoomService.create_room(db_session, RoomCreate(hotel_id=hotels[2].id, price=Decimal("20"), number_of_beds=1))
+    await HotelService.delete_hotel(db_session, hotels[0].id)
+    await manager.follow()
+
+    total, facets = manager.count({"city": [city], "breakfast": ["true"]})
+    assert total == 1
+    assert facets["rating"] == {"4-5": 1}
+    assert facets["breakfast"] == {"true": 1, "false": 1}
+    assert facets["price"] == {"500+": 1}
+    assert manager.count({"city": [city], "price": ["0-50"]})[0] == 1
+
+@pytest.mark.asyncio
+async def test_faceted_search_pages_the_filtered_hotels(db_session, city_hotels):
+    city, hotels = city_hotels
+
+    result = await HotelService.search_faceted(db_session, address=city, rating=["4-5", "2-3"], city=[city], limit=1)
+
+    assert result.total == 2
+    assert [hotel.id for hotel in result.hotels] == [hotels[0].id]
+    assert {facet.value: facet.count for facet in result.facets["rating"]}["unrated"] == 1
+    assert [facet.value for facet in result.facets["price"]] == ["0-50", "50-100", "100-200", "200-500", "500+", "no-rooms"]
+
+@pytest.mark.asyncio
+async def test_counts_out_of_time_leave_the_page_without_facets(db_session, city_hotels, monkeypatch):
+    city, hotels = city_hotels
+
+    async def slow_count(db, hotels, filters):
+        await db.execute(text("SELECT pg_sleep(1)"))
+
+    monkeypatch.setattr(HotelService, "_count_facets", slow_count)
+    await db_session.execute(text("SET LOCAL statement_timeout = 100"))
+    result = await HotelService.search_faceted(db_session, address=city, limit=1)
+
+    assert [hotel.id for hotel in result.hotels] == [hotels[0].id]
+    assert result.total is None and result.facets == {}
+    # The transaction goes on past the count
+    assert (await db_session.execute(text("SELECT 1"))).scalar() == 1
+
+@pytest.mark.asyncio
+async def test_counts_reload_after_a_bulk_load(db_session, city_hotels, facet_manager):
+    city, _ = city_hotels
+    await facet_manager.load()
+
+    # Copied in without a change of its own, as the seeder does
+    bulk_id = (await db_session.execute(
+        text("INSERT INTO hotels (name, address, city, rating, breakfast) VALUES ('Bulk', :city, :city, 3.5, true) RETURNING id"), {"city": city}
+    )).scalar()
+    await db_session.execute(text("INSERT INTO changes (entity, entity_id, operation) VALUES ('hotel', 0, :operation)"), {"operation": RELOAD})
+    await db_session.commit()
+    try:
+        assert facet_manager.count({"city": [city]})[0] == 3
+        await facet_manager.follow()
+        total, facets = facet_manager.count({"city": [city]})
+        assert facet_manager.ready and total == 4
+        assert facets["rating"] == {"4-5": 1, "3-4": 1, "2-3": 1, "unrated": 1}
+    finally:
+        await db_session.execute(text("DELETE FROM hotels WHERE id = :id"), {"id": bulk_id})
@@ -0,0 +1,132 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+from app.managers.geocodingManager import GeocodingManager
+from app.models.changeModel import Change
+from app.models.hotelModel import Hotel
+from app.schemas.hotelSchemas import HotelCreate, HotelUpdate
+from app.services.hotelService import HotelService
+from app.services.importService import ImportService
+
+ADDRESSES = {
+    "rue de rivoli, paris": (48.8606, 2.3376),
+    "nowhere": None,
+    "elsewhere": None,
+}
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Point the geocoder at a table of known addresses, recording every lookup."""
+    lookups = []
+
+    def fetch(address):
+        lookups.append(address)
+        if address == "unreachable":
+            raise OSError("Connection refused")
+        return ADDRESSES[" ".join(address.lower().split())]
+
+    manager = GeocodingManager()
+    monkeypatch.setattr(manager, "url", "http://geocoder.test/search")
+    monkeypatch.setattr(manager, "fetch", fetch)
+    monkeypatch.setattr(manager, "cache", type(manager.cache)())
+    monkeypatch.setattr(manager, "inflight", {})
+    return lookups
+
+@pytest.mark.asyncio
+async def test_addresses_are_looked_up_once(lookups):
+    manager = GeocodingManager()
+
+    assert await manager.geocode_many(["Rue de Rivoli, Paris", "rue de  RIVOLI, paris"]) == [(48.8606, 2.3376)] * 2
+    assert await manager.geocode("rue de rivoli, Paris") == (48.8606, 2.3376)
+    assert await manager.geocode("Nowhere") is None
+    assert await manager.geocode("nowhere") is None
+    # Failures are not cached: the next write tries again
+    assert await manager.geocode("unreachable") is None
+    assert await manager.geocode("unreachable") is None
+
+    assert lookups == ["Rue de Rivoli, Paris", "Nowhere", "unreachable", "unreachable"]
+
+@pytest.mark.asyncio
+async def test_hotels_are_geocoded_when_written(db_session, test_user, lookups):
+    hotel = await HotelService.create_hotel(db_session, HotelCreate(name="Geocoded", address="Rue de Rivoli, Paris"), test_user["id"])
+    placed = await HotelService.create_hotel(
+        db_session, HotelCreate(name="Placed", address="Rue de Rivoli, Paris", latitude=1, longitude=2), test_user["id"],
+    )
+    try:
+        assert (hotel.latitude, hotel.longitude) == (48.8606, 2.3376)
+        assert (placed.latitude, placed.longitude) == (1, 2)
+
+        # An address the geocoder cannot place does not keep the old location
+        moved = await HotelService.update_hotel(db_session, placed.id, HotelUpdate(address="Nowhere"))
+        assert (moved.latitude, moved.longitude) == (None, None)
+        moved = await HotelService.update_hotel(db_session, hotel.id, HotelUpdate(address="Nowhere", latitude=3, longitude=4))
+        assert (moved.latitude, moved.longitude) == (3, 4)
+
+        # A user who may not update the hotel is turned away before any lookup
+        lookups.clear()
+        with pytest.raises(HTTPException) as forbidden:
+            await HotelService.update_hotel(db_session, hotel.id, HotelUpdate(address="Rue de Rivoli, Paris"), admin_id=test_user["id"])
+        assert forbidden.value.status_code == 403
+        assert lookups == []
+    finally:
+        await HotelService.delete_hotel(db_session, hotel.id)
+        await HotelService.delete_hotel(db_session, placed.id)
+
+@pytest.mark.asyncio
+async def test_imported_hotels_are_geocoded(db_session, lookups):
+    body = (
+        "type,name,address,latitude,longitude\n"
+        "hotel,Imported geocoded,\"Rue de Rivoli, Paris\",,\n"
+        "hotel,Imported unknown,Nowhere,,\n"
+        "hotel,Imported placed,Unreachable,10,20\n"
+    )
+
+    async def chunks():
+        yield body.encode()
+
+    report = await ImportService.import_hotels(db_session, chunks(), "text/csv")
+    rows = (await db_session.execute(
+        select(Hotel.id, Hotel.name, Hotel.latitude, Hotel.longitude).where(Hotel.name.startswith("Imported ")).order_by(Hotel.id)
+    )).all()
+    await db_session.execute(delete(Change).where(Change.entity == "hotel", Change.entity_id.in_([row.id for row in rows])))
+    await db_session.execute(delete(Hotel).where(Hotel.id.in_([row.id for row in rows])))
+
+    assert report.hotels == 3
+    assert [(row.name, row.latitude, row.longitude) for row in rows] == [
+        ("Imported geocoded", 48.8606, 2.3376),
+        ("Imported unknown", None, None),
+        ("Imported placed", 10, 20),
+    ]
+    assert "Unreachable" not in lookups
+
+@pytest.mark.asyncio
+async def test_no_transaction_is_open_while_geocoding(db_session, test_user, lookups, monkeypatch):
+    manager = GeocodingManager()
+    fetch = manager.fetch
+    in_transaction = []
+
+    def fetch_outside(address):
+        in_transaction.append(db_session.in_transaction())
+        return fetch(address)
+
+    monkeypatch.setattr(manager, "fetch", fetch_outside)
+    # Like the controllers' role lookup, a read opens the transaction before the write
+    await db_session.execute(select(Hotel.id).limit(1))
+    hotel = await HotelService.create_hotel(db_session, HotelCreate(name="Geocoded outside", address="Rue de Rivoli, Paris"), test_user["id"])
+    try:
+        await HotelService.update_hotel(db_session, hotel.id, HotelUpdate(address="Nowhere"))
+    finally:
+        await HotelService.delete_hotel(db_session, hotel.id)
+
+    async def chunks():
+        yield b"type,name,address\nhotel,Imported outside,Elsewhere\n"
+
+    report = await ImportService.import_hotels(db_session, chunks(), "text/csv")
+    imported = (await db_session.execute(select(Hotel.id).where(Hotel.name == "Imported outside"))).scalars().all()
+    await db_session.execute(delete(Change).where(Change.entity == "hotel", Change.entity_id.in_(imported)))
+    await db_session.execute(delete(Hotel).where(Hotel.id.in_(imported)))
+    await db_session.commit()
+
+    assert report.hotels == 1
+    assert lookups == ["Rue de Rivoli, Paris", "Nowhere", "Elsewhere"]
+    assert in_transaction == [False, False, False]
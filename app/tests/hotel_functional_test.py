@@ -1,4 +1,8 @@
+import json
+from decimal import Decimal
 import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
 from app.schemas.hotelSchemas import HotelCreate, HotelUpdate
 from app.services.hotelService import HotelService
 
@@ -36,6 +40,16 @@ async def test_get_hotels(db_session):
     assert len(hotels) > 0
 
 
+@pytest.mark.asyncio
+async def test_get_hotels_json_matches_schema(db_session, test_hotel):
+    """The pre-serialized listing is identical to serializing the response schemas."""
+    hotels = await HotelService.get_hotels(db_session, name=test_hotel["name"], limit=50)
+    hotels_json = await HotelService.get_hotels_json(db_session, name=test_hotel["name"], limit=50)
+
+    assert json.loads(hotels_json) == [hotel.model_dump(mode="json") for hotel in hotels]
+    assert any(hotel["id"] == test_hotel["id"] for hotel in json.loads(hotels_json))
+
+
 @pytest.mark.asyncio
 async def test_get_hotels_with_filter(db_session, test_hotel):
     """Ensure filtering by name and address works."""
@@ -88,3 +102,90 @@ async def test_delete_hotel(db_session, test_user):
 
     success = await HotelService.delete_hotel(db_session, newHotel.id)
     assert success is True
+
+@pytest.mark.asyncio
+async def test_update_hotel_authorizes_in_the_statement(db_session, test_hotel, test_user, test_admin_user):
+    """Admins update in one statement, others get a 403, and a missing hotel is None for admins."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        updated = await HotelService.update_hotel(db_session, test_hotel["id"], HotelUpdate(rating=3.5), admin_id=test_admin_user["id"])
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    assert updated.rating == Decimal("3.5")
+    assert len(statements) == 1 and " ".join(statements[0].split()).startswith("WITH before AS (SELECT hotels.id")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await HotelService.update_hotel(db_session, test_hotel["id"], HotelUpdate(rating=1.0), admin_id=test_user["id"])
+    assert exc_info.value.status_code == 403
+    assert (await HotelService.get_hotel(db_session, test_hotel["id"])).rating == Decimal("3.5")
+
+    assert await HotelService.update_hotel(db_session, 999999999, HotelUpdate(rating=1.0), admin_id=test_admin_user["id"]) is None
+    with pytest.raises(HTTPException) as exc_info:
+        await HotelService.delete_hotel(db_session, test_hotel["id"], admin_id=test_user["id"])
+    assert exc_info.value.status_code == 403
+
+@pytest.mark.asyncio
+async def test_nearby_hotels_are_ordered_by_distance(db_session, test_user):
+    """Hotels within the radius come nearest first, across the antimeridian too, and the filters apply."""
+    places = {
+        "Here": (-16.5, 179.95, True, 4.0),
+        "Across the antimeridian": (-16.5, -179.95, False, 3.0),
+        "South": (-16.6, 179.95, True, 2.0),
+        "Far": (-17.5, 179.95, True, 5.0),
+    }
+    hotels = {}
+    for name, (latitude, longitude, breakfast, rating) in places.items():
+        hotel_data = HotelCreate(
+            name=name, address="Taveuni, Fiji", latitude=latitude, longitude=longitude, breakfast=breakfast, rating=rating,
+        )
+        hotels[name] = await HotelService.create_hotel(db_session, hotel_data, test_user["id"])
+
+    try:
+        nearby = json.loads(await HotelService.get_nearby_hotels_json(db_session, -16.5, 179.95, 15))
+        assert [hotel["name"] for hotel in nearby] == ["Here", "Across the antimeridian", "South"]
+        assert [round(hotel["distance"], 1) for hotel in nearby] == [0, 10.7, 11.1]
+        assert nearby[1]["longitude"] == -179.95
+
+        with_breakfast = json.loads(await HotelService.get_nearby_hotels_json(
+            db_session, -16.5, 179.95, 150, breakfast=True, min_rating=Decimal("3.5"),
+        ))
+        assert [hotel["name"] for hotel in with_breakfast] == ["Here", "Far"]
+    finally:
+        for hotel in hotels.values():
+            await HotelService.delete_hotel(db_session, hotel.id)
+
+
+@pytest.mark.asyncio
+async def test_get_hotel_detail_includes_rooms_and_summary(db_session, test_room):
+    """Rooms and their summary come with the hotel only when asked for."""
+    hotel_id = test_room["hotel_id"]
+
+    plain = await HotelService.get_hotel_detail(db_session, hotel_id)
+    with_rooms = await HotelService.get_hotel_detail(db_session, hotel_id, {"rooms", "summary"})
+    summary = await HotelService.get_hotel_detail(db_session, hotel_id, {"summary"})
+
+    assert plain.model_fields_set.isdisjoint({"rooms", "summary"})
+    assert [room.id for room in with_rooms.rooms] == [test_room["id"]]
+    assert with_rooms.summary == summary.summary
+    assert summary.summary.model_dump() == {"rooms": 1, "beds": 2, "min_price": Decimal("120.50"), "max_price": Decimal("120.50")}
+    assert "rooms" not in summary.model_fields_set
+    assert await HotelService.get_hotel_detail(db_session, -1, {"rooms"}) is None
+
+@pytest.mark.asyncio
+async def test_sparse_fields_narrow_the_select(db_session, test_hotel):
+    """Only the columns of the fields asked for are read, and only those fields are returned."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        hotels = json.loads(await HotelService.get_hotels_json(db_session, name=test_hotel["name"], limit=1000, fields=["name", "id"]))
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert hotels and all(list(hotel) == ["name", "id"] for hotel in hotels)
+    assert test_hotel["id"] in [hotel["id"] for hotel in hotels]
+    select_list = " ".join(statements[0].split()).split(" FROM hotels")[0]
+    assert "hotels.id" in select_list and "hotels.name" in select_list
+    assert "description" not in select_list and "rating" not in select_list
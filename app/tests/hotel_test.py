@@ -85,3 +85,89 @@ async def test_delete_hotel(test_admin_user):
     async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
         delete_response = await ac.delete(f"/{hotel['id']}", headers=test_admin_user["headers"])
         assert delete_response.status_code == 204, f"Expected 204, got {delete_response.status_code}, response: {delete_response.text}"
+
+@pytest.mark.asyncio
+async def test_nearby_hotels(test_admin_user):
+    """Nearby search validates its point and returns hotels with their distance."""
+    hotel_data = {"name": "Nearby Hotel", "address": "Reykjavik, Iceland", "latitude": 64.1466, "longitude": -21.9426}
+
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        assert (await ac.post("/", json={**hotel_data, "longitude": None}, headers=test_admin_user["headers"])).status_code == 422
+        create_response = await ac.post("/", json=hotel_data, headers=test_admin_user["headers"])
+        assert create_response.status_code == 201, f"Expected 201, got {create_response.status_code}, response: {create_response.text}"
+        hotel = create_response.json()
+
+        response = await ac.get("/nearby", params={"lat": 64.15, "lon": -21.94, "radius": 2})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}, response: {response.text}"
+        assert [(found["id"], round(found["distance"], 2)) for found in response.json()] == [(hotel["id"], 0.4)]
+        assert (await ac.get("/nearby", params={"lat": 91, "lon": 0})).status_code == 422
+
+        await ac.delete(f"/{hotel['id']}", headers=test_admin_user["headers"])
+
+@pytest.mark.asyncio
+async def test_faceted_search(test_admin_user):
+    """Faceted search returns the filtered hotels with the count of each facet value, and validates its buckets."""
+    hotel_data = {"name": "Faceted Hotel", "address": "1 Facet Street, Tromso", "city": "Tromso", "rating": 3.5, "breakfast": True}
+
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        create_response = await ac.post("/", json=hotel_data, headers=test_admin_user["headers"])
+        assert create_response.status_code == 201, f"Expected 201, got {create_response.status_code}, response: {create_response.text}"
+        hotel = create_response.json()
+
+        response = await ac.get("/search/faceted", params={"address": "Facet Street", "city": "Tromso", "rating": ["3-4", "4-5"]})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}, response: {response.text}"
+        result = response.json()
+        assert [found["id"] for found in result["hotels"]] == [hotel["id"]]
+        assert result["total"] == 1
+        assert {"value": "Tromso", "count": 1} in result["facets"]["city"]
+        assert {"value": "3-4", "count": 1} in result["facets"]["rating"]
+        assert {"value": "true", "count": 1} in result["facets"]["breakfast"]
+        assert (await ac.get("/search/faceted", params={"rating": "5-6"})).status_code == 422
+
+        await ac.delete(f"/{hotel['id']}", headers=test_admin_user["headers"])
+
+@pytest.mark.asyncio
+async def test_autocomplete(test_admin_user):
+    """Autocomplete suggests hotels from the first letters of a word of their name or address."""
+    hotel_data = {"name": "Autocomplete Xylophone Hotel", "address": "1 Quokka Street, Hobart", "city": "Hobart"}
+
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        create_response = await ac.post("/", json=hotel_data, headers=test_admin_user["headers"])
+        assert create_response.status_code == 201, f"Expected 201, got {create_response.status_code}, response: {create_response.text}"
+        hotel = create_response.json()
+
+        for query in ("xylo", "Autocomplete xyl", "quokka str"):
+            response = await ac.get("/autocomplete", params={"q": query})
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}, response: {response.text}"
+            assert response.json() == [{"id": hotel["id"], "name": hotel_data["name"], "city": "Hobart"}]
+        assert (await ac.get("/autocomplete", params={"q": ""})).status_code == 422
+
+        await ac.delete(f"/{hotel['id']}", headers=test_admin_user["headers"])
+
+@pytest.mark.asyncio
+async def test_get_hotel_with_rooms(test_room):
+    """A hotel page loads with its rooms and their summary in one request."""
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        response = await ac.get(f"/{test_room['hotel_id']}", params={"include": "rooms,summary"})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}, response: {response.text}"
+        hotel = response.json()
+        assert [room["id"] for room in hotel["rooms"]] == [test_room["id"]]
+        assert hotel["summary"] == {"rooms": 1, "beds": 2, "min_price": "120.50", "max_price": "120.50"}
+
+        plain = (await ac.get(f"/{test_room['hotel_id']}")).json()
+        assert "rooms" not in plain and "summary" not in plain
+        assert plain["id"] == test_room["hotel_id"]
+        assert (await ac.get(f"/{test_room['hotel_id']}", params={"include": "bookings"})).status_code == 422
+
+@pytest.mark.asyncio
+async def test_search_hotels_with_fields(test_hotel):
+    """`fields` narrows the hotels listed to the fields asked for, unknown ones are refused."""
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        response = await ac.get("/search", params={"name": test_hotel["name"], "limit": 1000, "fields": "name,id"})
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}, response: {response.text}"
+        assert {"id": test_hotel["id"], "name": test_hotel["name"]} in response.json()
+        assert all(list(hotel) == ["name", "id"] for hotel in response.json())
+
+        response = await ac.get("/", params={"fields": "name,password"})
+        assert response.status_code == 422, f"Expected 422, got {response.status_code}, response: {response.text}"
+        assert (await ac.get("/", params={"fields": ""})).status_code == 422
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.managers.idempotencyManager import IdempotencyManager, digest
+from app.tests.conftest import fresh
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture
+async def workers():
+    """Two managers outside the singleton sharing the table, as two workers would, and their sessions."""
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    managers = [fresh(IdempotencyManager, response_wait=0.2) for _ in range(2)]
+    sessions = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    scope = f"test {uuid.uuid4().hex}"
+    yield managers, sessions, scope
+
+    async with engine.begin() as connection:
+        for key in ("key-1", "key-2", "key-3", "key-4", "key-5"):
+            await connection.execute(text("DELETE FROM idempotency_keys WHERE key_hash = :hash"), {"hash": digest(scope.encode(), key.encode())})
+    await engine.dispose()
+
+async def run(manager: IdempotencyManager, sessions, key: str, scope: str, request, call, **kwargs):
+    """Run `call(db)` as a request would, in a session of its own."""
+    async with sessions() as db:
+        return await manager.run(db, key, scope, request, lambda: call(db), **kwargs)
+
+def counting(scope: str, calls: list, delay: float = 0):
+    async def call(db):
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"scope": scope, "call": len(calls)}
+    return call
+
+@pytest.mark.asyncio
+async def test_retries_get_the_first_response(workers):
+    (manager, _), sessions, scope = workers
+    calls = []
+
+    first = await run(manager, sessions, "key-1", scope, {"n": 1}, counting(scope, calls), status_code=201)
+    retry = await run(manager, sessions, "key-1", scope, {"n": 1}, counting(scope, calls), status_code=201)
+
+    assert len(calls) == 1
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert first.body == retry.body and retry.headers["Idempotent-Replayed"] == "true"
+
+    with pytest.raises(HTTPException) as error:
+        await run(manager, sessions, "key-1", scope, {"n": 2}, counting(scope, calls))
+    assert error.value.status_code == 422
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_the_first(workers):
+    (manager, other_worker), sessions, scope = workers
+    calls = []
+
+    responses = await asyncio.gather(
+        *(run(manager, sessions, "key-2", scope, {}, counting(scope, calls, delay=0.3)) for _ in range(5)),
+        run(other_worker, sessions, "key-2", scope, {}, counting(scope, calls, delay=0.3)),
+    )
+
+    assert len(calls) == 1
+    assert len({response.body for response in responses}) == 1
+    # The other worker's claim waits for the transaction holding the key
+    assert manager.snapshot()["coalesced"] == 4
+
+@pytest.mark.asyncio
+async def test_failed_requests_release_their_key(workers):
+    (manager, other_worker), sessions, scope = workers
+
+    async def failing(db):
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    with pytest.raises(HTTPException):
+        await run(manager, sessions, "key-3", scope, {}, failing)
+    calls = []
+    response = await run(other_worker, sessions, "key-3", scope, {}, counting(scope, calls))
+    assert len(calls) == 1 and json.loads(response.body)["call"] == 1
+
+@pytest.mark.asyncio
+async def test_stored_responses_expire(workers):
+    (manager, _), sessions, scope = workers
+    manager.ttl = 0.2
+    calls = []
+
+    await run(manager, sessions, "key-4", scope, {}, counting(scope, calls))
+    await asyncio.sleep(0.3)
+    await run(manager, sessions, "key-4", scope, {}, counting(scope, calls))
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_requests_committed_without_their_response_never_run_again(workers, monkeypatch):
+    (manager, other_worker), sessions, scope = workers
+    calls = []
+
+    async def committing(db):
+        # Like the services, which commit their writes themselves
+        calls.append(1)
+        await db.commit()
+        return {"call": len(calls)}
+
+    async def worker_lost(*args):
+        raise ConnectionError("Connection lost")
+
+    monkeypatch.setattr(manager, "complete", worker_lost)
+    with pytest.raises(ConnectionError):
+        await run(manager, sessions, "key-5", scope, {}, committing)
+
+    with pytest.raises(HTTPException) as error:
+        await run(other_worker, sessions, "key-5", scope, {}, committing)
+    assert (error.value.status_code, len(calls)) == (409, 1)
+    assert other_worker.snapshot()["lost"] == 1
+
+@pytest.mark.asyncio
+async def test_create_booking_with_idempotency_key(test_user, test_room):
+    booking_data = {
+        "room_id": test_room["id"],
+        "start_date": str(date.today()),
+        "end_date": str(date.today() + timedelta(days=1)),
+        "nbr_people": 1,
+    }
+    headers = {**test_user["headers"], "Idempotency-Key": uuid.uuid4().hex}
+
+    async with AsyncClient(base_url=BASE_URL) as ac:
+        first, second = await asyncio.gather(
+            ac.post("/bookings/", json=booking_data, headers=headers),
+            ac.post("/bookings/", json=booking_data, headers=headers),
+        )
+        retry = await ac.post("/bookings/", json=booking_data, headers=headers)
+        bookings = (await ac.get("/bookings/", headers=test_user["headers"])).json()
+
+    assert first.status_code == second.status_code == retry.status_code == 201
+    assert first.json() == second.json() == retry.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert [booking["id"] for booking in bookings] == [first.json()["id"]]
+
+@pytest.mark.asyncio
+async def test_create_user_with_idempotency_key():
+    suffix = uuid.uuid4().hex[:8]
+    user_data = {"email": f"idem-{suffix}@example.com", "pseudo": f"idem_{suffix}", "password": "testpassword"}
+    headers = {"Idempotency-Key": suffix}
+
+    async with AsyncClient(base_url=f"{BASE_URL}/users") as ac:
+        first = await ac.post("/", json=user_data, headers=headers)
+        retry = await ac.post("/", json=user_data, headers=headers)
+        # Without the key the duplicate is refused as usual
+        duplicate = await ac.post("/", json=user_data)
+
+        assert first.status_code == retry.status_code == 201
+        assert first.json() == retry.json()
+        assert duplicate.status_code == 400
+
+        login = await ac.post("/login", data={"username": user_data["pseudo"], "password": user_data["password"]})
+        token = login.json()["access_token"]
+        assert (await ac.delete(f"/{first.json()['id']}", headers={"Authorization": f"Bearer {token}"})).status_code == 204
@@ -0,0 +1,145 @@
+import json
+import uuid
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.changeModel import Change
+from app.models.hotelModel import Hotel
+from app.models.roomModel import Room
+from app.schemas.hotelSchemas import HotelCreate
+from app.services import importService
+from app.services.importService import ImportService
+
+BASE_URL = "http://localhost:8000"
+
+async def chunked(body: str, size: int = 7):
+    """The body in small chunks, cutting through lines and multi-byte characters as a network would."""
+    data = body.encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+@pytest.fixture
+async def tag(db_session: AsyncSession):
+    """A tag to name the imported hotels after, they are deleted with their rooms and changes afterwards."""
+    tag = f"import-{uuid.uuid4().hex[:8]}"
+    yield tag
+
+    hotel_ids = list((await db_session.scalars(select(Hotel.id).where(Hotel.name.startswith(tag)))).all())
+    room_ids = list((await db_session.scalars(select(Room.id).where(Room.hotel_id.in_(hotel_ids)))).all())
+    await db_session.execute(delete(Change).where(or_(
+        (Change.entity == "hotel") & Change.entity_id.in_(hotel_ids),
+        (Change.entity == "room") & Change.entity_id.in_(room_ids),
+    )))
+    await db_session.execute(delete(Hotel).where(Hotel.id.in_(hotel_ids)))
+
+async def imported(db: AsyncSession, tag: str) -> dict:
+    """Imported hotel names, each with the bed counts of its rooms."""
+    rows = (await db.execute(
+        select(Hotel.name, Room.number_of_beds).outerjoin(Room, Room.hotel_id == Hotel.id)
+        .where(Hotel.name.startswith(tag)).order_by(Hotel.id, Room.id)
+    )).all()
+    hotels = {}
+    for name, beds in rows:
+        hotels.setdefault(name, [])
+        if beds is not None:
+            hotels[name].append(beds)
+    return hotels
+
+@pytest.mark.asyncio
+async def test_csv_import_reports_rejected_rows(db_session: AsyncSession, tag):
+    body = (
+        "type,name,address,description,rating,breakfast,price,number_of_beds\n"
+        f"hotel,{tag} Étoile,\"1 rue de Rivoli, Paris\",\"Two lines\nof description\",4.5,true,,\n"
+        "room,,,,,,120.50,2\n"
+        "room,,,,,,99,1\n"
+        f"hotel,{tag} Bad,Somewhere,,12,,,\n"
+        "room,,,,,,50,1\n"
+        "suite,,,,,,50,1\n"
+        f"hotel,{tag} Plain,Lyon,,,,,\r\n"
+        "room,,,,,,80,x\n"
+        "room,,,,,,80,3\n"
+    )
+    report = await ImportService.import_hotels(db_session, chunked(body), "text/csv", chunk_size=2)
+
+    assert (report.hotels, report.rooms, report.error_count) == (2, 3, 4)
+    assert [error.line for error in report.errors] == [6, 7, 8, 10]
+    assert report.errors[1].error == "Room without a valid hotel above it"
+    assert await imported(db_session, tag) == {f"{tag} Étoile": [2, 1], f"{tag} Plain": [3]}
+
+    description = await db_session.scalar(select(Hotel.description).where(Hotel.name == f"{tag} Étoile"))
+    assert description == "Two lines\nof description"
+
+@pytest.mark.asyncio
+async def test_ndjson_import_records_changes(db_session: AsyncSession, tag):
+    lines = [
+        {"type": "hotel", "name": f"{tag} Nested", "address": "Nice", "rooms": [
+            {"price": 70, "number_of_beds": 1}, {"price": 90, "number_of_beds": 2},
+        ]},
+        {"type": "room", "price": "110.00", "number_of_beds": 4},
+        "not an object",
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+    report = await ImportService.import_hotels(db_session, chunked(body), "application/x-ndjson", max_errors=1)
+
+    assert (report.hotels, report.rooms, report.error_count, len(report.errors)) == (1, 3, 2, 1)
+    assert await imported(db_session, tag) == {f"{tag} Nested": [1, 2, 4]}
+
+    hotel_id = await db_session.scalar(select(Hotel.id).where(Hotel.name == f"{tag} Nested"))
+    changes = (await db_session.execute(
+        select(Change.entity, Change.operation, Change.data).where(or_(
+            (Change.entity == "hotel") & (Change.entity_id == hotel_id),
+            (Change.entity == "room") & (Change.data["hotel_id"].as_integer() == hotel_id),
+        )).order_by(Change.id)
+    )).all()
+    assert [(entity, operation) for entity, operation, _ in changes] == [("hotel", "create")] + [("room", "create")] * 3
+    assert changes[0].data["name"] == f"{tag} Nested" and changes[3].data["price"] == "110.00"
+
+@pytest.mark.asyncio
+async def test_nul_characters_are_rejected_per_row(db_session: AsyncSession, tag):
+    lines = [
+        {"type": "hotel", "name": f"{tag} Kept", "address": "Paris"},
+        {"type": "hotel", "name": f"{tag} Nul\u0000", "address": "Paris"},
+        {"type": "room", "price": 70, "number_of_beds": 1},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+    report = await ImportService.import_hotels(db_session, chunked(body), "application/x-ndjson")
+
+    assert (report.hotels, report.rooms, report.error_count) == (1, 0, 2)
+    assert "NUL characters are not allowed" in report.errors[0].error
+    assert await imported(db_session, tag) == {f"{tag} Kept": []}
+
+@pytest.mark.asyncio
+async def test_chunk_refused_by_the_database_is_reported(db_session: AsyncSession, tag, monkeypatch):
+    # Without the import schema's checks, a NUL reaches the COPY and Postgres refuses the chunk
+    monkeypatch.setattr(importService, "HotelImport", HotelCreate)
+    lines = [
+        {"type": "hotel", "name": f"{tag} First", "address": "Paris"},
+        {"type": "hotel", "name": f"{tag} Second", "address": "Lyon"},
+        {"type": "hotel", "name": f"{tag} Nul\u0000", "address": "Nice"},
+        {"type": "room", "price": 70, "number_of_beds": 1},
+        {"type": "hotel", "name": f"{tag} Last", "address": "Lille"},
+        {"type": "room", "price": 80, "number_of_beds": 2},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+    report = await ImportService.import_hotels(db_session, chunked(body), "application/x-ndjson", chunk_size=2)
+
+    assert (report.hotels, report.rooms, report.error_count) == (3, 1, 2)
+    assert [error.line for error in report.errors] == [3]
+    assert report.errors[0].error.startswith("Rows from line 3 to 4 not imported")
+    assert await imported(db_session, tag) == {f"{tag} First": [], f"{tag} Second": [], f"{tag} Last": [2]}
+
+@pytest.mark.asyncio
+async def test_import_endpoint_streams_the_upload(test_user, test_admin_user, tag):
+    body = f"type,name,address,price,number_of_beds\nhotel,{tag} Upload,Paris,,\nroom,,,75,2\n"
+    async with AsyncClient(base_url=f"{BASE_URL}/hotels") as ac:
+        forbidden = await ac.post("/import", content=body, headers={**test_user["headers"], "Content-Type": "text/csv"})
+        unsupported = await ac.post("/import", content=body, headers={**test_admin_user["headers"], "Content-Type": "application/json"})
+        bad_header = await ac.post("/import", content="kind,name\n", headers={**test_admin_user["headers"], "Content-Type": "text/csv"})
+        response = await ac.post(
+            "/import", content=chunked(body), headers={**test_admin_user["headers"], "Content-Type": "text/csv; charset=utf-8"},
+        )
+
+    assert (forbidden.status_code, unsupported.status_code, bad_header.status_code) == (403, 415, 400)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"hotels": 1, "rooms": 1, "error_count": 0, "errors": []}
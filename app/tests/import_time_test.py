@@ -0,0 +1,16 @@
+import os
+from benchmarks.import_time import LAZY_MODULES, import_times
+
+# Cold import budget of `app.main`, best of three fresh interpreters; raise it on slow CI machines
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+def test_lazy_clients_are_not_imported_with_the_app():
+    """boto3, the passlib context and uvicorn are only loaded on first use."""
+    imported = import_times()
+
+    assert [module for module in LAZY_MODULES if module in imported] == []
+
+def test_app_import_time_within_budget():
+    best_ms = min(import_times()["app.main"][1] for _ in range(3)) / 1000
+
+    assert best_ms <= IMPORT_TIME_BUDGET_MS, f"import app.main took {best_ms:.0f} ms, budget is {IMPORT_TIME_BUDGET_MS:.0f} ms"
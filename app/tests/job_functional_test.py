@@ -0,0 +1,164 @@
+import asyncio
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.managers.jobManager import JOB_DONE, JOB_FAILED, JOB_PENDING, JobManager
+from app.models.jobModel import Job
+from app.schemas.bookingSchemas import BookingCreate
+from app.schemas.userSchemas import UserResponse
+from app.services.bookingService import BookingService
+from app.services.jobService import JobService
+from app.tests.conftest import fresh
+
+@pytest.fixture
+async def jobs():
+    """A job manager outside the singleton, for a job kind of its own."""
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    manager = fresh(JobManager, workers=1, poll_interval=0.05, backoff_base=0.01, backoff_max=0.01, lease_seconds=5, engine=engine)
+    kind = f"test.{uuid.uuid4().hex[:8]}"
+    yield manager, kind
+
+    await manager.stop()
+    async with engine.begin() as connection:
+        await connection.execute(text("DELETE FROM jobs WHERE kind = :kind"), {"kind": kind})
+    await engine.dispose()
+
+async def job_rows(db: AsyncSession, kind: str):
+    result = await db.execute(select(Job).filter(Job.kind == kind).order_by(Job.id).execution_options(populate_existing=True))
+    return result.scalars().all()
+
+@pytest.mark.asyncio
+async def test_jobs_exist_only_once_their_transaction_commits(db_session: AsyncSession, jobs):
+    _, kind = jobs
+
+    await JobService.enqueue(db_session, kind, {"n": 1})
+    await db_session.rollback()
+    assert await job_rows(db_session, kind) == []
+
+    await JobService.enqueue(db_session, kind, {"n": 2})
+    await db_session.commit()
+    assert [job.payload for job in await job_rows(db_session, kind)] == [{"n": 2}]
+
+@pytest.mark.asyncio
+async def test_idempotency_key_enqueues_once(db_session: AsyncSession, jobs):
+    _, kind = jobs
+    key = f"{kind}:42"
+
+    first = await JobService.enqueue(db_session, kind, {"n": 1}, idempotency_key=key)
+    second = await JobService.enqueue(db_session, kind, {"n": 2}, idempotency_key=key)
+    await db_session.commit()
+
+    assert first is not None and second is None
+    assert [job.payload for job in await job_rows(db_session, kind)] == [{"n": 1}]
+
+@pytest.mark.asyncio
+async def test_failed_jobs_are_retried_with_backoff_then_given_up(db_session: AsyncSession, jobs):
+    manager, kind = jobs
+    calls = []
+
+    @manager.register(kind)
+    async def flaky(payload):
+        calls.append(payload["n"])
+        if payload["n"] == 0 or len(calls) < 3:
+            raise RuntimeError("downstream unavailable")
+
+    await JobService.enqueue(db_session, kind, {"n": 1}, max_attempts=5)
+    await db_session.commit()
+
+    for _ in range(3):
+        await manager.run_pending()
+        await asyncio.sleep(0.02)
+    job, = await job_rows(db_session, kind)
+    assert (job.status, job.attempts, job.last_error) == (JOB_DONE, 3, "RuntimeError: downstream unavailable")
+
+    await JobService.enqueue(db_session, kind, {"n": 0}, max_attempts=2)
+    await db_session.commit()
+    for _ in range(3):
+        await manager.run_pending()
+        await asyncio.sleep(0.02)
+    _, hopeless = await job_rows(db_session, kind)
+    assert (hopeless.status, hopeless.attempts) == (JOB_FAILED, 2)
+    assert manager.snapshot()["failed"] == 1
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_claimed_again(db_session: AsyncSession, jobs):
+    manager, kind = jobs
+    ran = []
+
+    @manager.register(kind)
+    async def record(payload):
+        ran.append(payload)
+
+    # A worker claimed it and died: still running, lease already expired
+    db_session.add(Job(kind=kind, payload={"n": 1}, status="running", attempts=1, max_attempts=5))
+    await db_session.commit()
+
+    assert await manager.run_pending() == 1
+    job, = await job_rows(db_session, kind)
+    assert (job.status, job.attempts, ran) == (JOB_DONE, 2, [{"n": 1}])
+
+@pytest.mark.asyncio
+async def test_expired_leases_of_last_attempts_fail(db_session: AsyncSession, jobs):
+    manager, kind = jobs
+    ran = []
+
+    @manager.register(kind)
+    async def record(payload):
+        ran.append(payload)
+
+    # Its last attempt outlived the lease: whether it took effect is unknown
+    db_session.add(Job(kind=kind, payload={"n": 1}, status="running", attempts=3, max_attempts=3))
+    await db_session.commit()
+
+    assert await manager.run_pending() == 0
+    job, = await job_rows(db_session, kind)
+    assert (job.status, job.attempts, ran) == (JOB_FAILED, 3, [])
+    assert job.last_error == "Lease expired on the last attempt" and job.finished_at is not None
+    assert manager.snapshot()["failed"] == 1
+
+@pytest.mark.asyncio
+async def test_handlers_time_out_within_their_lease(db_session: AsyncSession, jobs):
+    manager, kind = jobs
+    manager.lease_seconds, manager.handler_timeout = 1, 0.2
+
+    @manager.register(kind)
+    async def stuck(payload):
+        await asyncio.sleep(5)
+
+    await JobService.enqueue(db_session, kind, {"n": 1}, max_attempts=1)
+    await db_session.commit()
+
+    assert await manager.run_pending() == 1
+    job, = await job_rows(db_session, kind)
+    assert (job.status, job.last_error) == (JOB_FAILED, "TimeoutError: ")
+
+@pytest.mark.asyncio
+async def test_workers_run_jobs_after_the_commit(db_session: AsyncSession, jobs):
+    manager, kind = jobs
+    done = asyncio.Event()
+
+    @manager.register(kind)
+    async def signal(payload):
+        done.set()
+
+    manager.start()
+    await JobService.enqueue(db_session, kind, {})
+    await db_session.commit()
+    await asyncio.wait_for(done.wait(), timeout=2)
+
+@pytest.mark.asyncio
+async def test_create_booking_enqueues_its_confirmation(db_session: AsyncSession, test_user, test_room):
+    booking_data = BookingCreate(
+        room_id=test_room["id"], start_date=date.today(), end_date=date.today() + timedelta(days=1), nbr_people=1,
+    )
+    user = UserResponse(id=test_user["id"], email=test_user["email"], pseudo=test_user["pseudo"])
+    booking = await BookingService.create_booking(db_session, booking_data, user)
+
+    result = await db_session.execute(select(Job).filter(Job.idempotency_key == f"booking.confirmation:{booking.id}"))
+    job = result.scalars().one()
+    assert (job.kind, job.payload) == ("booking.confirmation", {"booking_id": booking.id})
+    assert job.status in (JOB_PENDING, "running", JOB_DONE)
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.managers.databaseManager import DB_POOL_SIZE, DatabaseManager
+from app import http2Server
+from app.server import AppWorker, worker_count
+
+def test_lifespan_warms_and_closes_the_pool():
+    """The pool is filled before the first request and emptied on shutdown."""
+    db_manager = DatabaseManager()
+
+    with TestClient(app) as client:
+        assert db_manager.engine.pool.checkedin() == DB_POOL_SIZE
+        assert client.get("/").status_code == 200
+
+    assert db_manager.engine.pool.checkedin() == 0
+
+def test_worker_count_follows_web_concurrency(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert worker_count() == 3
+
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    assert worker_count() >= 1
+
+def test_workers_run_on_uvloop_and_httptools():
+    assert AppWorker.CONFIG_KWARGS["loop"] == "uvloop"
+    assert AppWorker.CONFIG_KWARGS["http"] == "httptools"
+
+def test_connections_are_kept_alive_past_the_load_balancer_timeout():
+    assert AppWorker.CONFIG_KWARGS["limit_concurrency"] > 1000
+    assert http2Server.keep_alive_timeout > 60
+    assert http2Server.keep_alive_max_requests > 1000
+    assert http2Server.h2_max_concurrent_streams == 100
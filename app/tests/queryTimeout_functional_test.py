@@ -0,0 +1,103 @@
+import asyncio
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.managers.databaseManager import DatabaseManager, get_db, get_read_db
+from app.managers.queryTimeoutManager import SEARCH_STATEMENT_TIMEOUT, QueryTimeoutManager
+from app.middlewares.disconnectMiddleware import DisconnectMiddleware
+from app.tests.conftest import fresh
+
+def make_manager() -> QueryTimeoutManager:
+    """A manager without route timeouts, cancelling on disconnect."""
+    return fresh(QueryTimeoutManager, default_timeout=30000, route_timeouts={}, cancel_on_disconnect=True)
+
+def make_app(manager: QueryTimeoutManager) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DisconnectMiddleware, manager=manager)
+
+    @app.get("/sleep")
+    async def sleep(seconds: float, db: AsyncSession = Depends(get_read_db)):
+        await db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": seconds})
+        return {"slept": seconds}
+
+    @app.post("/sleep")
+    async def sleep_and_write(seconds: float, db: AsyncSession = Depends(get_db)):
+        await db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": seconds})
+        return {"slept": seconds}
+
+    return app
+
+@pytest.fixture
+async def timeouts(monkeypatch):
+    """The route /sleep runs under a 200 ms statement timeout."""
+    manager = QueryTimeoutManager()
+    monkeypatch.setitem(manager.route_timeouts, "/sleep", 200)
+    monkeypatch.setattr(manager, "routes", {})
+    yield manager
+    await DatabaseManager().engine.dispose()
+
+def test_routes_without_their_own_timeout_keep_the_default():
+    manager = fresh(QueryTimeoutManager, default_timeout=30000, route_timeouts={"/hotels/search": 3000, "/users/": 30000})
+
+    assert manager.timeout_for("/hotels/search") == 3000
+    assert manager.timeout_for("/users/") is None
+    assert manager.timeout_for("/bookings/") is None
+
+    # Every search taking a user's text runs under the search timeout
+    manager = fresh(QueryTimeoutManager, default_timeout=30000)
+    for path in ("/hotels/search", "/hotels/search/faceted", "/hotels/autocomplete", "/hotels/nearby"):
+        assert manager.timeout_for(path) == SEARCH_STATEMENT_TIMEOUT
+
+@pytest.mark.asyncio
+async def test_statement_out_of_time_is_a_gateway_timeout(timeouts):
+    async with AsyncClient(transport=ASGITransport(app=make_app(make_manager())), base_url="http://test") as client:
+        fast = await client.get("/sleep", params={"seconds": 0.05})
+        slow = await client.get("/sleep", params={"seconds": 2})
+        slow_write = await client.post("/sleep", params={"seconds": 2})
+        # The connection went back to the pool reset to the default timeout
+        fast_again = await client.get("/sleep", params={"seconds": 0.05})
+
+    assert fast.status_code == 200 and fast_again.status_code == 200
+    assert slow.status_code == 504, f"Expected 504, got {slow.status_code}, response: {slow.text}"
+    assert slow_write.status_code == 504
+    assert timeouts.snapshot()["routes"]["/sleep"] == {"timeout_ms": 200, "timeouts": 2, "cancelled": 0}
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_the_query(db_session: AsyncSession):
+    manager = make_manager()
+    app = make_app(manager)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/sleep", "raw_path": b"/sleep", "query_string": b"seconds=30", "root_path": "",
+        "headers": [], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    received = []
+
+    async def receive():
+        if not received:
+            received.append("request")
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client gives up while the query runs
+        await asyncio.sleep(0.5)
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+
+    assert time.perf_counter() - started < 5
+    assert sent == []
+    assert manager.snapshot()["routes"]["/sleep"]["cancelled"] == 1
+
+    running = await db_session.execute(text(
+        "SELECT count(*) FROM pg_stat_activity WHERE state = 'active' AND query LIKE 'SELECT pg_sleep%'"
+    ))
+    assert running.scalar() == 0
+    await DatabaseManager().engine.dispose()
@@ -0,0 +1,142 @@
+import os
+import uuid
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.managers.databaseManager import DatabaseManager
+from app.managers.rateLimitManager import InMemoryRateLimitBackend, PostgresRateLimitBackend, RateLimitManager
+from app.tests.conftest import fresh
+from app.utils.singleton import Singleton
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def make_limiter(backend, clock):
+    """A limiter outside the singleton, with small limits."""
+    limiter = fresh(RateLimitManager, backend=backend, clock=clock, enabled=True)
+    limiter.ip_burst, limiter.ip_interval = 3, 10.0
+    limiter.user_burst, limiter.user_interval = 5, 10.0
+    limiter.lockout_threshold, limiter.lockout_base, limiter.lockout_max = 3, 30.0, 100.0
+    return limiter
+
+@pytest.fixture(params=["memory", "postgres"])
+async def backend(request):
+    if request.param == "memory":
+        yield InMemoryRateLimitBackend()
+        return
+
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    yield PostgresRateLimitBackend(engine)
+    async with engine.begin() as connection:
+        await connection.execute(text("DELETE FROM rate_limits WHERE key LIKE '%' || :suffix || '%'"), {"suffix": "rl-test"})
+    await engine.dispose()
+
+@pytest.fixture
+def names():
+    """Unique address and username per test, so Postgres rows never collide."""
+    suffix = f"rl-test-{uuid.uuid4().hex[:8]}"
+    return f"10.0.0.1-{suffix}", f"alice-{suffix}"
+
+@pytest.mark.asyncio
+async def test_address_bucket_throttles_then_refills(backend, names):
+    clock = Clock()
+    limiter = make_limiter(backend, clock)
+    ip, username = names
+
+    for i in range(3):
+        assert await limiter.check_login(ip, f"{username}-{i}") == 0
+    assert await limiter.check_login(ip, f"{username}-3") == pytest.approx(10.0)
+
+    clock.now += 10
+    assert await limiter.check_login(ip, f"{username}-3") == 0
+
+@pytest.mark.asyncio
+async def test_successful_logins_are_never_throttled(backend, names):
+    limiter = make_limiter(backend, Clock())
+    ip, username = names
+
+    for _ in range(20):
+        assert await limiter.check_login(ip, username) == 0
+        await limiter.login_succeeded(ip, username)
+
+@pytest.mark.asyncio
+async def test_username_bucket_spans_addresses(backend, names):
+    limiter = make_limiter(backend, Clock())
+    ip, username = names
+
+    for i in range(5):
+        assert await limiter.check_login(f"{ip}-{i}", username) == 0
+    assert await limiter.check_login(f"{ip}-5", username) > 0
+
+@pytest.mark.asyncio
+async def test_lockout_doubles_and_stays_on_the_pair(backend, names):
+    clock = Clock()
+    limiter = make_limiter(backend, clock)
+    limiter.user_burst = 100
+    ip, username = names
+
+    assert [await limiter.login_failed(ip, username) for _ in range(3)] == [0, 0, 30.0]
+    assert await limiter.check_login(ip, username) == pytest.approx(30.0)
+    assert await limiter.check_login(f"{ip}-other", username) == 0
+
+    clock.now += 30
+    assert await limiter.login_failed(ip, username) == 60.0
+    clock.now += 60
+    assert await limiter.login_failed(ip, username) == 100.0
+
+    await limiter.login_succeeded(ip, username)
+    assert await limiter.check_login(ip, username) == 0
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_is_bounded():
+    backend = InMemoryRateLimitBackend(max_keys=10)
+    limiter = make_limiter(backend, Clock())
+
+    for i in range(100):
+        await limiter.check_login(f"10.0.0.{i}", f"user{i}")
+        await limiter.login_failed(f"10.0.0.{i}", f"user{i}")
+
+    assert len(backend._tats) <= 10 and len(backend._failures) <= 10
+
+@pytest.fixture
+async def login_client(monkeypatch):
+    """In-process client on the real app with a fresh in-memory limiter, counting bcrypt verifications."""
+    from app.main import app
+    from app.controllers import userController
+
+    verifications = []
+    monkeypatch.setattr(userController, "verify_password", lambda plain, hashed: verifications.append(plain) or False)
+
+    previous = Singleton._instances.pop(RateLimitManager, None)
+    limiter = make_limiter(InMemoryRateLimitBackend(), Clock())
+    Singleton._instances[RateLimitManager] = limiter
+
+    transport = ASGITransport(app=app, client=("203.0.113.7", 4242))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client, verifications
+
+    Singleton._instances.pop(RateLimitManager, None)
+    if previous is not None:
+        Singleton._instances[RateLimitManager] = previous
+    await DatabaseManager().engine.dispose()
+
+@pytest.mark.asyncio
+async def test_login_returns_429_before_verifying_password(login_client):
+    client, verifications = login_client
+
+    statuses = [
+        (await client.post("/users/login", data={"username": "admin", "password": "wrong"})).status_code
+        for _ in range(3)
+    ]
+    throttled = await client.post("/users/login", data={"username": "admin", "password": "wrong"})
+
+    assert statuses == [401, 401, 401]
+    assert throttled.status_code == 429
+    assert throttled.headers["Retry-After"] == "30"
+    assert len(verifications) == 3
@@ -0,0 +1,71 @@
+import pytest
+from typing import List
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from app.schemas.userSchemas import UserResponse
+from app.utils.responses import SchemaJSONResponse, SchemaRoute
+
+class PrivateUserResponse(UserResponse):
+    password: str
+
+router = APIRouter(route_class=SchemaRoute)
+
+@router.get("/user", response_model=UserResponse)
+async def get_user():
+    # Built without validation: the default pipeline would reject the id, SchemaRoute serializes it as is
+    return UserResponse.model_construct(id="not-validated", email="john@example.com", pseudo="john", is_admin=False)
+
+@router.post("/users", response_model=List[UserResponse], status_code=201)
+async def create_users():
+    return [UserResponse(id=1, email="john@example.com", pseudo="john"), UserResponse(id=2, email="jane@example.com", pseudo="jane")]
+
+@router.get("/private", response_model=UserResponse)
+async def get_private_user():
+    return PrivateUserResponse(id=1, email="john@example.com", pseudo="john", password="secret")
+
+app = FastAPI(default_response_class=SchemaJSONResponse)
+app.include_router(router)
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+@pytest.mark.asyncio
+async def test_exact_schema_skips_response_validation(client):
+    """An instance of the declared schema is serialized directly, without validating it again."""
+    response = await client.get("/user")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["id"] == "not-validated"
+
+@pytest.mark.asyncio
+async def test_schema_list_keeps_route_status_code(client):
+    """Lists of the declared schema are serialized directly and keep the route's status code."""
+    response = await client.post("/users")
+
+    assert response.status_code == 201
+    assert [user["pseudo"] for user in response.json()] == ["john", "jane"]
+
+@pytest.mark.asyncio
+async def test_subclass_is_still_filtered_by_response_model(client):
+    """A subclass carrying extra fields goes through response_model filtering and never leaks them."""
+    response = await client.get("/private")
+
+    assert response.status_code == 200
+    assert "password" not in response.json()
+
+@pytest.mark.asyncio
+async def test_decimal_and_dates_match_default_serialization():
+    """pydantic-core renders decimals and dates exactly like FastAPI's default encoder."""
+    from datetime import date
+    from decimal import Decimal
+    from fastapi.encoders import jsonable_encoder
+    from app.schemas.bookingSchemas import BookingResponse
+    from app.schemas.roomSchemas import RoomResponse
+
+    booking = BookingResponse(id=1, user_id=1, room_id=1, start_date=date(2025, 1, 1), end_date=date(2025, 1, 3), nbr_people=2, breakfast=True)
+    room = RoomResponse(id=1, hotel_id=1, price=Decimal("120.50"), number_of_beds=2)
+
+    assert SchemaJSONResponse([booking, room]).body == SchemaJSONResponse(jsonable_encoder([booking, room])).body
@@ -1,3 +1,4 @@
+import json
 import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -66,6 +67,27 @@ async def test_get_rooms_by_hotel(db_session: AsyncSession, test_room):
     assert len(rooms) > 0
     assert any(room.id == test_room.id for room in rooms)
 
+@pytest.mark.asyncio
+async def test_get_rooms_by_hotel_json_matches_schema(db_session: AsyncSession, test_room):
+    """The pre-serialized room list is identical to serializing the response schemas."""
+    rooms = await RoomService.get_rooms_by_hotel(db_session, test_room.hotel_id)
+    rooms_json = await RoomService.get_rooms_by_hotel_json(db_session, test_room.hotel_id)
+
+    assert json.loads(rooms_json) == [room.model_dump(mode="json") for room in rooms]
+    assert json.loads(await RoomService.get_rooms_by_hotel_json(db_session, -1)) == []
+
+@pytest.mark.asyncio
+async def test_get_rooms_by_hotel_pages(db_session: AsyncSession, test_room):
+    """Rooms of a hotel come a page at a time, in id order."""
+    second = await RoomService.create_room(db_session, RoomCreate(hotel_id=test_room.hotel_id, price=80, number_of_beds=1))
+
+    first_page = await RoomService.get_rooms_by_hotel(db_session, test_room.hotel_id, limit=1)
+    second_page = await RoomService.get_rooms_by_hotel_json(db_session, test_room.hotel_id, limit=1, offset=1)
+    await RoomService.delete_room(db_session, second.id)
+
+    assert [room.id for room in first_page] == [test_room.id]
+    assert [room["id"] for room in json.loads(second_page)] == [second.id]
+
 @pytest.mark.asyncio
 async def test_update_room(db_session: AsyncSession, test_room):
     """Test updating a room."""
@@ -0,0 +1,47 @@
+import json
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.bookingModel import Booking
+from app.models.roomModel import Room
+
+def plan_nodes(plan: dict):
+    """Walk every node of an EXPLAIN (FORMAT JSON) plan."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+async def explain(db: AsyncSession, statement) -> list:
+    """
+    Plan a statement with sequential scans discouraged.
+
+    `enable_seqscan = off` only penalises sequential scans, so the planner still
+    falls back to one when no index can serve the filter, which is what we detect.
+    """
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    await db.execute(text("SET LOCAL enable_seqscan = off"))
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    nodes = list(plan_nodes(plan[0]["Plan"]))
+    await db.rollback()
+    return nodes
+
+def sequential_scans(nodes: list, table: str) -> list:
+    return [node for node in nodes if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == table]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("statement, table", [
+    (select(Booking).filter(Booking.user_id == 1), "bookings"),
+    (select(Booking).filter(Booking.user_id == 1).order_by(Booking.start_date), "bookings"),
+    (select(Booking).filter(Booking.room_id == 1), "bookings"),
+    (delete(Booking).where(Booking.room_id == 1), "bookings"),
+    (select(Room).filter(Room.hotel_id == 1), "rooms"),
+    (delete(Room).where(Room.hotel_id == 1), "rooms"),
+])
+async def test_hot_queries_use_an_index(db_session: AsyncSession, statement, table):
+    """Hot foreign-key filters must be served by an index, never by a sequential scan."""
+    nodes = await explain(db_session, statement)
+    assert not sequential_scans(nodes, table), f"Sequential scan on {table}: {json.dumps(nodes, indent=2)}"
@@ -0,0 +1,118 @@
+import os
+import asyncpg
+import pytest
+from app.utils.seeder import (
+    SeedConfig,
+    generate_bookings,
+    generate_hotels,
+    generate_rooms,
+    seed_database,
+    to_asyncpg_dsn,
+)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+SMALL_CONFIG = SeedConfig(users=20, hotels=5, rooms_per_hotel=3, bookings_per_room=4, admin_ratio=0.2, seed=7)
+
+def test_generation_is_deterministic():
+    """The same seed always produces the same rows."""
+    assert list(generate_hotels(SMALL_CONFIG, 1)) == list(generate_hotels(SMALL_CONFIG, 1))
+    assert list(generate_bookings(SMALL_CONFIG, 1, 1, 1)) == list(generate_bookings(SMALL_CONFIG, 1, 1, 1))
+
+def test_generated_bookings_never_overlap():
+    """Bookings of the same room are disjoint and reference generated users and rooms."""
+    bookings = list(generate_bookings(SMALL_CONFIG, 100, 200, 1))
+    room_ids = {room[0] for room in generate_rooms(SMALL_CONFIG, 1, 200)}
+
+    assert len(bookings) == SMALL_CONFIG.hotels * SMALL_CONFIG.rooms_per_hotel * SMALL_CONFIG.bookings_per_room
+
+    last_end_by_room = {}
+    for _, user_id, room_id, start_date, end_date, _, _ in bookings:
+        assert 100 <= user_id < 100 + SMALL_CONFIG.users
+        assert room_id in room_ids
+        assert start_date < end_date
+        if room_id in last_end_by_room:
+            assert start_date >= last_end_by_room[room_id]
+        last_end_by_room[room_id] = end_date
+
+@pytest.mark.asyncio
+async def test_seed_database_loads_rows_and_resets_sequences():
+    """Seeding appends rows after existing ids and moves the sequences past them."""
+    report = await seed_database(SMALL_CONFIG, TEST_DATABASE_URL)
+
+    connection = await asyncpg.connect(to_asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        assert report.rows["users"] == SMALL_CONFIG.users
+        assert report.rows["hotels"] == SMALL_CONFIG.hotels
+        assert report.rows["rooms"] == SMALL_CONFIG.hotels * SMALL_CONFIG.rooms_per_hotel
+
+        for table in ("users", "hotels", "rooms", "bookings"):
+            _, last_id = report.id_ranges[table]
+            next_id = await connection.fetchval(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))")
+            assert next_id > last_id
+
+        overlapping = await connection.fetchval(
+            """
+            SELECT COUNT(*) FROM bookings a JOIN bookings b
+              ON a.room_id = b.room_id AND a.id < b.id
+             AND a.start_date < b.end_date AND b.start_date < a.end_date
+             WHERE a.id BETWEEN $1 AND $2
+            """,
+            *report.id_ranges["bookings"],
+        )
+        assert overlapping == 0
+    finally:
+        await connection.execute("DELETE FROM hotels WHERE id BETWEEN $1 AND $2", *report.id_ranges["hotels"])
+        await connection.execute("DELETE FROM users WHERE id BETWEEN $1 AND $2", *report.id_ranges["users"])
+        await connection.close()
+
+@pytest.mark.asyncio
+async def test_seeding_after_deletes_never_reuses_ids():
+    """Ids of rows deleted since they were issued are not handed out again."""
+    first = await seed_database(SMALL_CONFIG, TEST_DATABASE_URL)
+
+    connection = await asyncpg.connect(to_asyncpg_dsn(TEST_DATABASE_URL))
+    try:
+        issued = {}
+        for table in ("users", "hotels", "rooms", "bookings"):
+            issued[table] = await connection.fetchval(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))")
+        # The highest rows go, as the benchmarks' teardown removes them
+        await connection.execute("DELETE FROM hotels WHERE id BETWEEN $1 AND $2", *first.id_ranges["hotels"])
+        await connection.execute("DELETE FROM users WHERE id BETWEEN $1 AND $2", *first.id_ranges["users"])
+
+        second = await seed_database(SMALL_CONFIG, TEST_DATABASE_URL)
+        try:
+            for table in ("users", "hotels", "rooms", "bookings"):
+                first_id, _ = second.id_ranges[table]
+                assert first_id > issued[table]
+                next_id = await connection.fetchval(f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))")
+                assert next_id > second.id_ranges[table][1]
+        finally:
+            await connection.execute("DELETE FROM hotels WHERE id BETWEEN $1 AND $2", *second.id_ranges["hotels"])
+            await connection.execute("DELETE FROM users WHERE id BETWEEN $1 AND $2", *second.id_ranges["users"])
+    finally:
+        await connection.close()
+
+@pytest.mark.asyncio
+async def test_inserts_during_a_seed_draw_ids_past_the_copied_rows(monkeypatch):
+    """A hotel created while the seeder copies its rows gets an id of its own."""
+    other = await asyncpg.connect(to_asyncpg_dsn(TEST_DATABASE_URL))
+    inserted = []
+    copy_records_to_table = asyncpg.Connection.copy_records_to_table
+
+    async def copy_with_an_insert(connection, table, **kwargs):
+        if table == "hotels":
+            inserted.append(await other.fetchval("INSERT INTO hotels (name, address) VALUES ('Walk-in', 'Street') RETURNING id"))
+        return await copy_records_to_table(connection, table, **kwargs)
+
+    monkeypatch.setattr(asyncpg.Connection, "copy_records_to_table", copy_with_an_insert)
+    try:
+        report = await seed_database(SMALL_CONFIG, TEST_DATABASE_URL)
+        first_id, last_id = report.id_ranges["hotels"]
+        assert report.rows["hotels"] == SMALL_CONFIG.hotels
+        assert inserted[0] > last_id
+
+        await other.execute("DELETE FROM hotels WHERE id BETWEEN $1 AND $2 OR id = $3", first_id, last_id, inserted[0])
+        await other.execute("DELETE FROM users WHERE id BETWEEN $1 AND $2", *report.id_ranges["users"])
+    finally:
+        await other.close()
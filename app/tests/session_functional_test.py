@@ -0,0 +1,135 @@
+import os
+import time
+import uuid
+import jwt
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.managers.databaseManager import DatabaseManager
+from app.managers.sessionManager import SessionManager, SessionRecord
+from app.tests.conftest import fresh
+from app.utils.singleton import Singleton
+
+@pytest.fixture
+async def client():
+    """In-process client with a fresh session manager and a user of its own."""
+    previous = Singleton._instances.pop(SessionManager, None)
+    from app.main import app
+
+    suffix = uuid.uuid4().hex[:8]
+    user = {"email": f"session-{suffix}@example.com", "pseudo": f"session_{suffix}", "password": "testpassword"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/users/", json=user)
+        assert response.status_code == 201, response.text
+        user["id"] = response.json()["id"]
+        yield client, user
+
+    async with DatabaseManager().engine.begin() as connection:
+        await connection.execute(text("DELETE FROM sessions WHERE user_id = :id"), {"id": user["id"]})
+        await connection.execute(text("DELETE FROM users WHERE id = :id"), {"id": user["id"]})
+    Singleton._instances.pop(SessionManager, None)
+    if previous is not None:
+        Singleton._instances[SessionManager] = previous
+    await DatabaseManager().engine.dispose()
+
+async def login(client: AsyncClient, user: dict) -> dict:
+    response = await client.post("/users/login", data={"username": user["pseudo"], "password": user["password"]})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+@pytest.mark.asyncio
+async def test_login_issues_short_access_token_and_refresh_token(client):
+    client, user = client
+    tokens = await login(client, user)
+
+    claims = jwt.decode(tokens["access_token"], options={"verify_signature": False})
+    assert tokens["token_type"] == "bearer"
+    assert tokens["expires_in"] == 900
+    assert claims["exp"] - time.time() == pytest.approx(900, abs=5)
+    assert (claims["sub"], claims["uid"]) == (user["pseudo"], user["id"])
+    assert tokens["refresh_token"].startswith(f"{claims['sid']}.")
+
+    me = await client.get("/users/me", headers=bearer(tokens))
+    assert me.status_code == 200
+    assert me.json()["pseudo"] == user["pseudo"]
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_and_reuse_revokes_the_session(client):
+    client, user = client
+    first = await login(client, user)
+
+    second = (await client.post("/users/refresh", json={"refresh_token": first["refresh_token"]})).json()
+    assert second["refresh_token"] != first["refresh_token"]
+    assert (await client.get("/users/me", headers=bearer(second))).status_code == 200
+
+    # The replaced token shows up again: someone else holds it, the whole session goes
+    replayed = await client.post("/users/refresh", json={"refresh_token": first["refresh_token"]})
+    assert replayed.status_code == 401
+    assert (await client.post("/users/refresh", json={"refresh_token": second["refresh_token"]})).status_code == 401
+    assert (await client.get("/users/me", headers=bearer(second))).status_code == 401
+
+    # Other sessions of the user are untouched
+    third = await login(client, user)
+    assert (await client.get("/users/me", headers=bearer(third))).status_code == 200
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_tokens(client):
+    client, user = client
+    tokens = await login(client, user)
+
+    assert (await client.post("/users/logout", headers=bearer(tokens))).status_code == 204
+    assert (await client.get("/users/me", headers=bearer(tokens))).status_code == 401
+    assert (await client.post("/users/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_reloads_claims_after_a_profile_update(client):
+    client, user = client
+    tokens = await login(client, user)
+
+    new_pseudo = f"{user['pseudo']}_renamed"
+    response = await client.patch(f"/users/{user['id']}", json={"pseudo": new_pseudo}, headers=bearer(tokens))
+    assert response.status_code == 200
+    user["pseudo"] = new_pseudo
+
+    refreshed = (await client.post("/users/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+    assert (await client.get("/users/me", headers=bearer(refreshed))).json()["pseudo"] == new_pseudo
+
+@pytest.mark.asyncio
+async def test_revocations_reach_other_workers(client):
+    client, user = client
+    tokens = await login(client, user)
+    session_id = jwt.decode(tokens["access_token"], options={"verify_signature": False})["sid"]
+
+    engine = create_async_engine(os.getenv("TEST_DATABASE_URL"), poolclass=NullPool)
+    other_worker = fresh(SessionManager, engine=engine)
+    await other_worker.sync()
+    assert not other_worker.is_revoked(session_id)
+
+    await client.post("/users/logout", headers=bearer(tokens))
+    await other_worker.sync()
+    assert other_worker.is_revoked(session_id)
+    await engine.dispose()
+
+def test_session_cache_is_bounded_and_revocations_expire():
+    now = [1_000.0]
+    manager = fresh(SessionManager, max_sessions=2, access_ttl=60, clock=lambda: now[0])
+
+    for session_id in ("a", "b", "c"):
+        manager.remember(session_id, SessionRecord(user_id=1, claims={}, expires_at=2_000.0))
+    assert list(manager.sessions) == ["b", "c"]
+
+    manager.revoke("b")
+    assert manager.is_revoked("b") and manager.lookup("b") is None
+
+    now[0] += 61
+    manager.prune()
+    assert not manager.is_revoked("b")
+    assert manager.revoked == {}
+
+    now[0] = 2_000.0
+    assert manager.lookup("c") is None
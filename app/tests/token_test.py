@@ -0,0 +1,87 @@
+import base64
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from app.managers.tokenManager import TokenManager
+from app.tests.conftest import fresh
+
+SECRET = "a-test-secret-long-enough-for-hs256"
+
+def make_manager(**kwargs) -> TokenManager:
+    """A manager outside the singleton, with explicit keys."""
+    kwargs.setdefault("algorithm", "HS256")
+    kwargs.setdefault("signing_key", SECRET)
+    kwargs.setdefault("retired_keys", [])
+    return fresh(TokenManager, **kwargs)
+
+def private_pem(key) -> bytes:
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+def test_verified_tokens_are_cached_until_they_expire(monkeypatch):
+    now = [time.time()]
+    manager = make_manager(clock=lambda: now[0])
+    token = manager.encode({"sub": "alice", "exp": int(now[0]) + 60})
+
+    verifications = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: verifications.append(args) or decode(*args, **kwargs))
+
+    assert manager.decode(token)["sub"] == "alice"
+    assert manager.decode(token)["sub"] == "alice"
+    assert len(verifications) == 1
+    assert manager.snapshot()["hits"] == 1 and manager.snapshot()["misses"] == 1
+
+    # Past its exp the cached entry is dropped and the token verified again
+    now[0] += 61
+    manager.decode(token)
+    assert len(verifications) == 2
+
+def test_cache_is_bounded_and_only_holds_valid_tokens():
+    manager = make_manager(cache_size=2)
+    tokens = [manager.encode({"sub": str(i), "exp": 4_000_000_000}) for i in range(3)]
+    for token in tokens:
+        manager.decode(token)
+    assert manager.snapshot()["cached"] == 2
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        manager.decode(tokens[0][:-2] + "AA")
+    assert manager.snapshot()["cached"] == 2
+
+def test_retired_keys_keep_their_tokens_valid():
+    old = make_manager(key_id="2024")
+    old_token = old.encode({"sub": "alice", "exp": 4_000_000_000})
+
+    retired = {"kty": "oct", "kid": "2024", "alg": "HS256", "k": base64.urlsafe_b64encode(SECRET.encode()).rstrip(b"=").decode()}
+    new = make_manager(key_id="2025", signing_key="the-next-secret-long-enough-for-hs256", retired_keys=[retired])
+
+    assert jwt.get_unverified_header(new.encode({"sub": "bob"}))["kid"] == "2025"
+    assert new.decode(old_token)["sub"] == "alice"
+    assert new.snapshot()["accepted_key_ids"] == ["2024", "2025"]
+
+    forgotten = make_manager(key_id="2026", signing_key="yet-another-secret-long-enough-for-hs256")
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown key id"):
+        forgotten.decode(old_token)
+
+@pytest.mark.parametrize("algorithm, private_key", [
+    ("RS256", rsa.generate_private_key(public_exponent=65537, key_size=2048)),
+    ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+])
+def test_asymmetric_tokens_verify_with_the_published_keys_only(algorithm, private_key):
+    manager = make_manager(algorithm=algorithm, key_id="edge", signing_key=private_pem(private_key))
+    token = manager.encode({"sub": "alice", "exp": 4_000_000_000})
+    assert manager.decode(token)["sub"] == "alice"
+
+    # What an edge service does: fetch the JWKS, pick the key by kid, verify
+    jwks = jwt.PyJWKSet.from_dict(manager.jwks())
+    assert all("d" not in key._jwk_data for key in jwks.keys)
+    key = jwks[jwt.get_unverified_header(token)["kid"]]
+    assert jwt.decode(token, key.key, algorithms=[algorithm])["sub"] == "alice"
+
+def test_shared_secrets_are_never_published():
+    assert make_manager().jwks() == {"keys": []}
+
+def test_unsupported_algorithm_is_refused():
+    with pytest.raises(ValueError, match="Unsupported"):
+        make_manager(algorithm="none")
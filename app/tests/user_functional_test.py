@@ -1,4 +1,6 @@
+import json
 import pytest
+from sqlalchemy import event
 from app.schemas.userSchemas import UserCreate, UserUpdate
 from app.services.userService import UserService
 
@@ -60,3 +62,20 @@ async def test_get_user_by_pseudo(db_session, test_user):
 
     assert found_user is not None
     assert found_user.id == test_user["id"]
+
+@pytest.mark.asyncio
+async def test_get_users_json_joins_roles_only_when_asked(db_session, test_user):
+    """Users come with their role in one query, and without the join when `is_admin` is not asked for."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind.sync_engine, "before_cursor_execute", listener)
+    try:
+        users = json.loads(await UserService.get_users_json(db_session))
+        pseudos = json.loads(await UserService.get_users_json(db_session, fields=["pseudo", "id"]))
+    finally:
+        event.remove(db_session.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 2
+    assert "user_roles" in statements[0] and "user_roles" not in statements[1]
+    assert {"id": test_user["id"], "email": test_user["email"], "pseudo": test_user["pseudo"], "is_admin": False} in users
+    assert all(list(user) == ["pseudo", "id"] for user in pseudos)
@@ -125,4 +125,30 @@ async def test_get_users_includes_roles(test_user, test_admin_user):
 
         assert isinstance(users, list)
         assert any(user["id"] == test_user["id"] and user["is_admin"] is False for user in users)
-        assert any(user["id"] == test_admin_user["id"] and user["is_admin"] is True for user in users)
\ No newline at end of file
+        assert any(user["id"] == test_admin_user["id"] and user["is_admin"] is True for user in users)
+
+@pytest.mark.asyncio
+async def test_user_cannot_update_another_user(test_user, test_admin_user):
+    """Only the user themselves or an admin may update an account."""
+    async with AsyncClient(base_url=f"http://localhost:8000/users") as ac:
+        update_response = await ac.patch(f"/{test_admin_user['id']}", json={"pseudo": "hijacked"}, headers=test_user["headers"])
+        assert update_response.status_code == 403
+
+        missing_response = await ac.patch("/999999999", json={"pseudo": "nobody"}, headers=test_user["headers"])
+        assert missing_response.status_code == 404
+
+        admin_response = await ac.patch(f"/{test_user['id']}", json={"email": "updated_by_admin@example.com"}, headers=test_admin_user["headers"])
+        assert admin_response.status_code == 200
+        assert admin_response.json()["email"] == "updated_by_admin@example.com"
+
+@pytest.mark.asyncio
+async def test_get_users_with_fields(test_user, test_admin_user):
+    """GET /users returns only the fields asked for."""
+    async with AsyncClient(base_url=f"http://localhost:8000/users") as ac:
+        response = await ac.get("/", params={"fields": "is_admin,id"})
+
+        assert response.status_code == 200
+        users = response.json()
+        assert {"id": test_user["id"], "is_admin": False} in users
+        assert {"id": test_admin_user["id"], "is_admin": True} in users
+        assert all(list(user) == ["id", "is_admin"] for user in users)
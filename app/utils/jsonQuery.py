@@ -0,0 +1,51 @@
+from itertools import chain
+from typing import Collection, List, Optional, Sequence, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import Numeric, Table, Text, cast, func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql import ColumnElement, Select, Subquery
+
+# Column numbering the rows of a query in its order, left out of their JSON
+POSITION = "_position"
+
+
+def schema_columns(table: Table, schema: Type[BaseModel], fields: Optional[Collection[str]] = None) -> List:
+    """
+    Select the columns of `table` backing `schema`, in the schema's field order.
+
+    Decimal columns are cast to text so Postgres renders them exactly like Pydantic serializes `Decimal`.
+    With `fields`, only the columns of those fields are selected, the others are never read.
+    """
+    columns = []
+    for name in schema.model_fields:
+        if fields is not None and name not in fields:
+            continue
+        column = table.c[name]
+        if isinstance(column.type, Numeric) and column.type.asdecimal:
+            columns.append(cast(column, Text).label(name))
+        else:
+            columns.append(column)
+    return columns
+
+
+def json_aggregate(query: Select, order_by: Sequence = ()) -> Tuple[ColumnElement, Subquery]:
+    """
+    The rows of a column query as one pre-serialized JSON array, and the subquery the array aggregates.
+
+    Postgres does not promise `json_agg` reads an ordered subquery in its order, so a query ordered by
+    `order_by`, the expressions of its own ORDER BY, has its rows numbered by a window sharing its sort
+    and aggregated in the order of their numbers.
+    """
+    if not order_by:
+        rows = query.subquery("r")
+        return cast(func.coalesce(func.json_agg(rows.table_valued()), text("'[]'::json")), Text), rows
+
+    rows = query.add_columns(func.row_number().over(order_by=list(order_by)).label(POSITION)).subquery("r")
+    row = func.json_build_object(*chain.from_iterable((literal_column(f"'{column.name}'"), column) for column in rows.c if column.name != POSITION))
+    return cast(func.coalesce(func.json_agg(aggregate_order_by(row, rows.c[POSITION])), text("'[]'::json")), Text), rows
+
+
+def json_array(query: Select, order_by: Sequence = ()) -> Select:
+    """Wrap a column query so Postgres returns the whole result as one pre-serialized JSON array, in `order_by` order."""
+    array, rows = json_aggregate(query, order_by)
+    return select(array).select_from(rows)
@@ -0,0 +1,105 @@
+import asyncio
+import functools
+from typing import Any, Callable, List, Optional, Tuple, Type, get_args, get_origin
+
+import pydantic_core
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute, request_response
+from pydantic import BaseModel
+
+
+class SchemaJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core, Pydantic models are serialized without a jsonable_encoder pass."""
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    Server-sent events, never cached nor buffered by proxies.
+
+    `on_close` runs once the response ends, however it ends: also when the client leaves before the first
+    event, where the generator's own `finally` never runs since it was never started.
+    """
+
+    def __init__(self, content: Any, on_close: Optional[Callable[[], None]] = None, **kwargs: Any) -> None:
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **kwargs.pop("headers", {})}
+        super().__init__(content, media_type="text/event-stream", headers=headers, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+def sparse_fields(schema: Type[BaseModel]) -> Callable[..., Optional[List[str]]]:
+    """
+    Dependency reading a `fields` query parameter, the comma-separated fields of `schema` a list should return.
+
+    The fields come back in the schema's order, or None when the parameter is absent; an unknown or empty
+    field is a 422, as any invalid parameter is.
+    """
+    def dependency(
+        fields: Optional[str] = Query(None, description=f"Comma-separated fields to return, among: {', '.join(schema.model_fields)}"),
+    ) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        asked = fields.split(",")
+        unknown = [name for name in asked if name not in schema.model_fields]
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(repr(name) for name in unknown)}")
+        return [name for name in schema.model_fields if name in asked]
+
+    return dependency
+
+
+def _response_schema(response_model: Any) -> Optional[Tuple[Type[BaseModel], bool]]:
+    """Return the schema a route responds with and whether it responds with a list of it."""
+    if isinstance(response_model, type) and issubclass(response_model, BaseModel):
+        return response_model, False
+    if get_origin(response_model) in (list, List):
+        args = get_args(response_model)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0], True
+    return None
+
+
+class SchemaRoute(APIRoute):
+    """
+    Route skipping FastAPI's response validation when the endpoint already returns its response schema.
+
+    Services build `*Response` schemas themselves, validating them a second time through `response_model`
+    only re-walks every object. Instances of the exact declared schema (or lists of them) are serialized
+    directly; anything else, subclasses included, still goes through the regular `response_model` filtering.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, endpoint, **kwargs)
+
+        schema = _response_schema(self.response_model)
+        filtered = any((
+            self.response_model_include, self.response_model_exclude, self.response_model_exclude_unset,
+            self.response_model_exclude_defaults, self.response_model_exclude_none,
+        ))
+        if schema and not filtered and asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = self._serialize_validated(self.dependant.call, *schema)
+            self.app = request_response(self.get_route_handler())
+
+    def _serialize_validated(self, call: Callable[..., Any], schema: Type[BaseModel], many: bool):
+        status_code = self.status_code or 200
+
+        @functools.wraps(call)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            content = await call(*args, **kwargs)
+            if many:
+                validated = isinstance(content, list) and all(type(item) is schema for item in content)
+            else:
+                validated = type(content) is schema
+            return SchemaJSONResponse(content, status_code=status_code) if validated else content
+
+        return endpoint
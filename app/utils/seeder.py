@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, Optional, Tuple
+
+import asyncpg
+import bcrypt
+
+from app.managers.changeFeedManager import RELOAD
+
+SEED_PASSWORD = "password"
+
+# City, country and the coordinates of its centre
+CITIES = [
+    ("Paris", "France", 48.8566, 2.3522),
+    ("Lyon", "France", 45.764, 4.8357),
+    ("Nice", "France", 43.7102, 7.262),
+    ("London", "UK", 51.5074, -0.1278),
+    ("Edinburgh", "UK", 55.9533, -3.1883),
+    ("New York", "USA", 40.7128, -74.006),
+    ("Los Angeles", "USA", 34.0522, -118.2437),
+    ("Chicago", "USA", 41.8781, -87.6298),
+    ("Tokyo", "Japan", 35.6762, 139.6503),
+    ("Kyoto", "Japan", 35.0116, 135.7681),
+    ("Berlin", "Germany", 52.52, 13.405),
+    ("Munich", "Germany", 48.1351, 11.582),
+    ("Madrid", "Spain", 40.4168, -3.7038),
+    ("Barcelona", "Spain", 41.3874, 2.1686),
+    ("Rome", "Italy", 41.9028, 12.4964),
+    ("Milan", "Italy", 45.4642, 9.19),
+    ("Bangkok", "Thailand", 13.7563, 100.5018),
+    ("Dubai", "UAE", 25.2048, 55.2708),
+    ("Singapore", "Singapore", 1.3521, 103.8198),
+    ("Sydney", "Australia", -33.8688, 151.2093),
+]
+
+HOTEL_PREFIXES = ["Grand", "Royal", "Le", "The", "Hotel", "Park", "Palace", "Residence", "Villa", "Maison"]
+HOTEL_NAMES = ["Opera", "Plaza", "Marina", "Lutetia", "Riviera", "Central", "Garden", "Harbour", "Summit", "Crown"]
+HOTEL_SUFFIXES = ["Hotel", "Suites", "Inn", "Resort", "Lodge", "Boutique", "Palace", "House"]
+DESCRIPTIONS = [
+    "Luxury hotel in the heart of the city.",
+    "Charming boutique hotel close to the old town.",
+    "Modern hotel with a rooftop bar and skyline views.",
+    "Quiet family hotel near the main station.",
+    "Historic palace hotel with a spa and fine dining.",
+]
+
+
+@dataclass
+class SeedConfig:
+    """Sizes and seed of a synthetic dataset."""
+    users: int = 1_000
+    hotels: int = 100
+    rooms_per_hotel: int = 10
+    bookings_per_room: int = 5
+    admin_ratio: float = 0.01
+    seed: int = 42
+    start_date: date = date(2025, 1, 1)
+
+
+@dataclass
+class SeedReport:
+    """Number of rows loaded per table and the time it took."""
+    rows: Dict[str, int] = field(default_factory=dict)
+    id_ranges: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_minute(self) -> float:
+        return self.total_rows / self.elapsed * 60 if self.elapsed else 0.0
+
+
+def hash_seed_password() -> str:
+    """Hash the shared seed password once, every seeded user reuses it."""
+    return bcrypt.hashpw(SEED_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def generate_users(config: SeedConfig, first_id: int, password_hash: str) -> Iterator[tuple]:
+    """Yield `(id, email, pseudo, password)` records."""
+    for user_id in range(first_id, first_id + config.users):
+        yield (user_id, f"user{user_id}@seed.example.com", f"seed_user_{user_id}", password_hash)
+
+
+def generate_user_roles(config: SeedConfig, first_user_id: int, first_id: int) -> Iterator[tuple]:
+    """Yield `(id, user_id, is_admin)` records for a deterministic share of admins."""
+    rng = random.Random(config.seed + 1)
+    role_id = first_id
+    for user_id in range(first_user_id, first_user_id + config.users):
+        if rng.random() < config.admin_ratio:
+            yield (role_id, user_id, True)
+            role_id += 1
+
+
+def generate_hotels(config: SeedConfig, first_id: int) -> Iterator[tuple]:
+    """
+    Yield `(id, name, address, city, description, rating, breakfast, latitude, longitude)` records.
+
+    Hotels are scattered around their city's centre, most of them within 20 km of it.
+    """
+    rng = random.Random(config.seed + 2)
+    for hotel_id in range(first_id, first_id + config.hotels):
+        city, country, latitude, longitude = rng.choice(CITIES)
+        name = f"{rng.choice(HOTEL_PREFIXES)} {rng.choice(HOTEL_NAMES)} {rng.choice(HOTEL_SUFFIXES)} {hotel_id}"
+        rating = Decimal(rng.randint(10, 50)) / 10
+        yield (
+            hotel_id, name, f"{city}, {country}", city, rng.choice(DESCRIPTIONS), rating, rng.random() < 0.6,
+            round(latitude + rng.gauss(0, 0.1), 6), round(longitude + rng.gauss(0, 0.1), 6),
+        )
+
+
+def generate_rooms(config: SeedConfig, first_hotel_id: int, first_id: int) -> Iterator[tuple]:
+    """Yield `(id, hotel_id, price, number_of_beds)` records."""
+    rng = random.Random(config.seed + 3)
+    room_id = first_id
+    for hotel_id in range(first_hotel_id, first_hotel_id + config.hotels):
+        for _ in range(config.rooms_per_hotel):
+            yield (room_id, hotel_id, Decimal(rng.randint(4_000, 60_000)) / 100, rng.randint(1, 4))
+            room_id += 1
+
+
+def generate_bookings(config: SeedConfig, first_user_id: int, first_room_id: int, first_id: int) -> Iterator[tuple]:
+    """
+    Yield `(id, user_id, room_id, start_date, end_date, nbr_people, breakfast)` records.
+
+    Bookings of a room are laid out one after the other, so two stays of the same room never overlap.
+    """
+    rng = random.Random(config.seed + 4)
+    booking_id = first_id
+    room_count = config.hotels * config.rooms_per_hotel
+    for room_id in range(first_room_id, first_room_id + room_count):
+        cursor = config.start_date
+        for _ in range(config.bookings_per_room):
+            start_date = cursor + timedelta(days=rng.randint(0, 5))
+            end_date = start_date + timedelta(days=rng.randint(1, 7))
+            user_id = first_user_id + rng.randrange(config.users)
+            yield (booking_id, user_id, room_id, start_date, end_date, rng.randint(1, 4), rng.random() < 0.5)
+            booking_id += 1
+            cursor = end_date
+
+
+async def reset_sequences(connection: asyncpg.Connection, tables=("users", "user_roles", "hotels", "rooms", "bookings")):
+    """
+    Move the serial sequences behind their table's highest id past it, rows inserted with explicit ids
+    do not advance them.
+
+    A sequence never goes back: ids of deleted rows are not handed out again, the change feed would
+    mix the history of two entities under one id. One already ahead is left alone, so the ids inserts
+    draw from it meanwhile stay unique.
+    """
+    for table in tables:
+        await connection.execute(
+            f"SELECT setval(sequence, highest) "
+            f"FROM (SELECT pg_get_serial_sequence('{table}', 'id')::regclass AS sequence, MAX(id) AS highest FROM {table}) AS ids "
+            f"WHERE highest > COALESCE(pg_sequence_last_value(sequence), 0)"
+        )
+
+
+async def _reserve_ids(connection: asyncpg.Connection, table: str, count: int) -> int:
+    """
+    Take `count` consecutive ids of the table's sequence before its rows are copied and return the first:
+    inserts running meanwhile draw their ids past the range instead of colliding with the copied rows.
+    """
+    return await connection.fetchval(
+        f"SELECT setval(sequence, nextval(sequence) + $1 - 1) - $1 + 1 "
+        f"FROM (SELECT pg_get_serial_sequence('{table}', 'id')::regclass AS sequence) AS s",
+        max(count, 1),
+    )
+
+
+async def seed(connection: asyncpg.Connection, config: SeedConfig, truncate: bool = False) -> SeedReport:
+    """
+    Bulk-load a synthetic dataset with `copy_records_to_table`.
+
+    Rows are appended after the existing ids, emptied first if `truncate` is set, everything runs in one
+    transaction. Truncating keeps the sequences going, the ids of the rows it removes are not reused.
+    """
+    report = SeedReport()
+    started = time.perf_counter()
+    password_hash = hash_seed_password()
+
+    async with connection.transaction():
+        if truncate:
+            await connection.execute("TRUNCATE bookings, rooms, hotels, user_roles, users CASCADE")
+
+        await reset_sequences(connection)
+        rooms = config.hotels * config.rooms_per_hotel
+        first_user_id = await _reserve_ids(connection, "users", config.users)
+        first_role_id = await _reserve_ids(connection, "user_roles", sum(1 for _ in generate_user_roles(config, first_user_id, 0)))
+        first_hotel_id = await _reserve_ids(connection, "hotels", config.hotels)
+        first_room_id = await _reserve_ids(connection, "rooms", rooms)
+        first_booking_id = await _reserve_ids(connection, "bookings", rooms * config.bookings_per_room)
+
+        loads = [
+            ("users", ["id", "email", "pseudo", "password"],
+             generate_users(config, first_user_id, password_hash), first_user_id),
+            ("user_roles", ["id", "user_id", "is_admin"],
+             generate_user_roles(config, first_user_id, first_role_id), first_role_id),
+            ("hotels", ["id", "name", "address", "city", "description", "rating", "breakfast", "latitude", "longitude"],
+             generate_hotels(config, first_hotel_id), first_hotel_id),
+            ("rooms", ["id", "hotel_id", "price", "number_of_beds"],
+             generate_rooms(config, first_hotel_id, first_room_id), first_room_id),
+            ("bookings", ["id", "user_id", "room_id", "start_date", "end_date", "nbr_people", "breakfast"],
+             generate_bookings(config, first_user_id, first_room_id, first_booking_id), first_booking_id),
+        ]
+
+        for table, columns, records, first_id in loads:
+            status = await connection.copy_records_to_table(table, records=records, columns=columns)
+            count = int(status.split()[-1])
+            report.rows[table] = count
+            report.id_ranges[table] = (first_id, first_id + count - 1)
+
+        # The copied rows have no change of their own: the processes keeping hotels in memory load them again
+        await connection.execute("INSERT INTO changes (entity, entity_id, operation) VALUES ('hotel', 0, $1)", RELOAD)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def to_asyncpg_dsn(database_url: str) -> str:
+    """Turn a SQLAlchemy `postgresql+asyncpg://` URL into a plain libpq DSN."""
+    return database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def seed_database(config: SeedConfig, database_url: Optional[str] = None, truncate: bool = False) -> SeedReport:
+    """Open a dedicated connection and seed the configured database."""
+    if database_url is None:
+        from app.managers.databaseManager import DATABASE_URL
+        database_url = DATABASE_URL
+
+    if not database_url:
+        raise ValueError("DATABASE_URL is not set")
+
+    connection = await asyncpg.connect(to_asyncpg_dsn(database_url))
+    try:
+        return await seed(connection, config, truncate=truncate)
+    finally:
+        await connection.close()
+
+
+def main():
+    """Launched with `poetry run seed` at root level"""
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic dataset for tests and benchmarks.")
+    parser.add_argument("--users", type=int, default=SeedConfig.users)
+    parser.add_argument("--hotels", type=int, default=SeedConfig.hotels)
+    parser.add_argument("--rooms-per-hotel", type=int, default=SeedConfig.rooms_per_hotel)
+    parser.add_argument("--bookings-per-room", type=int, default=SeedConfig.bookings_per_room)
+    parser.add_argument("--admin-ratio", type=float, default=SeedConfig.admin_ratio)
+    parser.add_argument("--seed", type=int, default=SeedConfig.seed)
+    parser.add_argument("--truncate", action="store_true", help="Empty every table before loading.")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    config = SeedConfig(
+        users=args.users,
+        hotels=args.hotels,
+        rooms_per_hotel=args.rooms_per_hotel,
+        bookings_per_room=args.bookings_per_room,
+        admin_ratio=args.admin_ratio,
+        seed=args.seed,
+    )
+    report = asyncio.run(seed_database(config, args.database_url, truncate=args.truncate))
+
+    for table, count in report.rows.items():
+        print(f"{table:<12} {count:>12,} rows")
+    print(f"{report.total_rows:,} rows in {report.elapsed:.2f}s ({report.rows_per_minute:,.0f} rows/min)")
+
+
+if __name__ == "__main__":
+    main()
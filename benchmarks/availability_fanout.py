@@ -0,0 +1,80 @@
+"""
+Cost of idle availability streams and of fanning a delta out to them.
+
+SUBSCRIBERS consumer tasks iterate over their subscription's event stream, as the streaming responses
+do, spread over HOTELS hotels. Memory is measured with tracemalloc while they sit idle, then DELTAS
+deltas are published to the busiest hotel and timed until every one of its subscribers received them.
+Sockets are left out: this is the per-process bookkeeping only. No database is needed:
+`python -m benchmarks.availability_fanout`.
+"""
+import asyncio
+import time
+import tracemalloc
+
+from app.managers.availabilityManager import AvailabilityManager
+from benchmarks.common import print_table
+
+SUBSCRIBER_COUNTS = [1_000, 10_000, 20_000]
+HOTELS = 100
+DELTAS = 20
+FRAME = 'event: create\ndata: {"operation": "create", "booking_id": 1, "room_id": 1, "start_date": "2025-01-01", "end_date": "2025-01-02"}\n\n'
+
+
+async def consume(manager: AvailabilityManager, subscription, expected: int, done: asyncio.Event, received: list):
+    stream = manager.stream(subscription)
+    count = 0
+    async for chunk in stream:
+        count += chunk.count("\n\n")
+        if count == expected:
+            received.append(1)
+            if len(received) == len(manager.subscribers[0]):
+                done.set()
+
+
+async def run(subscribers: int):
+    manager = object.__new__(AvailabilityManager)
+    manager.__init__(max_subscribers=subscribers, heartbeat_seconds=3600)
+    manager.cursor = (0, 0)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    done, received = asyncio.Event(), []
+    tasks = []
+    for n in range(subscribers):
+        # Hotel 0 gets a tenth of the subscribers, the others share the rest
+        hotel_id = 0 if n % 10 == 0 else 1 + n % (HOTELS - 1)
+        subscription = await manager.subscribe(hotel_id)
+        tasks.append(asyncio.create_task(consume(manager, subscription, DELTAS, done, received)))
+    await asyncio.sleep(0.1)
+    idle = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+
+    busiest = len(manager.subscribers[0])
+    started = time.perf_counter()
+    for _ in range(DELTAS):
+        manager.publish(0, FRAME)
+    publish_seconds = time.perf_counter() - started
+    await done.wait()
+    delivered_seconds = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return [
+        f"{subscribers:,}",
+        f"{idle / 1024 / 1024:.1f}",
+        f"{idle / subscribers / 1024:.2f}",
+        f"{busiest:,}",
+        f"{publish_seconds / DELTAS * 1000:.2f}",
+        f"{delivered_seconds * 1000:.1f}",
+    ]
+
+
+async def main():
+    rows = [await run(subscribers) for subscribers in SUBSCRIBER_COUNTS]
+    print(f"Idle availability streams, then {DELTAS} deltas to the hotel with a tenth of them")
+    print_table(["subscribers", "idle MiB", "KiB each", "hotel subscribers", "publish ms", "all delivered ms"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
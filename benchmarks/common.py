@@ -0,0 +1,66 @@
+import os
+import statistics
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.utils.seeder import SeedConfig, SeedReport, seed_database, to_asyncpg_dsn
+
+load_dotenv()
+
+
+def database_url() -> str:
+    """Benchmarks run against BENCHMARK_DATABASE_URL, falling back to the test database."""
+    url = os.getenv("BENCHMARK_DATABASE_URL") or os.getenv("TEST_DATABASE_URL")
+    if not url:
+        raise ValueError("BENCHMARK_DATABASE_URL or TEST_DATABASE_URL must be set")
+    return url
+
+
+def session_factory(url: Optional[str] = None) -> sessionmaker:
+    engine = create_async_engine(url or database_url(), poolclass=NullPool)
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def measure(fn: Callable[[], Awaitable], repeat: int = 5, warmup: int = 1) -> List[float]:
+    """Run `fn` `warmup + repeat` times and return the timed samples in seconds."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def median_ms(samples: List[float]) -> float:
+    return statistics.median(samples) * 1000
+
+
+def print_table(headers: List[str], rows: List[list]):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for line in [headers, ["-" * width for width in widths], *rows]:
+        print("  ".join(str(value).rjust(width) for value, width in zip(line, widths)))
+
+
+@asynccontextmanager
+async def seeded(config: SeedConfig, url: Optional[str] = None):
+    """Seed a dataset for the duration of a benchmark and remove it afterwards."""
+    url = url or database_url()
+    report: SeedReport = await seed_database(config, url)
+    try:
+        yield report
+    finally:
+        connection = await asyncpg.connect(to_asyncpg_dsn(url))
+        try:
+            await connection.execute("DELETE FROM hotels WHERE id BETWEEN $1 AND $2", *report.id_ranges["hotels"])
+            await connection.execute("DELETE FROM users WHERE id BETWEEN $1 AND $2", *report.id_ranges["users"])
+        finally:
+            await connection.close()
@@ -0,0 +1,67 @@
+"""
+Response compression per encoding on list bodies: size, time to compress, and time to serve from the
+cache of compressed public responses.
+
+The bodies are the JSON of the hotel and user lists over seeded data, from 100 to 10k rows. A hit
+costs hashing the body and a lookup; a miss compresses it. Streamed compression of the 10k-hotel
+list, in chunks of 64 KiB as an export would send it, is timed too. Run with
+`python -m benchmarks.compression` against a migrated database.
+"""
+import asyncio
+
+from app.managers.compressionManager import ENCODINGS, CompressionManager
+from app.services.hotelService import HotelService
+from app.services.userService import UserService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+ROWS = 10_000
+CHUNK = 64 * 1024
+
+
+async def main():
+    Session = session_factory()
+    config = SeedConfig(users=ROWS, hotels=ROWS, rooms_per_hotel=0, bookings_per_room=0, admin_ratio=0.01)
+
+    async with seeded(config):
+        async with Session() as db:
+            hotels = (await HotelService.get_hotels_json(db, limit=ROWS)).encode()
+            bodies = [
+                ("hotels, 100", (await HotelService.get_hotels_json(db, limit=100)).encode()),
+                ("hotels, 1k", (await HotelService.get_hotels_json(db, limit=1000)).encode()),
+                ("hotels, 10k", hotels),
+                ("users, 10k", (await UserService.get_users_json(db)).encode()),
+            ]
+
+    manager = CompressionManager(enabled=True, cache_bytes=256 * 1024 * 1024)
+    rows = []
+    for name, body in bodies:
+        for encoding in ENCODINGS:
+            async def compress():
+                return await manager.compress(body, encoding)
+
+            async def cached():
+                return await manager.compress(body, encoding, cache=True)
+
+            size = len(await compress())
+            compress_ms = median_ms(await measure(compress, repeat=10))
+            cached_ms = median_ms(await measure(cached, repeat=10))
+            rows.append([name, f"{len(body) / 1024:.0f}", encoding, f"{size / 1024:.0f}", f"{size / len(body):.1%}", f"{compress_ms:.2f}", f"{cached_ms:.3f}"])
+
+    streamed = []
+    for encoding in ENCODINGS:
+        async def stream():
+            compressor = manager.stream(encoding)
+            return sum(len(compressor.compress(hotels[i:i + CHUNK])) for i in range(0, len(hotels), CHUNK)) + len(compressor.finish())
+
+        size = await stream()
+        streamed.append([encoding, f"{size / 1024:.0f}", f"{median_ms(await measure(stream, repeat=10)):.1f}"])
+
+    print("Compression per encoding (median ms)")
+    print_table(["body", "KiB", "encoding", "compressed KiB", "ratio", "compress", "cache hit"], rows)
+    print(f"\nStreamed 10k-hotel list, {CHUNK // 1024} KiB chunks (median ms)")
+    print_table(["encoding", "compressed KiB", "compress"], streamed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Hotel autocomplete over 1M hotels: the in-memory word index vs a scan of the hotels.
+
+The seeder names hotels from a few words and a number, in 20 cities, with 5 descriptions. The index
+is loaded from a scan first, its time, the memory it reports and the growth of the process's
+resident memory are printed; each query is then answered both ways. Run with
+`python -m benchmarks.hotel_autocomplete` against a migrated database.
+"""
+import asyncio
+import resource
+
+from app.managers.searchIndexManager import SearchIndexManager
+from app.services.hotelService import HotelService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+HOTELS = 1_000_000
+QUERIES = ["g", "gra", "grand op", "paris", "royal plaza 12", "12345", "rooftop bar", "tokyo lux"]
+
+
+def rss_mib() -> float:
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    Session = session_factory()
+    config = SeedConfig(users=1, hotels=HOTELS, rooms_per_hotel=0, bookings_per_room=0, admin_ratio=0)
+
+    async with seeded(config):
+        search_index = SearchIndexManager(enabled=True, engine=Session.kw["bind"])
+        before = rss_mib()
+        await search_index.load()
+        grown = rss_mib() - before
+        snapshot = search_index.snapshot()
+
+        rows = []
+        async with Session() as db:
+            for query in QUERIES:
+                async def suggest():
+                    return search_index.search(query)
+
+                found = len(await suggest())
+                in_memory = await measure(suggest, repeat=50)
+                scanned = await measure(lambda: HotelService._scan_suggestions(db, query, 10), repeat=3)
+                rows.append([query, found, f"{median_ms(scanned):.0f}", f"{median_ms(in_memory):.3f}"])
+
+    print(f"Autocomplete over {HOTELS:,} hotels, index loaded in {snapshot['load_seconds']:.1f} s: "
+          f"{snapshot['words']:,} words, {snapshot['postings']:,} postings, {snapshot['memory_bytes'] / 1024 / 1024:.0f} MiB reported, "
+          f"resident memory grown by {grown:.0f} MiB (median ms)")
+    print_table(["query", "suggestions", "scan", "index"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
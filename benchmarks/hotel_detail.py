@@ -0,0 +1,47 @@
+"""
+A hotel page: the hotel then its rooms in two requests vs `include=rooms,summary` in one.
+
+Each request runs in its own session, as it would on the server, so the two-request path pays for
+two sessions and transactions; on a mobile network it would also pay a second round trip, which
+this does not count. Run with `python -m benchmarks.hotel_detail` against a migrated database.
+"""
+import asyncio
+
+from app.services.hotelService import HotelService
+from app.services.roomService import RoomService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+ROOMS_PER_HOTEL = [10, 100, 1000]
+
+
+async def main():
+    Session = session_factory()
+    rows = []
+    for rooms in ROOMS_PER_HOTEL:
+        config = SeedConfig(users=1, hotels=1, rooms_per_hotel=rooms, bookings_per_room=0, admin_ratio=0)
+        async with seeded(config) as report:
+            hotel_id, _ = report.id_ranges["hotels"]
+
+            async def two_requests():
+                async with Session() as db:
+                    await HotelService.get_hotel(db, hotel_id)
+                async with Session() as db:
+                    await RoomService.get_rooms_by_hotel_json(db, hotel_id, limit=rooms)
+
+            async def one_request(include):
+                async with Session() as db:
+                    await HotelService.get_hotel_detail(db, hotel_id, include)
+
+            separate = median_ms(await measure(two_requests, repeat=20))
+            with_rooms = median_ms(await measure(lambda: one_request({"rooms"}), repeat=20))
+            with_summary = median_ms(await measure(lambda: one_request({"rooms", "summary"}), repeat=20))
+            summary_only = median_ms(await measure(lambda: one_request({"summary"}), repeat=20))
+            rows.append([rooms, f"{separate:.2f}", f"{with_rooms:.2f}", f"{with_summary:.2f}", f"{summary_only:.2f}"])
+
+    print("Hotel page, median of 20 runs (ms)")
+    print_table(["rooms", "hotel + rooms requests", "include=rooms", "include=rooms,summary", "include=summary"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Faceted hotel search over 1M hotels: counts kept in memory vs one grouped query.
+
+The seeder gives each hotel a city among 20, a rating and two rooms. The in-memory counts are loaded
+from a scan first, its time and the memory the counts take are reported; each search then counts
+the facets both ways and returns its page of hotels. Run with `python -m benchmarks.hotel_facets`
+against a migrated database.
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from app.managers.facetManager import FacetManager
+from app.services.hotelService import HotelService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+HOTELS = 1_000_000
+SEARCHES = [
+    ("no filter", {}),
+    ("rating 4-5", {"rating": ["4-5"]}),
+    ("Paris, breakfast", {"city": ["Paris"], "breakfast": ["true"]}),
+    ("price 100-200 or 200-500, rating 3-4", {"price": ["100-200", "200-500"], "rating": ["3-4"]}),
+]
+
+
+async def main():
+    Session = session_factory()
+    config = SeedConfig(users=1, hotels=HOTELS, rooms_per_hotel=2, bookings_per_room=0, admin_ratio=0)
+
+    async with seeded(config):
+        async with Session() as db:
+            await db.execute(text("ANALYZE hotels"))
+            await db.execute(text("ANALYZE rooms"))
+            await db.commit()
+
+        facet_manager = FacetManager(enabled=True, engine=Session.kw["bind"])
+        await facet_manager.load()
+        snapshot = facet_manager.snapshot()
+
+        rows = []
+        async with Session() as db:
+            for label, filters in SEARCHES:
+                search = {
+                    "rating": filters.get("rating"),
+                    "breakfast": True if filters.get("breakfast") else None,
+                    "city": filters.get("city"),
+                    "price": filters.get("price"),
+                }
+
+                async def count():
+                    return facet_manager.count(filters)
+
+                total, _ = await count()
+                in_memory = await measure(count, repeat=20)
+                grouped = await measure(
+                    lambda: HotelService._count_facets(db, HotelService._facet_hotels(None, None), filters), repeat=3,
+                )
+                page = await measure(lambda: HotelService.search_faceted(db, limit=10, **search))
+                rows.append([label, f"{total:,}", f"{median_ms(grouped):.0f}", f"{median_ms(in_memory):.3f}", f"{median_ms(page):.1f}"])
+
+    print(f"Facet counts over {HOTELS:,} hotels, loaded in {snapshot['load_seconds']:.1f} s, "
+          f"{snapshot['combinations']:,} combinations in {snapshot['memory_bytes'] / 1024 / 1024:.1f} MiB (median ms)")
+    print_table(["filters", "matching", "grouped query", "in memory", "search with page"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Streaming hotel import of up to a million rows, CSV and NDJSON.
+
+Each upload is generated as it is read, in 64 KiB chunks like a request body, the way a client
+streams it. The process's peak resident memory is reported after each run: the runs go from the
+smallest to the largest, so it should not grow with the row count. One hotel in a hundred carries an
+invalid rating to exercise the error path. The imported rows are
+deleted afterwards. Run with `python -m benchmarks.hotel_import` against a migrated database.
+"""
+import asyncio
+import json
+import resource
+import time
+import uuid
+
+import asyncpg
+
+from app.services.importService import ImportService
+from benchmarks.common import database_url, print_table, session_factory, to_asyncpg_dsn
+
+ROW_COUNTS = [100_000, 1_000_000]
+ROOMS_PER_HOTEL = 19
+BODY_CHUNK_SIZE = 64 * 1024
+
+
+def csv_lines(tag: str, rows: int):
+    yield "type,name,address,description,rating,breakfast,price,number_of_beds\n"
+    for n in range(rows):
+        hotel, room = divmod(n, ROOMS_PER_HOTEL + 1)
+        if room == 0:
+            rating = "9.9.9" if hotel % 100 == 99 else "4.5"
+            yield f'hotel,{tag} {hotel},"{hotel} Main Street, Paris",Benchmark hotel,{rating},true,,\n'
+        else:
+            yield f"room,,,,,,{100 + room}.50,{1 + room % 4}\n"
+
+
+def ndjson_lines(tag: str, rows: int):
+    for n in range(rows):
+        hotel, room = divmod(n, ROOMS_PER_HOTEL + 1)
+        if room == 0:
+            rating = "9.9.9" if hotel % 100 == 99 else "4.5"
+            record = {"type": "hotel", "name": f"{tag} {hotel}", "address": f"{hotel} Main Street, Paris",
+                      "description": "Benchmark hotel", "rating": rating, "breakfast": True}
+        else:
+            record = {"type": "room", "price": f"{100 + room}.50", "number_of_beds": 1 + room % 4}
+        yield json.dumps(record) + "\n"
+
+
+async def body(lines):
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= BODY_CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+    yield "".join(chunk).encode()
+
+
+async def cleanup(tag: str):
+    connection = await asyncpg.connect(to_asyncpg_dsn(database_url()))
+    try:
+        hotels = "SELECT id FROM hotels WHERE name LIKE $1"
+        await connection.execute(
+            f"DELETE FROM changes WHERE entity = 'room' AND entity_id IN (SELECT id FROM rooms WHERE hotel_id IN ({hotels}))", f"{tag} %",
+        )
+        await connection.execute(f"DELETE FROM changes WHERE entity = 'hotel' AND entity_id IN ({hotels})", f"{tag} %")
+        await connection.execute("DELETE FROM hotels WHERE name LIKE $1", f"{tag} %")
+    finally:
+        await connection.close()
+
+
+async def run(Session, media_type: str, lines, rows: int) -> list:
+    tag = f"bench-{uuid.uuid4().hex[:8]}"
+    started = time.perf_counter()
+    try:
+        async with Session() as db:
+            report = await ImportService.import_hotels(db, body(lines(tag, rows)), media_type)
+        elapsed = time.perf_counter() - started
+    finally:
+        await cleanup(tag)
+    # Kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return [
+        media_type,
+        f"{rows:,}",
+        f"{report.hotels + report.rooms:,}",
+        f"{report.error_count:,}",
+        f"{elapsed:.1f}",
+        f"{rows / elapsed:,.0f}",
+        f"{peak / 1024 / 1024:.1f}",
+    ]
+
+
+async def main():
+    Session = session_factory()
+    rows = []
+    for count in ROW_COUNTS:
+        for media_type, lines in [("text/csv", csv_lines), ("application/x-ndjson", ndjson_lines)]:
+            rows.append(await run(Session, media_type, lines, count))
+    print(f"Streaming import, {ROOMS_PER_HOTEL} rooms per hotel")
+    print_table(["format", "rows", "imported", "rejected", "seconds", "rows/s", "peak RSS MiB"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
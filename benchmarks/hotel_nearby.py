@@ -0,0 +1,69 @@
+"""
+Nearby hotel search over 1M hotels: bounding box on the coordinates index vs a full scan.
+
+The seeder scatters the hotels around 20 cities, so a search in a city centre has tens of thousands
+of hotels in its latitude band. The full scan computes every hotel's distance as the query would
+without the index. Run with `python -m benchmarks.hotel_nearby` against a migrated database.
+"""
+import asyncio
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from app.models.hotelModel import Hotel
+from app.services.hotelService import HotelService, _distance_km
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+HOTELS = 1_000_000
+SEARCHES = [
+    # (place, latitude, longitude, radius in km, filtered on breakfast and a 4.0 rating)
+    ("Paris centre", 48.8566, 2.3522, 1, False),
+    ("Paris centre", 48.8566, 2.3522, 5, False),
+    ("Paris centre", 48.8566, 2.3522, 25, False),
+    ("Paris centre", 48.8566, 2.3522, 5, True),
+    ("Tokyo outskirts", 35.9, 139.9, 10, False),
+    ("Atlantic ocean", 40.0, -40.0, 50, False),
+]
+
+
+async def full_scan(db, latitude: float, longitude: float, radius_km: float):
+    distance = _distance_km(latitude, longitude)
+    query = select(Hotel.id, distance.label("distance")).where(distance <= radius_km).order_by(distance).limit(10)
+    return (await db.execute(query)).all()
+
+
+async def main():
+    Session = session_factory()
+    config = SeedConfig(users=1, hotels=HOTELS, rooms_per_hotel=0, bookings_per_room=0, admin_ratio=0)
+
+    async with seeded(config):
+        async with Session() as db:
+            await db.execute(text("ANALYZE hotels"))
+            await db.commit()
+
+        rows = []
+        async with Session() as db:
+            for place, latitude, longitude, radius, filtered in SEARCHES:
+                filters = {"breakfast": True, "min_rating": Decimal("4.0")} if filtered else {}
+                found = len(await full_scan(db, latitude, longitude, radius)) if not filtered else None
+                indexed = await measure(lambda: HotelService.get_nearby_hotels_json(
+                    db, latitude, longitude, radius, limit=10, **filters,
+                ))
+                scanned = await measure(lambda: full_scan(db, latitude, longitude, radius), repeat=3) if not filtered else None
+                rows.append([
+                    place,
+                    radius,
+                    "yes" if filtered else "no",
+                    found if found is not None else "-",
+                    f"{median_ms(scanned):.1f}" if scanned else "-",
+                    f"{median_ms(indexed):.2f}",
+                ])
+
+    print(f"Nearby search over {HOTELS:,} hotels, 10 nearest (median ms)")
+    print_table(["place", "radius km", "filtered", "found", "full scan", "bounding box"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
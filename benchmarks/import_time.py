@@ -0,0 +1,59 @@
+"""
+Cold start: import time of `app.main` reported by `python -X importtime`.
+
+Each run imports the application in a fresh interpreter; the report gives the median total and the
+modules costing the most, and lists which lazily loaded clients leaked back into the import.
+Run with `python -m benchmarks.import_time`.
+"""
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.common import print_table
+
+RUNS = 7
+TOP = 15
+# Created on first use, importing `app.main` must not load them
+LAZY_MODULES = ["boto3", "passlib.context", "uvicorn"]
+
+
+def import_times(module: str = "app.main") -> Dict[str, Tuple[int, int]]:
+    """Import `module` in a fresh interpreter and return `{module: (self µs, cumulative µs)}`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    runs: List[Dict[str, Tuple[int, int]]] = [import_times() for _ in range(RUNS)]
+    totals = [run["app.main"][1] / 1000 for run in runs]
+
+    modules = runs[0].keys()
+    medians = {
+        name: (
+            statistics.median(run[name][0] for run in runs if name in run) / 1000,
+            statistics.median(run[name][1] for run in runs if name in run) / 1000,
+        )
+        for name in modules
+    }
+
+    print(f"import app.main: median {statistics.median(totals):.0f} ms, min {min(totals):.0f} ms over {RUNS} runs")
+    print()
+    print(f"Top {TOP} modules by self time")
+    top = sorted(medians.items(), key=lambda item: item[1][0], reverse=True)[:TOP]
+    print_table(["module", "self ms", "cumulative ms"], [[name, f"{s:.1f}", f"{c:.1f}"] for name, (s, c) in top])
+    print()
+    print_table(["lazy module", "imported by app.main"], [[name, "yes" if name in modules else "no"] for name in LAZY_MODULES])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+ORM hydration vs Core row-to-schema mapping vs Postgres-serialized JSON on 10k-row lists.
+
+Run with `python -m benchmarks.list_hydration` against a migrated database.
+"""
+import asyncio
+
+from sqlalchemy.future import select
+
+from app.models.bookingModel import Booking
+from app.models.hotelModel import Hotel
+from app.models.roomModel import Room
+from app.schemas.bookingSchemas import BookingResponse
+from app.schemas.hotelSchemas import HotelResponse
+from app.schemas.roomSchemas import RoomResponse
+from app.services.bookingService import BookingService
+from app.services.hotelService import HotelService
+from app.services.roomService import RoomService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+ROWS = 10_000
+
+
+async def orm_list(db, query, schema):
+    """The previous read path: full ORM entities validated one by one."""
+    result = await db.execute(query)
+    return [schema.model_validate(entity) for entity in result.scalars().all()]
+
+
+async def main():
+    Session = session_factory()
+    # One user owning ROWS bookings spread over ROWS hotels, then one hotel holding ROWS rooms
+    spread = SeedConfig(users=1, hotels=ROWS, rooms_per_hotel=1, bookings_per_room=1, admin_ratio=0)
+    dense = SeedConfig(users=1, hotels=1, rooms_per_hotel=ROWS, bookings_per_room=0, admin_ratio=0)
+
+    async with seeded(spread) as spread_report, seeded(dense) as dense_report:
+        user_id, _ = spread_report.id_ranges["users"]
+        hotel_id, _ = dense_report.id_ranges["hotels"]
+
+        cases = [
+            (
+                "bookings by user",
+                lambda db: orm_list(db, select(Booking).filter(Booking.user_id == user_id), BookingResponse),
+                lambda db: BookingService.get_bookings_by_user(db, user_id),
+                lambda db: BookingService.get_bookings_by_user_json(db, user_id),
+            ),
+            (
+                "rooms by hotel",
+                lambda db: orm_list(db, select(Room).filter(Room.hotel_id == hotel_id), RoomResponse),
+                lambda db: RoomService.get_rooms_by_hotel(db, hotel_id, limit=ROWS),
+                lambda db: RoomService.get_rooms_by_hotel_json(db, hotel_id, limit=ROWS),
+            ),
+            (
+                "hotels",
+                lambda db: orm_list(db, select(Hotel).limit(ROWS), HotelResponse),
+                lambda db: HotelService.get_hotels(db, limit=ROWS),
+                lambda db: HotelService.get_hotels_json(db, limit=ROWS),
+            ),
+        ]
+
+        rows = []
+        for name, orm_path, core_path, json_path in cases:
+            async with Session() as db:
+                assert len(await core_path(db)) == ROWS, f"{name}: expected {ROWS} rows"
+
+            async def run(path):
+                async with Session() as db:
+                    await path(db)
+
+            orm_ms = median_ms(await measure(lambda: run(orm_path)))
+            core_ms = median_ms(await measure(lambda: run(core_path)))
+            json_ms = median_ms(await measure(lambda: run(json_path)))
+            rows.append([
+                name, f"{orm_ms:.1f}", f"{core_ms:.1f}", f"{json_ms:.1f}",
+                f"{orm_ms / core_ms:.1f}x", f"{orm_ms / json_ms:.1f}x",
+            ])
+
+    print(f"Median of 5 runs over {ROWS:,} rows")
+    print_table(["list", "orm ms", "core ms", "json ms", "core speedup", "json speedup"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Legitimate login latency while another address brute-forces `/users/login`.
+
+An attacker runs concurrent wrong-password attempts against seeded accounts while one user logs in
+from another address. The attack is replayed with the rate limiter disabled and enabled; the
+legitimate latency should stay close to the quiet baseline only with the limiter. Legitimate logins
+start once the attack has run for ATTACK_WARMUP seconds, after the attacker's allowed burst. The
+attacking client runs in the same process, so on a small machine the remaining overhead is mostly
+generating and rejecting the attack traffic rather than verifying passwords.
+Run with `python -m benchmarks.login_under_attack` against a migrated database.
+"""
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import List
+
+from httpx import ASGITransport, AsyncClient
+
+from app.managers.rateLimitManager import InMemoryRateLimitBackend, RateLimitManager
+from app.utils.seeder import SEED_PASSWORD, SeedConfig
+from benchmarks.common import print_table, seeded
+
+ATTACKERS = 32
+LEGITIMATE_LOGINS = 15
+ATTACK_WARMUP = 5
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return sorted(samples)[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+
+async def legitimate_logins(client: AsyncClient, pseudo: str) -> List[float]:
+    samples = []
+    for _ in range(LEGITIMATE_LOGINS):
+        started = time.perf_counter()
+        response = await client.post("/users/login", data={"username": pseudo, "password": SEED_PASSWORD})
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+    return samples
+
+
+async def attack(client: AsyncClient, pseudos: List[str], stop: asyncio.Event, statuses: Counter):
+    attempt = 0
+    while not stop.is_set():
+        pseudo = pseudos[attempt % len(pseudos)]
+        response = await client.post("/users/login", data={"username": pseudo, "password": f"guess-{attempt}"})
+        statuses[response.status_code] += 1
+        attempt += 1
+
+
+async def scenario(app, pseudos: List[str], attacked: bool, limited: bool):
+    limiter = RateLimitManager()
+    limiter.backend = InMemoryRateLimitBackend()
+    limiter.enabled = limited
+
+    legitimate = AsyncClient(transport=ASGITransport(app=app, client=("198.51.100.1", 1000)), base_url="http://bench")
+    attacker = AsyncClient(transport=ASGITransport(app=app, client=("203.0.113.66", 1000)), base_url="http://bench")
+    stop, statuses = asyncio.Event(), Counter()
+    async with legitimate, attacker:
+        tasks = [asyncio.create_task(attack(attacker, pseudos[1:], stop, statuses)) for _ in range(ATTACKERS if attacked else 0)]
+        await asyncio.sleep(ATTACK_WARMUP if attacked else 0)
+        samples = await legitimate_logins(legitimate, pseudos[0])
+        stop.set()
+        await asyncio.gather(*tasks)
+    return samples, statuses
+
+
+async def main():
+    from app.main import app
+
+    config = SeedConfig(users=200, hotels=1, rooms_per_hotel=1, bookings_per_room=0, admin_ratio=0)
+    async with seeded(config) as report:
+        first, last = report.id_ranges["users"]
+        pseudos = [f"seed_user_{user_id}" for user_id in range(first, last + 1)]
+
+        rows = []
+        for name, attacked, limited in [
+            ("quiet", False, True),
+            ("attack, no limiter", True, False),
+            ("attack, limiter", True, True),
+        ]:
+            samples, statuses = await scenario(app, pseudos, attacked, limited)
+            attack_summary = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())) or "-"
+            rows.append([
+                name, f"{statistics.median(samples) * 1000:.0f}", f"{percentile(samples, 0.95):.0f}", attack_summary,
+            ])
+
+    print(f"Legitimate login latency with {ATTACKERS} concurrent attackers ({LEGITIMATE_LOGINS} logins)")
+    print_table(["scenario", "p50 ms", "p95 ms", "attacker responses"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Hotel page latency while impatient clients run searches that scan the whole table, with and without
+cancelling queries on disconnect and a search statement timeout.
+
+Over 1M hotels, a search whose name and address match nothing scans every row. SEARCHERS clients send
+it and give up after CLIENT_TIMEOUT, retrying straight away as users reloading the page do, while
+READERS clients load hotel pages by id for DURATION seconds. Without cancellation every abandoned
+search keeps its pooled connection until it completes, so the pool fills with queries nobody waits
+for and the hotel pages queue behind them. Each case runs a one-worker server in a subprocess. Run
+with `python -m benchmarks.query_timeouts` against a migrated database.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from app.utils.seeder import SeedConfig
+from benchmarks.common import print_table, seeded
+from benchmarks.server_profiles import free_port, percentile, start
+
+HOTELS = 1_000_000
+SEARCHERS = 16
+READERS = 4
+DURATION = 10
+CLIENT_TIMEOUT = 1.0
+SEARCH = "/hotels/search?name=zzz&address=zzz"
+CASES = [
+    ("no cancellation", {"QUERY_CANCEL_ON_DISCONNECT": "false", "SEARCH_STATEMENT_TIMEOUT": "30000"}),
+    ("cancel on disconnect", {"QUERY_CANCEL_ON_DISCONNECT": "true", "SEARCH_STATEMENT_TIMEOUT": "30000"}),
+    ("cancel + 250 ms search timeout", {"QUERY_CANCEL_ON_DISCONNECT": "true", "SEARCH_STATEMENT_TIMEOUT": "250"}),
+]
+# The in-memory facet counts and autocomplete index would load the 1M hotels in the worker while it serves the run
+SERVER_SETTINGS = {"FACETS_ENABLED": "false", "AUTOCOMPLETE_ENABLED": "false"}
+
+
+async def run(base_url: str, hotel_ids: range) -> tuple:
+    """Load hotel pages while searchers come and go, return the page latencies and both outcomes."""
+    deadline = time.perf_counter() + DURATION
+    latencies, pages, searches = [], Counter(), Counter()
+
+    async def searcher():
+        async with httpx.AsyncClient(base_url=base_url, timeout=CLIENT_TIMEOUT) as client:
+            while time.perf_counter() < deadline:
+                try:
+                    searches[(await client.get(SEARCH)).status_code] += 1
+                except httpx.TimeoutException:
+                    searches["abandoned"] += 1
+
+    async def reader():
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    pages[(await client.get(f"/hotels/{random.choice(hotel_ids)}")).status_code] += 1
+                except httpx.TimeoutException:
+                    pages["timeout"] += 1
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(searcher() for _ in range(SEARCHERS)), *(reader() for _ in range(READERS)))
+    return latencies, pages, searches
+
+
+async def main():
+    config = SeedConfig(users=10, hotels=HOTELS, rooms_per_hotel=0, bookings_per_room=0, admin_ratio=0)
+
+    rows = []
+    async with seeded(config) as report:
+        first, last = report.id_ranges["hotels"]
+        hotel_ids = range(first, last + 1)
+        for name, settings in CASES:
+            port = free_port()
+            server = await start(["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", "{port}"], port, **SERVER_SETTINGS, **settings)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                latencies, pages, searches = await run(base_url, hotel_ids)
+                # Let the searches abandoned last finish or be cancelled before reading the counters
+                await asyncio.sleep(2)
+                async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                    queries = (await client.get("/metrics/queries")).json()
+            finally:
+                server.terminate()
+                server.wait()
+
+            rows.append([
+                name, sum(pages.values()), f"{percentile(latencies, 0.5):.1f}", f"{percentile(latencies, 0.99):.1f}",
+                sum(count for status, count in pages.items() if status != 200),
+                searches["abandoned"], searches[504], queries["cancelled"],
+            ])
+
+    print(f"{SEARCHERS} searchers giving up after {CLIENT_TIMEOUT * 1000:.0f} ms, {READERS} readers, {DURATION} s, {HOTELS} hotels")
+    print_table(["case", "pages", "p50 ms", "p99 ms", "page errors", "searches abandoned", "searches 504", "queries cancelled"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Response serialization: FastAPI's response_model pipeline vs SchemaJSONResponse.
+
+The first table serializes 10k response schemas in-process, the second times the
+booking and hotel list endpoints end to end through the ASGI app.
+Run with `python -m benchmarks.serialization` against a migrated database.
+"""
+import asyncio
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from httpx import ASGITransport, AsyncClient
+
+from app.schemas.bookingSchemas import BookingResponse
+from app.schemas.hotelSchemas import HotelResponse
+from app.utils.responses import SchemaJSONResponse
+from app.utils.seeder import SeedConfig
+from benchmarks.common import print_table, seeded
+
+ROWS = 10_000
+
+
+def sample_bookings() -> List[BookingResponse]:
+    start = date(2025, 1, 1)
+    return [
+        BookingResponse(
+            id=i, user_id=i % 100, room_id=i % 500, start_date=start + timedelta(days=i % 300),
+            end_date=start + timedelta(days=i % 300 + 2), nbr_people=2, breakfast=bool(i % 2),
+        )
+        for i in range(ROWS)
+    ]
+
+
+def sample_hotels() -> List[HotelResponse]:
+    return [
+        HotelResponse(
+            id=i, name=f"Hotel {i}", address="Paris, France", description="Luxury hotel in the heart of Paris." * 3,
+            rating=Decimal("4.5"), breakfast=True,
+        )
+        for i in range(ROWS)
+    ]
+
+
+async def default_pipeline(field, content) -> bytes:
+    """What FastAPI does with a response_model: validate and encode, then render with json.dumps."""
+    return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+
+async def timed(fn, repeat: int = 5) -> float:
+    await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+async def in_process():
+    rows = []
+    for name, schema, content in [("bookings", BookingResponse, sample_bookings()), ("hotels", HotelResponse, sample_hotels())]:
+        field = APIRoute("/", lambda: None, response_model=List[schema]).response_field
+
+        async def schema_pipeline():
+            return SchemaJSONResponse(content).body
+
+        assert await default_pipeline(field, content) == await schema_pipeline()
+        default_ms = await timed(lambda: default_pipeline(field, content))
+        schema_ms = await timed(schema_pipeline)
+        rows.append([name, f"{default_ms:.1f}", f"{schema_ms:.1f}", f"{default_ms / schema_ms:.1f}x"])
+
+    print(f"Serializing {ROWS:,} schemas (median of 5)")
+    print_table(["list", "response_model ms", "SchemaJSONResponse ms", "speedup"], rows)
+
+
+async def end_to_end():
+    from app.main import app
+    from app.security import create_access_token
+
+    config = SeedConfig(users=1, hotels=ROWS // 10, rooms_per_hotel=10, bookings_per_room=1, admin_ratio=0)
+    async with seeded(config) as report:
+        user_id, _ = report.id_ranges["users"]
+        claims = {"sub": f"seed_user_{user_id}", "uid": user_id, "email": f"user{user_id}@seed.example.com", "sid": "bench"}
+        headers = {"Authorization": f"Bearer {create_access_token(data=claims)}"}
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            rows = []
+            for name, path in [("GET /bookings/", "/bookings/"), ("GET /hotels/search", f"/hotels/search?limit={ROWS}")]:
+                async def call():
+                    response = await client.get(path, headers=headers)
+                    assert response.status_code == 200, response.text
+                    return response
+
+                size = len((await call()).content)
+                rows.append([name, f"{await timed(call):.1f}", f"{size / 1024:.0f}"])
+
+    print()
+    print("End-to-end list endpoints (median of 5)")
+    print_table(["endpoint", "ms", "KiB"], rows)
+
+
+async def main():
+    await in_process()
+    await end_to_end()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Throughput of the server profiles with and without connection reuse, on the search and booking workloads.
+
+Each profile runs one worker in a subprocess against the seeded data:
+
+- `uvicorn defaults`: `uvicorn app.main:app`, a 5 s keep-alive and no connection limit.
+- `gunicorn + uvicorn`: the production profile of `app.server`.
+- `hypercorn`: the HTTP/2 profile of `app.http2Server`, over HTTP/1.1 and over clear-text HTTP/2.
+
+CLIENTS concurrent clients send REQUESTS requests per case, either opening a connection per request,
+as short-lived mobile clients do, or reusing pooled connections; over HTTP/2 they share a single
+connection. The search workload is `GET /hotels/search` and the booking workload a user's bookings,
+`GET /bookings/user/{user_id}` with a bearer token. Run with `python -m benchmarks.server_profiles`
+against a migrated database.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+import httpx
+
+from app.utils.seeder import SEED_PASSWORD, SeedConfig
+from benchmarks.common import database_url, print_table, seeded
+
+CLIENTS = 32
+REQUESTS = 2000
+PROFILES = [
+    ("uvicorn defaults", ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", "{port}"], [False]),
+    ("gunicorn + uvicorn", ["-m", "gunicorn", "--config", "python:app.server", "app.main:app"], [False]),
+    ("hypercorn", ["-m", "hypercorn", "--config", "python:app.http2Server", "app.main:app"], [False, True]),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    return sorted(samples)[min(int(len(samples) * fraction), len(samples) - 1)] * 1000
+
+
+async def start(arguments: List[str], port: int, **settings: str) -> subprocess.Popen:
+    """Run a one-worker server on the benchmark database, with `settings` added to its environment."""
+    url = database_url()
+    env = {
+        **os.environ, "HOST": "127.0.0.1", "PORT": str(port), "WEB_CONCURRENCY": "1",
+        "DATABASE_URL": url, "TEST_DATABASE_URL": url, "DB_ECHO": "false", **settings,
+    }
+    server = subprocess.Popen(
+        [sys.executable, *(argument.format(port=port) for argument in arguments)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(120):
+            try:
+                if (await client.get(f"http://127.0.0.1:{port}/")).status_code == 200:
+                    return server
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"{arguments} did not start")
+
+
+async def run(client: httpx.AsyncClient, path: str, headers: dict) -> tuple:
+    """Send REQUESTS requests from CLIENTS concurrent tasks, return the throughput, latencies and errors."""
+    latencies, errors = [], 0
+    remaining = iter(range(REQUESTS))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                errors += response.status_code != 200
+            except httpx.TransportError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CLIENTS)))
+    return REQUESTS / (time.perf_counter() - started), latencies, errors
+
+
+async def main():
+    config = SeedConfig(users=100, hotels=1000, rooms_per_hotel=1, bookings_per_room=1, admin_ratio=0)
+
+    rows = []
+    async with seeded(config) as report:
+        user_id, _ = report.id_ranges["users"]
+        for name, arguments, protocols in PROFILES:
+            port = free_port()
+            server = await start(arguments, port)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                async with httpx.AsyncClient(base_url=base_url) as client:
+                    login = await client.post("/users/login", data={"username": f"seed_user_{user_id}", "password": SEED_PASSWORD})
+                    token = login.json()["access_token"]
+                workloads = [
+                    ("search", "/hotels/search?name=plaza&limit=10", {}),
+                    ("booking", f"/bookings/user/{user_id}", {"Authorization": f"Bearer {token}"}),
+                ]
+
+                modes = []
+                for http2 in protocols:
+                    if http2:
+                        modes.append(("HTTP/2, one connection", {"http1": False, "http2": True}))
+                    else:
+                        modes.append(("HTTP/1.1, new connections", {"limits": httpx.Limits(max_keepalive_connections=0)}))
+                        modes.append(("HTTP/1.1, reused", {"limits": httpx.Limits(max_connections=CLIENTS)}))
+
+                for workload, path, headers in workloads:
+                    for mode, options in modes:
+                        async with httpx.AsyncClient(base_url=base_url, **options) as client:
+                            # Warm up the worker and, when reused, the pool
+                            await client.get(path, headers=headers)
+                            throughput, latencies, errors = await run(client, path, headers)
+                        rows.append([
+                            name, workload, mode, f"{throughput:.0f}",
+                            f"{percentile(latencies, 0.5):.1f}", f"{percentile(latencies, 0.99):.1f}", errors,
+                        ])
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"{CLIENTS} concurrent clients, {REQUESTS} requests per case, one worker")
+    print_table(["profile", "workload", "connections", "req/s", "p50 ms", "p99 ms", "errors"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
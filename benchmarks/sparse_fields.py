@@ -0,0 +1,56 @@
+"""
+Full rows vs sparse fieldsets (`fields=`) on 10k-row lists: bytes returned and latency.
+
+Only the columns of the fields asked for are selected, so Postgres reads, serializes and sends less.
+Run with `python -m benchmarks.sparse_fields` against a migrated database.
+"""
+import asyncio
+
+from app.services.bookingService import BookingService
+from app.services.hotelService import HotelService
+from app.services.roomService import RoomService
+from app.services.userService import UserService
+from app.utils.seeder import SeedConfig
+from benchmarks.common import measure, median_ms, print_table, seeded, session_factory
+
+ROWS = 10_000
+
+
+async def main():
+    Session = session_factory()
+    # One user owning ROWS bookings spread over ROWS hotels, one hotel holding ROWS rooms, then ROWS users
+    spread = SeedConfig(users=1, hotels=ROWS, rooms_per_hotel=1, bookings_per_room=1, admin_ratio=0)
+    dense = SeedConfig(users=1, hotels=1, rooms_per_hotel=ROWS, bookings_per_room=0, admin_ratio=0)
+    people = SeedConfig(users=ROWS, hotels=0, rooms_per_hotel=0, bookings_per_room=0, admin_ratio=0.01)
+
+    async with seeded(spread) as spread_report, seeded(dense) as dense_report, seeded(people):
+        user_id, _ = spread_report.id_ranges["users"]
+        hotel_id, _ = dense_report.id_ranges["hotels"]
+
+        cases = [
+            ("hotels", ["id", "name"], lambda db, fields: HotelService.get_hotels_json(db, limit=ROWS, fields=fields)),
+            ("rooms by hotel", ["id", "price"], lambda db, fields: RoomService.get_rooms_by_hotel_json(db, hotel_id, limit=ROWS, fields=fields)),
+            ("bookings by user", ["id", "start_date", "end_date"], lambda db, fields: BookingService.get_bookings_by_user_json(db, user_id, fields=fields)),
+            ("users", ["id", "pseudo"], lambda db, fields: UserService.get_users_json(db, fields=fields)),
+        ]
+
+        rows = []
+        for name, fields, path in cases:
+            async def run(fields):
+                async with Session() as db:
+                    return await path(db, fields)
+
+            full_bytes, sparse_bytes = len(await run(None)), len(await run(fields))
+            full_ms = median_ms(await measure(lambda: run(None)))
+            sparse_ms = median_ms(await measure(lambda: run(fields)))
+            rows.append([
+                name, ",".join(fields), f"{full_bytes / 1024:.0f}", f"{sparse_bytes / 1024:.0f}",
+                f"{full_ms:.1f}", f"{sparse_ms:.1f}", f"{full_ms / sparse_ms:.1f}x",
+            ])
+
+    print(f"Median of 5 runs over {ROWS:,} rows")
+    print_table(["list", "fields", "full KiB", "sparse KiB", "full ms", "sparse ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
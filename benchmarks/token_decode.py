@@ -0,0 +1,86 @@
+"""
+Access token verification cost, with and without the verified token cache, and the cache's hit rate.
+
+Each algorithm's token is verified DECODES times through a TokenManager whose cache is disabled, then
+through one where every call after the first is a hit. The hit rate is then measured on a replay of
+REQUESTS requests from ACTIVE_SESSIONS sessions, a few of them much busier than the rest (Zipf), for
+several cache sizes. No database is needed: `python -m benchmarks.token_decode`.
+"""
+import random
+import time
+from itertools import accumulate
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from app.managers.tokenManager import TokenManager
+from benchmarks.common import print_table
+
+DECODES = 5_000
+ACTIVE_SESSIONS = 20_000
+REQUESTS = 200_000
+CACHE_SIZES = [1_000, 5_000, 10_000, 20_000]
+
+
+def make_manager(algorithm: str, signing_key, cache_size: int) -> TokenManager:
+    manager = object.__new__(TokenManager)
+    manager.__init__(algorithm=algorithm, signing_key=signing_key, retired_keys=[], cache_size=cache_size)
+    return manager
+
+
+def pem(private_key) -> bytes:
+    return private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+
+def per_decode_us(manager: TokenManager, token: str) -> float:
+    manager.decode(token)
+    started = time.perf_counter()
+    for _ in range(DECODES):
+        manager.decode(token)
+    return (time.perf_counter() - started) / DECODES * 1_000_000
+
+
+def decode_times():
+    rows = []
+    for algorithm, signing_key in [
+        ("HS256", "a-benchmark-secret-long-enough-for-hs256"),
+        ("RS256", pem(rsa.generate_private_key(public_exponent=65537, key_size=2048))),
+        ("EdDSA", pem(ed25519.Ed25519PrivateKey.generate())),
+    ]:
+        claims = {"sub": "seed_user_1", "uid": 1, "email": "user1@seed.example.com", "adm": False, "sid": "bench", "exp": int(time.time()) + 900}
+        uncached = make_manager(algorithm, signing_key, cache_size=0)
+        cached = make_manager(algorithm, signing_key, cache_size=1)
+        token = uncached.encode(claims)
+        uncached_us, cached_us = per_decode_us(uncached, token), per_decode_us(cached, token)
+        rows.append([algorithm, f"{uncached_us:.1f}", f"{cached_us:.1f}", f"{uncached_us / cached_us:.0f}x"])
+
+    print(f"Verifying one access token ({DECODES:,} times)")
+    print_table(["algorithm", "jwt.decode us", "cached us", "speedup"], rows)
+
+
+def hit_rates():
+    rng = random.Random(42)
+    issuer = make_manager("HS256", "a-benchmark-secret-long-enough-for-hs256", cache_size=0)
+    exp = int(time.time()) + 900
+    tokens = [issuer.encode({"sub": f"seed_user_{i}", "uid": i, "sid": str(i), "exp": exp}) for i in range(ACTIVE_SESSIONS)]
+    weights = list(accumulate(1 / rank for rank in range(1, ACTIVE_SESSIONS + 1)))
+    traffic = rng.choices(tokens, cum_weights=weights, k=REQUESTS)
+
+    rows = []
+    for cache_size in CACHE_SIZES:
+        manager = make_manager("HS256", "a-benchmark-secret-long-enough-for-hs256", cache_size)
+        started = time.perf_counter()
+        for token in traffic:
+            manager.decode(token)
+        elapsed = time.perf_counter() - started
+        snapshot = manager.snapshot()
+        rows.append([f"{cache_size:,}", f"{snapshot['hit_rate'] * 100:.1f}%", f"{elapsed / REQUESTS * 1_000_000:.1f}"])
+
+    print()
+    print(f"Cache hit rate on {REQUESTS:,} requests from {ACTIVE_SESSIONS:,} sessions (Zipf)")
+    print_table(["cache size", "hit rate", "avg us per request"], rows)
+
+
+if __name__ == "__main__":
+    decode_times()
+    hit_rates()
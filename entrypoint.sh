@@ -3,5 +3,14 @@ set -e
 
 sleep 5
 
+echo "🗄️ Application des migrations..."
+alembic upgrade head
+
 echo "🚀 Démarrage de FastAPI..."
-exec python3 uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+if [ "$ENV" = "PROD" ]; then
+    if [ "$SERVER" = "hypercorn" ]; then
+        exec python -m hypercorn --config python:app.http2Server app.main:app
+    fi
+    exec gunicorn --config python:app.server app.main:app
+fi
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
@@ -0,0 +1,71 @@
+"""initial schema
+
+Mirrors the tables previously created by db-init/init-db.sql. Databases built
+from that script also hold the reference data of 0002: adopt them with
+`alembic stamp 0002`, stamping 0001 would insert that data a second time.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-03-10 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("pseudo", sa.String(100), nullable=False, unique=True),
+        sa.Column("password", sa.String(255), nullable=False),
+    )
+    op.create_table(
+        "hotels",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("address", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("rating", sa.DECIMAL(2, 1), nullable=True),
+        sa.Column("breakfast", sa.Boolean(), server_default=sa.false(), nullable=True),
+    )
+    op.create_table(
+        "rooms",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("hotel_id", sa.Integer(), sa.ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("price", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("number_of_beds", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "user_roles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+        sa.Column("is_admin", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("nbr_people", sa.Integer(), nullable=False),
+        sa.Column("breakfast", sa.Boolean(), server_default=sa.false(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("bookings")
+    op.drop_table("user_roles")
+    op.drop_table("rooms")
+    op.drop_table("hotels")
+    op.drop_table("users")
@@ -0,0 +1,61 @@
+"""reference data
+
+Default admin account and the showcase hotels formerly inserted by
+db-init/init-db.sql.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-03-10 09:05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HOTELS = [
+    ("Hilton Paris Opera", "Paris, France", "Luxury hotel in the heart of Paris.", 4.7, True),
+    ("The Plaza Hotel", "New York, USA", "A legendary 5-star hotel in NYC.", 4.9, True),
+    ("Ritz-Carlton Tokyo", "Tokyo, Japan", "High-end hotel with stunning skyline views.", 4.8, True),
+    ("Marina Bay Sands", "Singapore", "Iconic hotel with world-famous infinity pool.", 4.5, True),
+    ("Burj Al Arab", "Dubai, UAE", "Ultra-luxury hotel shaped like a sail.", 5.0, True),
+    ("Hotel Montecristo", "Paris, France", "Charming boutique hotel in Paris.", 4.2, False),
+    ("The Langham", "London, UK", "Historic luxury hotel in London.", 4.6, True),
+    ("The Peninsula", "Bangkok, Thailand", "Elegant riverside hotel with great ambiance.", 4.7, True),
+    ("JW Marriott", "Los Angeles, USA", "Upscale accommodation near LA Live.", 4.4, False),
+    ("Grand Hyatt", "Berlin, Germany", "A modern luxury hotel in Berlin.", 4.5, True),
+    ("Le Meurice", "Paris, France", "Luxury palace hotel with artistic charm.", 4.9, True),
+    ("Shangri-La Hotel", "Paris, France", "Elegant 5-star hotel with Eiffel Tower views.", 4.8, True),
+    ("Hotel de Crillon", "Paris, France", "Historic and luxurious hotel in Place de la Concorde.", 4.7, True),
+    ("The Peninsula Paris", "Paris, France", "Prestigious hotel near the Arc de Triomphe.", 4.9, True),
+    ("Hotel Lutetia", "Paris, France", "Renowned Art Deco hotel in Saint-Germain.", 4.6, True),
+]
+
+
+def upgrade() -> None:
+    users = sa.table("users", sa.column("id"), sa.column("email"), sa.column("pseudo"), sa.column("password"))
+    user_roles = sa.table("user_roles", sa.column("user_id"), sa.column("is_admin"))
+    hotels = sa.table(
+        "hotels",
+        sa.column("name"), sa.column("address"), sa.column("description"), sa.column("rating"), sa.column("breakfast"),
+    )
+
+    op.bulk_insert(users, [{"id": 1, "email": "admin@supinfo.com", "pseudo": "admin", "password": "admin"}])
+    op.bulk_insert(user_roles, [{"user_id": 1, "is_admin": True}])
+    op.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users))")
+
+    op.bulk_insert(hotels, [
+        {"name": name, "address": address, "description": description, "rating": rating, "breakfast": breakfast}
+        for name, address, description, rating, breakfast in HOTELS
+    ])
+
+
+def downgrade() -> None:
+    op.execute(sa.text("DELETE FROM hotels WHERE name = ANY(:names)").bindparams(names=[hotel[0] for hotel in HOTELS]))
+    op.execute("DELETE FROM users WHERE id = 1")
@@ -0,0 +1,31 @@
+"""foreign key indexes
+
+Index the hot foreign-key filters: bookings by user and by room (listing,
+availability and ON DELETE CASCADE from rooms/users) and rooms by hotel.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-03-10 09:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_bookings_room_id_start_date", "bookings", ["room_id", "start_date"])
+    op.create_index("ix_bookings_user_id_start_date", "bookings", ["user_id", "start_date"])
+    op.create_index("ix_rooms_hotel_id", "rooms", ["hotel_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rooms_hotel_id", table_name="rooms")
+    op.drop_index("ix_bookings_user_id_start_date", table_name="bookings")
+    op.drop_index("ix_bookings_room_id_start_date", table_name="bookings")
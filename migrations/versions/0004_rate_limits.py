@@ -0,0 +1,37 @@
+"""rate limits
+
+Shared state of the login rate limiter when RATE_LIMIT_BACKEND=postgres:
+token buckets (GCRA form) and failure windows with their lockout, one row
+per key.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-03-12 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limits",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("tat", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("failures", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("window_start", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("locked_until", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limits")
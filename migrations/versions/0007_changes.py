@@ -0,0 +1,42 @@
+"""changes
+
+Change feed of bookings, rooms and hotels: one row per service mutation,
+written in the mutating transaction and read by keyset on the writing
+transaction id and the row id.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-03-26 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "changes",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("txid", sa.BigInteger(), server_default=sa.text("pg_current_xact_id()::text::bigint"), nullable=False),
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("operation", sa.String(length=10), nullable=False),
+        sa.Column("data", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_changes_txid_id", "changes", ["txid", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_changes_txid_id", table_name="changes")
+    op.drop_table("changes")
@@ -0,0 +1,32 @@
+"""hotel_coordinates
+
+Latitude and longitude of hotels, geocoded from their address when they
+are written, with a btree index on both for nearby searches.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-04-02 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("hotels", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("hotels", sa.Column("longitude", sa.Float(), nullable=True))
+    op.create_index("ix_hotels_latitude_longitude", "hotels", ["latitude", "longitude"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_hotels_latitude_longitude", table_name="hotels")
+    op.drop_column("hotels", "longitude")
+    op.drop_column("hotels", "latitude")
@@ -0,0 +1,30 @@
+"""hotel_city
+
+City of hotels, set on write beside the free-text address, counted per
+value in faceted searches.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-04-07 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("hotels", sa.Column("city", sa.String(length=100), nullable=True))
+    op.create_index("ix_hotels_city", "hotels", ["city"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_hotels_city", table_name="hotels")
+    op.drop_column("hotels", "city")
@@ -0,0 +1,26 @@
+"""change_retention
+
+Index on the age of changes, deleted once older than their retention.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-04-14 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_changes_created_at", "changes", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_changes_created_at", table_name="changes")
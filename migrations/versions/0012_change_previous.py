@@ -0,0 +1,29 @@
+"""change_previous
+
+State an update replaced, recorded beside the new one so consumers can
+undo what the entity was, such as the dates a booking freed.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-04-15 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("changes", sa.Column("previous", postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("changes", "previous")
@@ -0,0 +1,32 @@
+"""idempotency_in_transaction
+
+Idempotency keys are claimed in the transaction of the request they
+guard, so an in-flight request no longer holds its key with a timed lock.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2025-04-16 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_column("idempotency_keys", "locked_until")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "idempotency_keys",
+        sa.Column("locked_until", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.alter_column("idempotency_keys", "locked_until", server_default=None)